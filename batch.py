@@ -0,0 +1,270 @@
+import hashlib
+import json
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+from detection.backends import export_model
+from parse_srt import parse_srt_columns
+from preprocessing.drone_data import save_telemetry
+from main import CarTracker, create_detector
+from config import Config
+
+# Settings that change how fast a flight is processed but not its result
+OUTPUT_NEUTRAL_SETTINGS = {
+    "PIPELINE_ENABLED",
+    "FRAME_QUEUE_SIZE",
+    "RESULT_QUEUE_SIZE",
+    "DETECTION_BATCH_SIZE",
+    "DETECTION_THREADS",
+    "DETECTION_WARMUP_RUNS",
+    "CROP_WRITER_WORKERS",
+    "EXPORT_WORKERS",
+    "GEOJSON_BATCH_SIZE",
+    "CHECKPOINT_PATH",
+    "CHECKPOINT_INTERVAL",
+    "PROFILE_TRACE_PATH",
+    "BATCH_OUTPUT_DIR",
+    "BATCH_HASH_SAMPLES",
+}
+# Settings every flight of a batch overrides
+FLIGHT_SETTINGS = {
+    "VIDEO_PATH",
+    "DRONE_DATA_PATH",
+    "VIDEO_OFFSET_MS",
+    "CAR_IMAGE_PATH",
+    "GEOJSON_OUTPUT_PATH",
+    "GEOJSON_STREAM_PATH",
+    "PATH_TILES_DIR",
+    "DETECTION_CACHE_DIR",
+}
+SAMPLE_BYTES = 1 << 20
+
+_detector = None  # the warm detector of a worker process
+
+
+def file_digest(path: str, samples: int = None) -> str:
+    """
+    Hash the content of a file.
+    Large files, like flight videos, can be hashed from `samples` evenly spaced 1 MB blocks
+    and their size instead of in full, which still changes with any re-encode or cut.
+
+    Args:
+        path: Path to the file
+        samples: Number of blocks to hash, None to hash the whole file
+    Returns:
+        str: The SHA-256 hex digest
+    """
+    digest = hashlib.sha256()
+    size = os.path.getsize(path)
+    with open(path, "rb") as file:
+        if samples is None or size <= samples * SAMPLE_BYTES:
+            for block in iter(lambda: file.read(SAMPLE_BYTES), b""):
+                digest.update(block)
+        else:
+            digest.update(str(size).encode())
+            for index in range(samples):
+                file.seek((size - SAMPLE_BYTES) * index // max(samples - 1, 1))
+                digest.update(file.read(SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+def config_digest() -> str:
+    """
+    Hash the settings that change the result of a flight.
+    """
+    settings = {
+        name: value
+        for name, value in vars(Config).items()
+        if name.isupper() and name not in OUTPUT_NEUTRAL_SETTINGS | FLIGHT_SETTINGS
+    }
+    # Their paths are per flight, but turning them on adds outputs
+    settings["PATH_TILES_DIR"] = bool(Config.PATH_TILES_DIR)
+    settings["DETECTION_CACHE_DIR"] = bool(Config.DETECTION_CACHE_DIR)
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def load_manifest(path: str) -> list:
+    """
+    Read the flights of a batch.
+    The manifest is a JSON list of flights with a `video` and a `telemetry` path (the SRT,
+    the parsed SRT JSON or its `.npy` columns), and optionally a `name` for its output
+    directory (defaults to the video file name) and a `video_offset_ms`. Relative paths
+    are relative to the manifest.
+
+    Args:
+        path: Path to the manifest
+    Returns:
+        list: The flights, with absolute paths and a name
+    """
+    with open(path, "r") as file:
+        flights = json.load(file)
+
+    base = os.path.dirname(os.path.abspath(path))
+    names = set()
+    for flight in flights:
+        flight["video"] = os.path.join(base, flight["video"])
+        flight["telemetry"] = os.path.join(base, flight["telemetry"])
+        flight.setdefault("name", os.path.splitext(os.path.basename(flight["video"]))[0])
+        flight.setdefault("video_offset_ms", Config.VIDEO_OFFSET_MS)
+        if flight["name"] in names:
+            raise ValueError(f"Two flights of {path} are named {flight['name']!r}")
+        names.add(flight["name"])
+    return flights
+
+
+def flight_key(flight: dict, model_digest: str, settings_digest: str) -> dict:
+    """
+    Get the hashes the cached result of a flight must match to be reused.
+    """
+    return {
+        "video": file_digest(flight["video"], Config.BATCH_HASH_SAMPLES),
+        "telemetry": file_digest(flight["telemetry"]),
+        "video_offset_ms": flight["video_offset_ms"],
+        "model": model_digest,
+        "config": settings_digest,
+    }
+
+
+def is_cached(output_dir: str, key: dict) -> bool:
+    """
+    Check if a flight was already processed with the same inputs, model and settings.
+    """
+    result_path = os.path.join(output_dir, "result.json")
+    if not os.path.exists(result_path):
+        return False
+    with open(result_path, "r") as file:
+        return json.load(file).get("key") == key
+
+
+def init_worker(threads: int) -> None:
+    """
+    Load and warm up the detector of a worker process once, for all its flights.
+    """
+    global _detector
+    _detector = create_detector(threads)
+
+
+def process_flight(flight: dict, output_dir: str, key: dict) -> dict:
+    """
+    Run the recognition on one flight with the warm detector of the worker, writing the
+    GeoJSON, the NDJSON stream, the vehicle images and the recorded detections to the output
+    directory of the flight.
+    `result.json` is written last, so a flight that failed is processed again next time.
+
+    Args:
+        flight: The flight from the manifest
+        output_dir: The directory of the flight outputs
+        key: The hashes of the flight, saved with the result
+    Returns:
+        dict: The saved result
+    """
+    start = time.perf_counter()
+    result_path = os.path.join(output_dir, "result.json")
+    if os.path.exists(result_path):
+        os.remove(result_path)  # the outputs are about to change
+    os.makedirs(os.path.join(output_dir, "vehicles"), exist_ok=True)
+    telemetry_path = flight["telemetry"]
+    if telemetry_path.lower().endswith(".srt"):
+        telemetry_path = os.path.join(output_dir, "parsedSRT.npy")
+        save_telemetry(telemetry_path, parse_srt_columns(flight["telemetry"]))
+
+    Config.VIDEO_PATH = flight["video"]
+    Config.DRONE_DATA_PATH = telemetry_path
+    Config.VIDEO_OFFSET_MS = flight["video_offset_ms"]
+    Config.CAR_IMAGE_PATH = os.path.join(output_dir, "vehicles")
+    Config.GEOJSON_OUTPUT_PATH = os.path.join(output_dir, "pathGEO.json")
+    Config.GEOJSON_STREAM_PATH = os.path.join(output_dir, "pathGEO.ndjson")
+    if Config.PATH_TILES_DIR:
+        Config.PATH_TILES_DIR = os.path.join(output_dir, "tiles")
+
+    _detector.reset_tracker()
+    with CarTracker(
+        features_path=Config.GEOJSON_STREAM_PATH,
+        video_path=flight["video"],
+        video_offset_ms=flight["video_offset_ms"],
+        detections_path=(
+            os.path.join(output_dir, "detections") if Config.DETECTION_CACHE_DIR else None
+        ),
+    ) as tracker:
+        tracker.run_recognition(_detector)
+
+    result = {
+        "name": flight["name"],
+        "key": key,
+        "vehicles": len(tracker.car_ids),
+        "seconds": time.perf_counter() - start,
+        "finished": datetime.now(timezone.utc).isoformat(),
+    }
+    temporary_path = os.path.join(output_dir, "result.json.tmp")
+    with open(temporary_path, "w") as file:
+        json.dump(result, file, indent=2)
+    os.replace(temporary_path, result_path)
+    return result
+
+
+def run_batch(manifest_path: str, workers: int, force: bool = False) -> list:
+    """
+    Process the flights of a manifest in worker processes that each keep one warm detector.
+    Every flight gets its own directory in `Config.BATCH_OUTPUT_DIR`. Flights whose video,
+    telemetry, model and settings did not change since their last run are skipped.
+
+    Args:
+        manifest_path: Path to the manifest, see `load_manifest`
+        workers: Number of worker processes
+        force: Process the flights even if their result is cached
+    Returns:
+        list: The result of every flight, from this run or from the cache
+    """
+    flights = load_manifest(manifest_path)
+    model_digest = file_digest(Config.YOLO_MODEL_PATH)
+    settings_digest = config_digest()
+
+    results = []
+    pending = []
+    for flight in flights:
+        output_dir = os.path.join(Config.BATCH_OUTPUT_DIR, flight["name"])
+        key = flight_key(flight, model_digest, settings_digest)
+        if not force and is_cached(output_dir, key):
+            print(f"Skipping {flight['name']}, its result is up to date")
+            with open(os.path.join(output_dir, "result.json"), "r") as file:
+                results.append(json.load(file))
+        else:
+            pending.append((flight, output_dir, key))
+    if not pending:
+        return results
+
+    workers = max(1, min(workers, len(pending)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    # Export the model for the backend once instead of in every worker
+    export_model(
+        Config.YOLO_MODEL_PATH,
+        Config.DETECTION_BACKEND,
+        Config.EXPORT_IMAGE_SIZE,
+        Config.INT8_CALIBRATION_DATA,
+    )
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=init_worker,
+        initargs=(threads,),
+    ) as executor:
+        futures = {
+            executor.submit(process_flight, flight, output_dir, key): flight["name"]
+            for flight, output_dir, key in pending
+        }
+        for future, name in futures.items():
+            try:
+                result = future.result()
+            except Exception as error:  # keep processing the other flights
+                print(f"Flight {name} failed: {error!r}")
+                continue
+            print(
+                f"Processed {name}: {result['vehicles']} vehicles in {result['seconds']:.1f}s"
+            )
+            results.append(result)
+    return results
@@ -0,0 +1,139 @@
+"""
+Compare the speed and accuracy of adaptive keyframe strides against detecting every frame.
+
+Usage:
+    python3 -m benchmarks.adaptive_stride --frames 900 --strides 2 4 8
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from detection.boxes import box_iou
+from detection.yolo import YOLODetector
+from main import CarTracker
+from config import Config
+
+
+class CountingDetector:
+    """
+    Wraps a detector and counts the frames it runs on.
+    """
+
+    def __init__(self, detector: YOLODetector):
+        self.detector = detector
+        self.frames = 0
+
+    def detect_objects(self, frame):
+        self.frames += 1
+        return self.detector.detect_objects(frame)
+
+    def detect_objects_batch(self, frames: list) -> list:
+        self.frames += len(frames)
+        return self.detector.detect_objects_batch(frames)
+
+
+def run(max_stride: int, frame_count: int, features_path: str) -> tuple:
+    """
+    Detect the vehicles of the first frames of the video with a fresh detector and tracker.
+
+    Args:
+        max_stride: The largest number of frames between two detector runs
+        frame_count: Number of frames to process
+        features_path: Where the tracker may stream its GeoJSON features
+    Returns:
+        tuple: Frames per second, the number of detector runs and the detections of every frame
+    """
+    Config.MAX_FRAME_STRIDE = max_stride
+    detector = CountingDetector(
+        YOLODetector(
+            Config.YOLO_MODEL_PATH,
+            conf_threshold=Config.CONFIDENCE_THRESHOLD,
+            iou_threshold=Config.IOU_THRESHOLD,
+        )
+    )
+    tracker = CarTracker(stop_frame=frame_count, features_path=features_path)
+    try:
+        start = time.perf_counter()
+        detections = [
+            detections
+            for _, _, detections in tracker.detect_frames(detector, tracker.read_frames())
+        ]
+        elapsed = time.perf_counter() - start
+    finally:
+        tracker.feature_sink.close()
+        tracker.crop_writer.close()
+        tracker.frame_source.close()
+    return len(detections) / elapsed, detector.frames, detections
+
+
+def match_frame(expected, actual, iou_threshold: float) -> tuple:
+    """
+    Greedily match the boxes of a frame to the boxes of the baseline.
+
+    Returns:
+        tuple: The number of matches and the IoU of every match
+    """
+    if not len(expected.xyxy) or not len(actual.xyxy):
+        return 0, []
+    iou = box_iou(expected.xyxy, actual.xyxy)
+    ious = []
+    for index in np.argsort(-iou, axis=None):
+        i, j = np.unravel_index(index, iou.shape)
+        if iou[i, j] < iou_threshold:
+            break
+        ious.append(float(iou[i, j]))
+        iou[i, :] = -1
+        iou[:, j] = -1
+    return len(ious), ious
+
+
+def accuracy(baseline: list, detections: list, iou_threshold: float = 0.5) -> tuple:
+    """
+    Compare the detections of every frame with the every-frame baseline.
+
+    Returns:
+        tuple: Recall, precision and the mean IoU of the matched boxes
+    """
+    matched = expected = found = 0
+    ious = []
+    for base, frame in zip(baseline, detections):
+        count, frame_ious = match_frame(base, frame, iou_threshold)
+        matched += count
+        expected += len(base.xyxy)
+        found += len(frame.xyxy)
+        ious.extend(frame_ious)
+    return (
+        matched / max(expected, 1),
+        matched / max(found, 1),
+        float(np.mean(ious)) if ious else 0.0,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=900)
+    parser.add_argument("--strides", type=int, nargs="+", default=[2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        features_path = os.path.join(directory, "features.ndjson")
+        baseline_fps, baseline_runs, baseline = run(1, args.frames, features_path)
+        print(
+            f"{'stride':>6} {'frames/s':>10} {'speedup':>8} {'detector runs':>14}"
+            f" {'recall':>7} {'precision':>10} {'mean IoU':>9}"
+        )
+        print(
+            f"{1:>6} {baseline_fps:>10.2f} {1:>7.2f}x {baseline_runs:>14}"
+            f" {1:>7.3f} {1:>10.3f} {1:>9.3f}"
+        )
+        for max_stride in args.strides:
+            fps, runs, detections = run(max_stride, args.frames, features_path)
+            recall, precision, mean_iou = accuracy(baseline, detections)
+            print(
+                f"{max_stride:>6} {fps:>10.2f} {fps / baseline_fps:>7.2f}x {runs:>14}"
+                f" {recall:>7.3f} {precision:>10.3f} {mean_iou:>9.3f}"
+            )
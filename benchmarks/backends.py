@@ -0,0 +1,122 @@
+"""
+Compare the load time, latency and accuracy drift of the inference backends for the trained models.
+
+Every model is exported for every backend (once, next to its weights) and run on the same
+video frames. Drift is measured against the PyTorch detections of the same model; with
+--data the backends are also validated on the labelled dataset to report their mAP.
+
+Usage:
+    python3 -m benchmarks.backends --frames 100 --backends torch onnx openvino openvino_int8
+    python3 -m benchmarks.backends --models runs/detect/*/weights/best.pt --data data.yaml
+"""
+
+import argparse
+import glob
+import time
+
+import numpy as np
+
+from benchmarks.adaptive_stride import accuracy
+from benchmarks.detection_batch import read_frames
+from detection.backends import BACKENDS
+from detection.yolo import Detections, YOLODetector
+from config import Config
+
+
+def predict(detector: YOLODetector, frames: list) -> tuple:
+    """
+    Detect the objects of every frame one at a time, without the tracker.
+
+    Returns:
+        tuple: The latency of every frame in milliseconds and the detections of every frame
+    """
+    latencies = []
+    detections = []
+    for frame in frames:
+        start = time.perf_counter()
+        results = detector.model.predict(
+            frame,
+            conf=detector.conf_threshold,
+            iou=detector.iou_threshold,
+            verbose=False,
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        detections.append(Detections.from_boxes(results[0].boxes))
+    return np.array(latencies), detections
+
+
+def benchmark(model_path: str, backend: str, frames: list, args: argparse.Namespace) -> dict:
+    """
+    Load a model with a backend and measure it on the frames.
+
+    Returns:
+        dict: Load and warm-up seconds, latency percentiles, the detections and the mAP
+    """
+    start = time.perf_counter()
+    detector = YOLODetector(
+        model_path,
+        conf_threshold=Config.CONFIDENCE_THRESHOLD,
+        iou_threshold=Config.IOU_THRESHOLD,
+        backend=backend,
+        threads=args.threads,
+        calibration_data=args.data,
+    )
+    load_seconds = time.perf_counter() - start
+    height, width = frames[0].shape[:2]
+    warm_up_seconds = detector.warm_up(width, height)
+
+    latencies, detections = predict(detector, frames)
+    result = {
+        "load_s": load_seconds,
+        "warm_up_s": warm_up_seconds,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p90_ms": float(np.percentile(latencies, 90)),
+        "detections": detections,
+        "map50": None,
+        "map": None,
+    }
+    if args.data:
+        metrics = detector.model.val(data=args.data, batch=1, verbose=False, plots=False)
+        result["map50"] = float(metrics.box.map50)
+        result["map"] = float(metrics.box.map)
+    return result
+
+
+def format_map(value: float) -> str:
+    return "-" if value is None else f"{value:.3f}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--models", nargs="+", default=sorted(glob.glob("runs/detect/*/weights/best.pt"))
+    )
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--video", default=Config.VIDEO_PATH)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=Config.DETECTION_THREADS)
+    parser.add_argument("--data", help="dataset YAML to validate the mAP on and calibrate INT8 with")
+    args = parser.parse_args()
+    if not args.models:
+        parser.error("no models found, pass the .pt weights with --models")
+
+    frames = read_frames(args.video, args.frames)
+    print(
+        f"{'model':<36} {'backend':<14} {'load s':>7} {'warm-up s':>10} {'p50 ms':>8}"
+        f" {'p90 ms':>8} {'speedup':>8} {'recall':>7} {'precision':>10} {'IoU':>6}"
+        f" {'mAP50':>6} {'mAP':>6}"
+    )
+    for model_path in args.models:
+        name = model_path.split("runs/detect/")[-1].split("/weights")[0]
+        baseline = None
+        for backend in args.backends:
+            result = benchmark(model_path, backend, frames, args)
+            if baseline is None:
+                baseline = result  # drift is relative to the first backend, torch by default
+            recall, precision, mean_iou = accuracy(baseline["detections"], result["detections"])
+            print(
+                f"{name:<36} {backend:<14} {result['load_s']:>7.2f} {result['warm_up_s']:>10.2f}"
+                f" {result['p50_ms']:>8.1f} {result['p90_ms']:>8.1f}"
+                f" {baseline['p50_ms'] / result['p50_ms']:>7.2f}x {recall:>7.3f} {precision:>10.3f}"
+                f" {mean_iou:>6.3f} {format_map(result['map50']):>6} {format_map(result['map']):>6}"
+            )
@@ -0,0 +1,105 @@
+"""
+Compare YOLO detection throughput for different batch sizes.
+
+Usage:
+    python3 -m benchmarks.detection_batch --frames 240
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from detection.yolo import YOLODetector
+from utils import batched
+from config import Config
+
+
+def read_frames(video_path: str, count: int) -> list:
+    """
+    Read the first frames of a video, falling back to random frames if the video
+    can't be opened.
+
+    Args:
+        video_path: Path to the video
+        count: Number of frames to read
+    Returns:
+        list: The frames
+    """
+    frames = []
+    cap = cv2.VideoCapture(video_path)
+    while cap.isOpened() and len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+
+    if not frames:
+        print(f"Could not read {video_path}, using random frames")
+        rng = np.random.default_rng(0)
+        shape = (Config.CAMERA_RESOLUTION_HEIGHT, Config.CAMERA_RESOLUTION_WIDTH, 3)
+        frames = [rng.integers(0, 255, shape, dtype=np.uint8) for _ in range(count)]
+    return frames
+
+
+def track_ids(detections: list) -> list:
+    """
+    Extract the track ids of every frame's detections.
+    """
+    return [
+        [] if boxes.id is None else boxes.id.int().tolist() for boxes in detections
+    ]
+
+
+def create_detector() -> YOLODetector:
+    return YOLODetector(
+        Config.YOLO_MODEL_PATH,
+        conf_threshold=Config.CONFIDENCE_THRESHOLD,
+        iou_threshold=Config.IOU_THRESHOLD,
+    )
+
+
+def run(frames: list, batch_size: int) -> tuple:
+    """
+    Detect objects in all frames with a fresh detector and tracker.
+
+    Args:
+        frames: The frames to run the detection on
+        batch_size: Number of frames per forward pass
+    Returns:
+        tuple: Frames per second and the track ids of every frame
+    """
+    create_detector().detect_objects_batch(frames[:batch_size])  # warm-up
+    detector = create_detector()  # fresh tracker state
+
+    detections = []
+    start = time.perf_counter()
+    if batch_size == 1:
+        detections = [detector.detect_objects(frame) for frame in frames]
+    else:
+        for batch in batched(frames, batch_size):
+            detections.extend(detector.detect_objects_batch(batch))
+    elapsed = time.perf_counter() - start
+
+    return len(frames) / elapsed, track_ids(detections)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--video", default=Config.VIDEO_PATH)
+    parser.add_argument("--frames", type=int, default=240)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames)
+    baseline_ids = None
+    print(f"{'batch':>5} {'frames/s':>10} {'speedup':>8} {'same ids':>9}")
+    for batch_size in args.batch_sizes:
+        fps, ids = run(frames, batch_size)
+        if baseline_ids is None:
+            baseline_fps, baseline_ids = fps, ids
+        print(
+            f"{batch_size:>5} {fps:>10.2f} {fps / baseline_fps:>7.2f}x {str(ids == baseline_ids):>9}"
+        )
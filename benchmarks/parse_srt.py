@@ -0,0 +1,116 @@
+"""
+Compare the throughput and memory of the SRT telemetry parsers and loaders.
+
+Usage:
+    python3 -m benchmarks.parse_srt --frames 100000
+"""
+
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+import tracemalloc
+
+from datetime import datetime
+
+from benchmarks.synthetic import write_synthetic_srt
+from parse_srt import parse_srt, parse_srt_columns
+from preprocessing.drone_data import load_telemetry, save_telemetry
+
+
+def parse_srt_baseline(filename: str) -> list:
+    """
+    The original parser: whole-file read, one regex per field and a strptime
+    round-trip per frame.
+    """
+    data_list = []
+    with open(filename, "r", encoding="utf-8") as file:
+        content = file.read()
+
+    frame_re = re.compile(r"FrameCnt: (\d+), DiffTime: (\d+ms)")
+    timestamp_re = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{3})")
+    gps_re = re.compile(r"latitude: ([\d.-]+).*?longitude: ([\d.-]+)")
+    alt_re = re.compile(r"rel_alt: ([\d.-]+).*?abs_alt: ([\d.-]+)")
+    gb_re = re.compile(r"gb_yaw: ([\d.-]+).*?gb_pitch: ([\d.-]+).*?gb_roll: ([\d.-]+)")
+    focal_len = re.compile(r"focal_len: ([\d.-]+)")
+
+    for block in content.strip().split("\n\n"):
+        frame_data = {}
+        frame_match = frame_re.search(block)
+        frame_data["frame_cnt"] = int(frame_match.group(1))
+        frame_data["diff_time"] = frame_match.group(2)
+        frame_data["timestamp"] = datetime.strptime(
+            timestamp_re.search(block).group(1), "%Y-%m-%d %H:%M:%S.%f"
+        ).strftime("%H:%M:%S:%f")[:-3]
+        gps_match = gps_re.search(block)
+        frame_data["latitude"] = float(gps_match.group(1))
+        frame_data["longitude"] = float(gps_match.group(2))
+        alt_match = alt_re.search(block)
+        frame_data["rel_alt"] = float(alt_match.group(1))
+        frame_data["abs_alt"] = float(alt_match.group(2))
+        gb_match = gb_re.search(block)
+        frame_data["gb_yaw"] = float(gb_match.group(1))
+        frame_data["gb_pitch"] = float(gb_match.group(2))
+        frame_data["gb_roll"] = float(gb_match.group(3))
+        frame_data["focal_len"] = float(focal_len.search(block).group(1))
+        data_list.append(frame_data)
+
+    return data_list
+
+
+def measure(func, *args) -> tuple:
+    """
+    Run a function once, tracing its memory.
+
+    Returns:
+        tuple: The result, the elapsed seconds and the peak traced memory in MB
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def load_json(path: str) -> list:
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        srt_path = os.path.join(directory, "flight.SRT")
+        json_path = os.path.join(directory, "parsedSRT.json")
+        npy_path = os.path.join(directory, "parsedSRT.npy")
+        write_synthetic_srt(srt_path, args.frames)
+
+        baseline, *_ = measure(parse_srt_baseline, srt_path)
+        frames, *_ = measure(parse_srt, srt_path)
+        assert frames == baseline, "streaming parser differs from the baseline"
+        with open(json_path, "w") as file:
+            json.dump(frames, file)
+        save_telemetry(npy_path, parse_srt_columns(srt_path))
+        del baseline, frames
+
+        print(f"{args.frames} frames, SRT {os.path.getsize(srt_path) / 2**20:.1f} MB")
+        print(f"{'step':<28} {'seconds':>9} {'frames/s':>12} {'peak MB':>9}")
+        for name, func, path in [
+            ("parse (baseline)", parse_srt_baseline, srt_path),
+            ("parse to dicts (streaming)", parse_srt, srt_path),
+            ("parse to columns", parse_srt_columns, srt_path),
+            ("load JSON", load_json, json_path),
+            ("load .npy", load_telemetry, npy_path),
+            ("memory-map .npy", lambda path: load_telemetry(path, "r"), npy_path),
+        ]:
+            _, elapsed, peak = measure(func, path)
+            print(
+                f"{name:<28} {elapsed:>9.4f} {args.frames / elapsed:>12.0f} {peak:>9.1f}"
+            )
@@ -0,0 +1,69 @@
+"""
+Scalar reference implementations that the vectorized pipeline code is checked and
+benchmarked against.
+"""
+
+import math
+
+from config import Config
+from geoprocessing.coordinates import adjust_lat_long_with_direction
+
+
+def map_to_coordinates(x: float, y: float, drone_info: dict, yaw_unstable: bool = False) -> tuple:
+    """
+    Map the pixel coordinates of a car to its corresponding latitude and longitude, one
+    point at a time. `GroundProjector.project` is the vectorized version of this.
+
+    Args:
+        x: The x-coordinate of the car
+        y: The y-coordinate of the car
+        drone_info: The drone information of the frame
+        yaw_unstable: Whether the drone is rotating fast, the displacement is then reset
+    Returns:
+        tuple: The latitude and longitude of the car
+    """
+
+    drone_lat = drone_info["latitude"]
+    drone_lon = drone_info["longitude"]
+    altitude = drone_info["abs_alt"]  # Absolute altitude in meters
+    focal_length = drone_info["focal_len"]  # Focal length in mm
+    gb_yaw = (
+        drone_info["gb_yaw"] + 180
+    )  # Gimbal yaw in degrees (0 - 360), we add 180 to convert it to absolute value
+
+    if not 0 <= gb_yaw <= 360:
+        raise ValueError("Gimbal yaw should be in the range of 0-360 degrees")
+
+    sensor_width = Config.SENSOR_WIDTH
+    sensor_height = sensor_width / (
+        Config.CAMERA_RESOLUTION_WIDTH / Config.CAMERA_RESOLUTION_HEIGHT
+    )
+
+    # Calculate the horizontal and vertical FOVs (in radians)
+    fov_horizontal = 2 * math.atan(sensor_width / (2 * focal_length))
+    fov_vertical = 2 * math.atan(sensor_height / (2 * focal_length))
+
+    # Calculate the ground coverage width and height
+    ground_width = 2 * (altitude * math.tan(fov_horizontal / 2))  # in meters
+    ground_height = 2 * (altitude * math.tan(fov_vertical / 2))  # in meters
+
+    # Calculate the pixel-to-meter conversion factor
+    pixel_to_meter_x = ground_width / Config.CAMERA_RESOLUTION_WIDTH
+    pixel_to_meter_y = ground_height / Config.CAMERA_RESOLUTION_HEIGHT
+
+    # Calculate the center of the image (in pixels)
+    center_x = Config.CAMERA_RESOLUTION_WIDTH / 2
+    center_y = Config.CAMERA_RESOLUTION_HEIGHT / 2
+
+    # Convert the displacement from the center from pixels to meters
+    displacement_x_meters = (x - center_x) * pixel_to_meter_x
+    displacement_y_meters = (y - center_y) * pixel_to_meter_y
+
+    # Calculate the straight-line displacement (Euclidean distance)
+    displacement = math.sqrt(displacement_x_meters**2 + displacement_y_meters**2)
+
+    # Reset the displacement when the drone is rotating fast
+    if yaw_unstable:
+        displacement = 0
+
+    return adjust_lat_long_with_direction(drone_lat, drone_lon, displacement, gb_yaw)
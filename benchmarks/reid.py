@@ -0,0 +1,82 @@
+"""
+Measure how long the re-ID bank takes to match a new track against thousands of vehicles.
+
+The bank is filled with random color signatures of vehicles spread over a few hundred meters
+and lost at different times; every new track is a noisy copy of one of them, so the matches
+are also checked.
+
+Usage:
+    python3 -m benchmarks.reid --sizes 1000 4096 8192 --queries 2000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from detection.histogram import HSV_SIGNATURE_BINS
+from detection.reid import METERS_PER_DEGREE, ReIDBank
+from config import Config
+
+
+def random_signatures(rng: np.random.Generator, count: int, dimension: int) -> np.ndarray:
+    """
+    Generate unit vectors with the sparse, non-negative look of color histograms.
+    """
+    signatures = rng.random((count, dimension)) * (rng.random((count, dimension)) < 0.1)
+    signatures[:, 0] += 1e-3  # no all-zero histograms
+    return (signatures / np.linalg.norm(signatures, axis=1, keepdims=True)).astype(np.float32)
+
+
+def run(size: int, queries: int, seed: int) -> tuple:
+    """
+    Fill a bank with `size` vehicles and match `queries` new tracks.
+
+    Returns:
+        tuple: Median and 99th percentile match time in milliseconds, and the share of
+            new tracks matched to their vehicle
+    """
+    rng = np.random.default_rng(seed)
+    dimension = HSV_SIGNATURE_BINS[0] * HSV_SIGNATURE_BINS[1]
+    bank = ReIDBank(
+        dimension,
+        capacity=size,
+        max_age=Config.REID_MAX_AGE_FRAMES,
+        gate_meters=Config.REID_GATE_METERS,
+        min_similarity=Config.REID_MIN_SIMILARITY,
+    )
+    signatures = random_signatures(rng, size, dimension)
+    lats = 48.267 + rng.uniform(0, 300, size) / METERS_PER_DEGREE
+    lons = 25.914 + rng.uniform(0, 300, size) / METERS_PER_DEGREE
+    last_frames = rng.integers(0, Config.REID_MAX_AGE_FRAMES, size)
+    for car_id in range(size):
+        bank.update(
+            car_id, int(last_frames[car_id]), lats[car_id], lons[car_id], signatures[car_id]
+        )
+
+    frame_idx = Config.REID_MAX_AGE_FRAMES
+    targets = rng.integers(0, size, queries)
+    noise = np.abs(rng.normal(0, 0.02, (queries, dimension))).astype(np.float32)
+    elapsed = np.empty(queries)
+    matched = 0
+    for query, target in enumerate(targets.tolist()):
+        signature = signatures[target] + noise[query]
+        signature /= np.linalg.norm(signature)
+        start = time.perf_counter()
+        car_id = bank.match(signature, frame_idx, lats[target], lons[target])
+        elapsed[query] = (time.perf_counter() - start) * 1000
+        matched += car_id == target
+    return float(np.median(elapsed)), float(np.percentile(elapsed, 99)), matched / queries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 2000, 4096, 8192])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'vehicles':>8} {'p50 ms':>8} {'p99 ms':>8} {'matched':>8}")
+    for size in args.sizes:
+        p50, p99, matched = run(size, args.queries, args.seed)
+        print(f"{size:>8} {p50:>8.3f} {p99:>8.3f} {matched:>8.1%}")
@@ -0,0 +1,104 @@
+"""
+Check the Douglas-Peucker path simplification against a recursive reference and
+measure its speed and the size of the exported GeoJSON.
+
+Usage:
+    python3 -m benchmarks.simplification --vehicles 200 --frames 3000 --tolerance 1.0
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_car_features
+from geoprocessing.map_utils import export_for_geo_json
+from geoprocessing.simplification import douglas_peucker, to_local_meters
+
+
+def segment_distances(points: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    line = end - start
+    length_sq = line @ line
+    offsets = points - start
+    if length_sq > 0:
+        offsets = offsets - np.clip(offsets @ line / length_sq, 0, 1)[:, None] * line
+    return np.hypot(offsets[:, 0], offsets[:, 1])
+
+
+def douglas_peucker_reference(points: np.ndarray, tolerance: float) -> list:
+    """
+    Textbook recursive Douglas-Peucker, returns the indices of the kept points.
+    """
+    if len(points) < 3:
+        return list(range(len(points)))
+    distances = segment_distances(points[1:-1], points[0], points[-1])
+    furthest = int(np.argmax(distances)) + 1
+    if distances[furthest - 1] <= tolerance:
+        return [0, len(points) - 1]
+    left = douglas_peucker_reference(points[: furthest + 1], tolerance)
+    right = douglas_peucker_reference(points[furthest:], tolerance)
+    return left[:-1] + [furthest + index for index in right]
+
+
+def max_deviation(points: np.ndarray, keep: np.ndarray) -> float:
+    """
+    Largest distance of a removed point from the simplified path.
+    """
+    kept = np.flatnonzero(keep)
+    deviation = 0.0
+    for start, end in zip(kept[:-1], kept[1:]):
+        if end - start > 1:
+            distances = segment_distances(points[start + 1 : end], points[start], points[end])
+            deviation = max(deviation, float(distances.max()))
+    return deviation
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vehicles", type=int, default=200)
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--tolerance", type=float, default=1.0)
+    args = parser.parse_args()
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10 * args.frames))
+
+    features = synthetic_car_features(args.vehicles, args.frames)
+    paths = {}
+    for feature in features:
+        paths.setdefault(feature["properties"]["vehicle_id"], []).append(
+            feature["geometry"]["coordinates"]
+        )
+    paths = [to_local_meters(np.array(path)) for path in paths.values()]
+
+    start = time.perf_counter()
+    masks = [douglas_peucker(path, args.tolerance) for path in paths]
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    references = [douglas_peucker_reference(path, args.tolerance) for path in paths]
+    reference_elapsed = time.perf_counter() - start
+
+    for path, keep, reference in zip(paths, masks, references):
+        assert np.flatnonzero(keep).tolist() == reference, "differs from the reference"
+        assert max_deviation(path, keep) <= args.tolerance + 1e-9, "tolerance exceeded"
+
+    kept = sum(int(keep.sum()) for keep in masks)
+    print(f"{len(features)} points in {len(paths)} paths, {kept} kept")
+    print(f"{'simplifier':<12} {'seconds':>9} {'points/s':>12}")
+    print(f"{'iterative':<12} {elapsed:>9.4f} {len(features) / elapsed:>12.0f}")
+    print(f"{'recursive':<12} {reference_elapsed:>9.4f} {len(features) / reference_elapsed:>12.0f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        full_path = os.path.join(directory, "full.json")
+        simplified_path = os.path.join(directory, "simplified.json")
+        export_for_geo_json(features, full_path)
+        export_for_geo_json(
+            features, simplified_path, simplify_tolerance_meters=args.tolerance
+        )
+        full_size = os.path.getsize(full_path)
+        simplified_size = os.path.getsize(simplified_path)
+    print(
+        f"pathGEO.json {full_size / 2**20:.1f} MB -> {simplified_size / 2**20:.2f} MB"
+        f" ({full_size / simplified_size:.1f}x smaller)"
+    )
@@ -0,0 +1,336 @@
+"""
+Measure the throughput and memory of the pipeline hot paths on synthetic video and telemetry.
+
+Runs offline on the CPU: the clip, the SRT telemetry and the vehicle paths are generated,
+and the full tracker runs with a stub detector that returns the drawn boxes. Results are
+written as JSON, and a previous report can be passed to flag the cases that got slower.
+
+Usage:
+    python3 -m benchmarks.suite --output report.json
+    python3 -m benchmarks.suite --output new.json --compare report.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+import sklearn
+
+from benchmarks.reference import map_to_coordinates
+from benchmarks.synthetic import (
+    synthetic_car_features,
+    write_synthetic_srt,
+    write_synthetic_video,
+)
+from geoprocessing.map_utils import export_for_geo_json
+from geoprocessing.projection import GroundProjector
+from geoprocessing.simplification import remove_outliers_with_dbscan
+from parse_srt import parse_srt, parse_srt_columns
+from preprocessing.drone_data import load_drone_data, save_telemetry
+from main import CarTracker
+from config import Config
+
+
+class _Array:
+    """
+    The part of the tensor interface `Detections.from_boxes` uses.
+    """
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+    def cpu(self):
+        return self
+
+    def numpy(self) -> np.ndarray:
+        return self.values
+
+
+class StubBoxes:
+    def __init__(self, xyxy: np.ndarray, track_ids: np.ndarray):
+        self.xyxy = _Array(xyxy.astype(np.float32))
+        self.conf = _Array(np.full(len(xyxy), 0.9, dtype=np.float32))
+        self.cls = _Array(np.full(len(xyxy), 2.0, dtype=np.float32))  # car
+        self.id = _Array(track_ids.astype(np.float32))
+
+    def __len__(self) -> int:
+        return len(self.xyxy.values)
+
+
+class StubDetector:
+    """
+    Returns the boxes drawn on the synthetic clip, one frame after the other, scaled to the
+    size of the frames it gets. Stands in for YOLO so the rest of the pipeline is measured.
+    """
+
+    def __init__(self, boxes: np.ndarray, width: int):
+        """
+        Args:
+            boxes: (frames, vehicles, 4) box corners of every vehicle from `write_synthetic_video`
+            width: Width of the video frames in pixels
+        """
+        self.boxes = boxes
+        self.width = width
+        self.track_ids = np.arange(1, boxes.shape[1] + 1)
+        self.frame_idx = 0
+
+    def detect_objects(self, frame: np.ndarray) -> StubBoxes:
+        scale = frame.shape[1] / self.width
+        boxes = StubBoxes(self.boxes[self.frame_idx] * scale, self.track_ids)
+        self.frame_idx += 1
+        return boxes
+
+    def detect_objects_batch(self, frames: list) -> list:
+        return [self.detect_objects(frame) for frame in frames]
+
+
+def measure(func, repeat: int) -> dict:
+    """
+    Time the best of several runs of a function, then run it once more tracing its memory.
+
+    Args:
+        func: The function to measure, called without arguments
+        repeat: Number of timed runs
+    Returns:
+        dict: The best time in seconds and the peak traced memory in MB
+    """
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(elapsed), "peak_mb": peak / 2**20}
+
+
+def run_tracker(boxes: np.ndarray, width: int, pipelined: bool) -> None:
+    """
+    Run the full recognition over the synthetic clip set in `Config`.
+    """
+    Config.PIPELINE_ENABLED = pipelined
+    with CarTracker(features_path=Config.GEOJSON_STREAM_PATH) as tracker:
+        tracker.run_recognition(StubDetector(boxes, width))
+
+
+def run_suite(args: argparse.Namespace, directory: str) -> list:
+    """
+    Generate the inputs in `directory` and measure every case.
+
+    Returns:
+        list: One result per case with its name, the processed items and the measurements
+    """
+    results = []
+
+    def case(name: str, items: int, unit: str, func) -> None:
+        result = {"name": name, "items": items, "unit": unit, **measure(func, args.repeat)}
+        result["items_per_second"] = items / result["seconds"]
+        results.append(result)
+        print(
+            f"{name:<32} {result['seconds']:>9.4f} {result['items_per_second']:>14.0f}"
+            f" {unit + '/s':<10} {result['peak_mb']:>9.1f}"
+        )
+
+    print(f"{'case':<32} {'seconds':>9} {'throughput':>14} {'':<10} {'peak MB':>9}")
+
+    srt_path = os.path.join(directory, "flight.SRT")
+    write_synthetic_srt(srt_path, args.telemetry_frames, seed=args.seed)
+    case("parse_srt", args.telemetry_frames, "frames", lambda: parse_srt(srt_path))
+    case(
+        "parse_srt_columns",
+        args.telemetry_frames,
+        "frames",
+        lambda: parse_srt_columns(srt_path),
+    )
+
+    telemetry = load_drone_data(Config.DRONE_DATA_PATH)
+    rng = np.random.default_rng(args.seed)
+    xs = rng.uniform(0, Config.CAMERA_RESOLUTION_WIDTH, args.points)
+    ys = rng.uniform(0, Config.CAMERA_RESOLUTION_HEIGHT, args.points)
+    frames = rng.integers(0, len(telemetry), args.points)
+
+    def map_points() -> None:
+        for x, y, frame_idx in zip(xs.tolist(), ys.tolist(), frames.tolist()):
+            map_to_coordinates(x, y, telemetry[frame_idx])
+
+    projector = GroundProjector(
+        Config.SENSOR_WIDTH, Config.CAMERA_RESOLUTION_WIDTH, Config.CAMERA_RESOLUTION_HEIGHT
+    )
+    frame_telemetry = telemetry.data[frames]
+
+    def project_points() -> None:
+        projector.project(
+            xs,
+            ys,
+            frame_telemetry["latitude"],
+            frame_telemetry["longitude"],
+            frame_telemetry["abs_alt"],
+            frame_telemetry["focal_len"],
+            frame_telemetry["gb_yaw"],
+            np.zeros(args.points, dtype=bool),
+        )
+
+    case("map_to_coordinates", args.points, "points", map_points)
+    case("GroundProjector.project", args.points, "points", project_points)
+
+    features = synthetic_car_features(args.path_vehicles, args.path_frames, seed=args.seed)
+    geojson_path = os.path.join(directory, "paths.json")
+    case(
+        "remove_outliers_with_dbscan",
+        len(features),
+        "points",
+        # The radius in degrees the export used before, this function works on raw coordinates
+        lambda: remove_outliers_with_dbscan(features, eps=0.00001, min_samples=3),
+    )
+    case(
+        "export_for_geo_json",
+        len(features),
+        "points",
+        lambda: export_for_geo_json(
+            features,
+            geojson_path,
+            eps_meters=Config.OUTLIER_EPS_METERS,
+            min_samples=Config.OUTLIER_MIN_SAMPLES,
+            workers=Config.EXPORT_WORKERS,
+            simplify_tolerance_meters=Config.SIMPLIFY_TOLERANCE_METERS,
+        ),
+    )
+
+    video_path = os.path.join(directory, "flight.avi")
+    boxes = write_synthetic_video(
+        video_path,
+        args.video_frames,
+        vehicle_count=args.vehicles,
+        width=args.width,
+        height=args.height,
+        seed=args.seed,
+    )
+    Config.VIDEO_PATH = video_path
+    case(
+        "CarTracker (sequential)",
+        args.video_frames,
+        "frames",
+        lambda: run_tracker(boxes, args.width, pipelined=False),
+    )
+    case(
+        "CarTracker (pipelined)",
+        args.video_frames,
+        "frames",
+        lambda: run_tracker(boxes, args.width, pipelined=True),
+    )
+    return results
+
+
+def configure(directory: str, args: argparse.Namespace) -> None:
+    """
+    Point the tracker at the synthetic inputs and keep its outputs in `directory`.
+    """
+    telemetry_path = os.path.join(directory, "parsedSRT.npy")
+    srt_path = os.path.join(directory, "telemetry.SRT")
+    write_synthetic_srt(srt_path, max(args.video_frames, args.telemetry_frames), seed=args.seed)
+    save_telemetry(telemetry_path, parse_srt_columns(srt_path))
+
+    Config.DRONE_DATA_PATH = telemetry_path
+    Config.VIDEO_OFFSET_MS = 0
+    Config.CAMERA_RESOLUTION_WIDTH = args.width
+    Config.CAMERA_RESOLUTION_HEIGHT = args.height
+    Config.GEOJSON_OUTPUT_PATH = os.path.join(directory, "pathGEO.json")
+    Config.GEOJSON_STREAM_PATH = os.path.join(directory, "pathGEO.ndjson")
+    Config.CAR_IMAGE_PATH = os.path.join(directory, "vehicles")
+    os.makedirs(Config.CAR_IMAGE_PATH)
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+def compare(results: list, baseline_path: str, tolerance: float) -> list:
+    """
+    Compare the throughput of every case with a previous report.
+
+    Args:
+        results: The results of this run
+        baseline_path: Path to the previous report
+        tolerance: Allowed relative slowdown, e.g. 0.2 for 20 %
+    Returns:
+        list: The names of the cases slower than the tolerance allows
+    """
+    with open(baseline_path, "r") as file:
+        baseline = {result["name"]: result for result in json.load(file)["results"]}
+
+    regressions = []
+    print(f"\n{'case':<32} {'baseline/s':>14} {'now/s':>14} {'change':>8}")
+    for result in results:
+        previous = baseline.get(result["name"])
+        if previous is None:
+            continue
+        change = result["items_per_second"] / previous["items_per_second"] - 1
+        flag = ""
+        if change < -tolerance:
+            regressions.append(result["name"])
+            flag = "  REGRESSION"
+        print(
+            f"{result['name']:<32} {previous['items_per_second']:>14.0f}"
+            f" {result['items_per_second']:>14.0f} {change:>+8.1%}{flag}"
+        )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--video-frames", type=int, default=300)
+    parser.add_argument("--vehicles", type=int, default=8, help="vehicles in view")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--telemetry-frames", type=int, default=20_000)
+    parser.add_argument("--points", type=int, default=20_000, help="pixels to georeference")
+    parser.add_argument("--path-vehicles", type=int, default=100)
+    parser.add_argument("--path-frames", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case, the best counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_report.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="a previous report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure(directory, args)
+        results = run_suite(args, directory)
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "environment": environment(),
+        "parameters": vars(args),
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Saved the report to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"Slower than the baseline: {', '.join(regressions)}")
+            sys.exit(1)
@@ -0,0 +1,175 @@
+import math
+
+import cv2
+import numpy as np
+
+SRT_BLOCK = """{index}
+{start} --> {end}
+<font size="28">FrameCnt: {index}, DiffTime: {diff_time}ms
+{date} {time}
+[iso: 100] [shutter: 1/798.21] [fnum: 2.8] [ev: 0] [color_md : default] [ae_meter_md: 1] [focal_len: {focal_len:.2f}] [dzoom_ratio: 1.00], [latitude: {latitude:.6f}] [longitude: {longitude:.6f}] [rel_alt: {rel_alt:.3f} abs_alt: {abs_alt:.3f}] [gb_yaw: {gb_yaw:.1f} gb_pitch: -89.9 gb_roll: 0.0] </font>
+
+"""
+
+
+def _srt_time(milliseconds: int, separator: str = ",") -> str:
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}"
+
+
+def write_synthetic_srt(
+    path: str,
+    frame_count: int,
+    fps: float = 30,
+    start_ms: int = (17 * 3600 + 38 * 60 + 3) * 1000,
+    seed: int = 0,
+) -> None:
+    """
+    Write a DJI-style SRT file of a drone flying a slow curve.
+
+    Args:
+        path: Path to the SRT file
+        frame_count: Number of frames
+        fps: Frame rate of the matching video
+        start_ms: Time of day of the first frame in milliseconds
+        seed: Seed of the telemetry noise
+    """
+    rng = np.random.default_rng(seed)
+    frame_ms = 1000 / fps
+    with open(path, "w", encoding="utf-8") as file:
+        for i in range(frame_count):
+            t = i / fps
+            offset = round(i * frame_ms)
+            file.write(
+                SRT_BLOCK.format(
+                    index=i + 1,
+                    start=_srt_time(offset),
+                    end=_srt_time(round((i + 1) * frame_ms)),
+                    diff_time=round(frame_ms),
+                    date="2024-12-09",
+                    time=_srt_time(start_ms + offset, "."),
+                    focal_len=24,
+                    latitude=48.267013 + 2e-5 * t,
+                    longitude=25.914562 + 1e-5 * math.sin(t / 20),
+                    rel_alt=102.229 + rng.normal(0, 0.05),
+                    abs_alt=426.185 + rng.normal(0, 0.05),
+                    gb_yaw=-65.8 + 10 * math.sin(t / 30),
+                )
+            )
+
+
+def synthetic_car_features(
+    vehicle_count: int,
+    frame_count: int,
+    seed: int = 0,
+    jitter_meters: float = 0.2,
+    start_ms: int = (17 * 3600 + 38 * 60 + 3) * 1000,
+) -> list:
+    """
+    Generate the GeoJSON point features of cars driving along straight roads with a
+    few turns, in the format written by `CarTracker.export_trajectory`.
+
+    Args:
+        vehicle_count: Number of cars
+        frame_count: Number of frames every car is tracked for
+        seed: Seed of the paths and the detection jitter
+        jitter_meters: Standard deviation of the detected position around the road
+        start_ms: Time of day of the first frame in milliseconds
+    Returns:
+        list: GeoJSON feature dictionaries, ordered by frame
+    """
+    rng = np.random.default_rng(seed)
+    meters_per_degree = 111_320
+    lat0, lon0 = 48.267013, 25.914562
+    positions = []
+    for _ in range(vehicle_count):
+        heading = rng.uniform(0, 2 * math.pi)
+        turns = rng.integers(0, frame_count, size=2)
+        headings = np.full(frame_count, heading)
+        for turn in turns:
+            headings[turn:] += rng.choice([-1, 1]) * math.pi / 2
+        speed = rng.uniform(5, 15) / 30  # meters per frame at 30 fps
+        steps = np.stack([np.cos(headings), np.sin(headings)], axis=1) * speed
+        path = rng.uniform(-200, 200, size=2) + np.cumsum(steps, axis=0)
+        path += rng.normal(0, jitter_meters, size=path.shape)
+        positions.append(path)
+
+    features = []
+    for frame_idx in range(frame_count):
+        frame_time = _srt_time(start_ms + round(frame_idx * 1000 / 30), ":")
+        for car_id, path in enumerate(positions, start=1):
+            east, north = path[frame_idx]
+            features.append(
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Point",
+                        "coordinates": [
+                            lon0 + east / (meters_per_degree * math.cos(math.radians(lat0))),
+                            lat0 + north / meters_per_degree,
+                        ],
+                    },
+                    "properties": {
+                        "vehicle_id": f"vehicle_{car_id}",
+                        "timestamp": f"2024-12-09T{frame_time[:-3]}Z",
+                        "color": "#FF0000",
+                        "frame_time": frame_time,
+                        "frame_idx": frame_idx,
+                        "confidence": "0.9000",
+                        "delay": car_id == 1,
+                    },
+                }
+            )
+    return features
+
+
+def write_synthetic_video(
+    path: str,
+    frame_count: int,
+    vehicle_count: int = 8,
+    width: int = 1920,
+    height: int = 1080,
+    fps: float = 30,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Write an aerial-looking clip of rectangles (vehicles) driving across a textured ground.
+    The clip is Motion JPEG, which OpenCV can write and read without extra codecs.
+
+    Args:
+        path: Path to the `.avi` file
+        frame_count: Number of frames
+        vehicle_count: Number of vehicles in view at any time
+        width: Width of the frames in pixels
+        height: Height of the frames in pixels
+        fps: Frame rate
+        seed: Seed of the ground texture and the vehicle paths
+    Returns:
+        np.ndarray: (frame_count, vehicle_count, 4) box corners of every vehicle, in pixels
+    """
+    rng = np.random.default_rng(seed)
+    ground = cv2.GaussianBlur(
+        rng.integers(60, 120, (height, width, 3), dtype=np.uint8), (0, 0), sigmaX=3
+    )
+    sizes = rng.uniform(0.025, 0.04, size=(vehicle_count, 1)) * width * np.array([1, 0.5])
+    starts = rng.uniform(0, 1, size=(vehicle_count, 2)) * [width, height]
+    velocities = rng.uniform(-1, 1, size=(vehicle_count, 2)) * width / (fps * 10)
+    colors = rng.integers(150, 255, size=(vehicle_count, 3)).tolist()
+
+    travel = starts + np.arange(frame_count)[:, None, None] * velocities
+    # Vehicles leaving the frame come back on the other side
+    centers = np.mod(travel, [width, height])
+    margin = sizes.max()
+    centers = np.clip(centers, margin, [width - margin, height - margin])
+    boxes = np.concatenate([centers - sizes / 2, centers + sizes / 2], axis=2)
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    for frame_boxes in boxes.round().astype(int):
+        frame = ground.copy()
+        for (x1, y1, x2, y2), color in zip(frame_boxes.tolist(), colors):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness=-1)
+        writer.write(frame)
+    writer.release()
+    return boxes
@@ -0,0 +1,93 @@
+"""
+Compare full-frame detection with tiled detection, with and without skipping unchanged tiles.
+
+Detecting every tile on every frame is the reference: full-frame detection shows how many
+small vehicles it misses, and skipping the tiles without motion how much of the tiled
+recall it keeps for its speedup.
+
+Usage:
+    python3 -m benchmarks.tiling --frames 300 --tile-size 1024 --detection-size 1280
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.adaptive_stride import accuracy
+from main import CarTracker, create_detector
+from config import Config
+
+
+def run(tiled: bool, motion_threshold: float, frame_count: int, features_path: str) -> tuple:
+    """
+    Detect the vehicles of the first frames of the video with a fresh detector and tracker.
+
+    Args:
+        tiled: Detect on tiles instead of the whole frame
+        motion_threshold: `Config.TILE_MOTION_THRESHOLD` of the run, 0 detects every tile
+        frame_count: Number of frames to process
+        features_path: Where the tracker may stream its GeoJSON features
+    Returns:
+        tuple: Frames per second, the share of skipped tiles and the detections of every frame
+    """
+    Config.TILED_DETECTION = tiled
+    Config.TILE_MOTION_THRESHOLD = motion_threshold
+    detector = create_detector()
+    tracker = CarTracker(stop_frame=frame_count, features_path=features_path)
+    try:
+        start = time.perf_counter()
+        detections = [
+            detections
+            for _, _, detections in tracker.detect_frames(detector, tracker.read_frames())
+        ]
+        elapsed = time.perf_counter() - start
+    finally:
+        tracker.feature_sink.close()
+        tracker.crop_writer.close()
+        tracker.frame_source.close()
+
+    skipped = 0.0
+    if tiled:
+        skipped = detector.tiles_skipped / max(detector.tiles_detected + detector.tiles_skipped, 1)
+    return len(detections) / elapsed, skipped, detections
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--tile-size", type=int, default=Config.TILE_SIZE)
+    parser.add_argument(
+        "--detection-size",
+        type=int,
+        default=Config.DETECTION_IMAGE_SIZE,
+        help="longer side of the frames in full-frame mode, the tiles are always full resolution",
+    )
+    parser.add_argument(
+        "--motion-thresholds", type=float, nargs="+", default=[Config.TILE_MOTION_THRESHOLD]
+    )
+    args = parser.parse_args()
+    Config.TILE_SIZE = args.tile_size
+
+    with tempfile.TemporaryDirectory() as directory:
+        features_path = os.path.join(directory, "features.ndjson")
+        Config.DETECTION_IMAGE_SIZE = None
+        baseline_fps, _, baseline = run(True, 0, args.frames, features_path)
+        runs = [("tiled, every tile", baseline_fps, 0.0, baseline)]
+        for threshold in args.motion_thresholds:
+            name = f"tiled, motion > {threshold:g}"
+            runs.append((name, *run(True, threshold, args.frames, features_path)))
+        Config.DETECTION_IMAGE_SIZE = args.detection_size
+        runs.append(("full frame", *run(False, 0, args.frames, features_path)))
+
+    print(
+        f"{'mode':<24} {'frames/s':>10} {'speedup':>8} {'skipped':>8} {'boxes/frame':>12}"
+        f" {'recall':>7} {'precision':>10} {'mean IoU':>9}"
+    )
+    for name, fps, skipped, detections in runs:
+        recall, precision, mean_iou = accuracy(baseline, detections)
+        boxes = sum(len(frame.xyxy) for frame in detections) / max(len(detections), 1)
+        print(
+            f"{name:<24} {fps:>10.2f} {fps / baseline_fps:>7.2f}x {skipped:>8.1%} {boxes:>12.1f}"
+            f" {recall:>7.3f} {precision:>10.3f} {mean_iou:>9.3f}"
+        )
@@ -0,0 +1,38 @@
+import os
+import pickle
+
+
+def save_checkpoint(path: str, state: dict) -> None:
+    """
+    Write a checkpoint atomically, a crash while writing keeps the previous checkpoint.
+
+    Args:
+        path: Path to the checkpoint file
+        state: The state to save
+    """
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as file:
+        pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path: str) -> dict:
+    """
+    Load a checkpoint written with `save_checkpoint`.
+
+    Args:
+        path: Path to the checkpoint file
+    Returns:
+        dict: The saved state, or None if there is no checkpoint
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+def remove_checkpoint(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
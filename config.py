@@ -1,7 +1,8 @@
 class Config:
     YOLO_MODEL_PATH = "./runs/detect/train_small_v11_35epochs/weights/best.pt"
-    DRONE_DATA_PATH = "parsedSRT.json"
+    DRONE_DATA_PATH = "parsedSRT.npy"  # or the parsedSRT.json
     VIDEO_PATH = "video_low_bit.mp4"
+    VIDEO_OFFSET_MS = 0  # start of the video in the flight recording, e.g. for clips cut with ffmpeg -ss
     GEOJSON_OUTPUT_PATH = "./demo/frontend/src/pathGEO.json"
     CAR_IMAGE_PATH = "./demo/frontend/src/assets/images/vehicles"
 
@@ -13,6 +14,66 @@ class Config:
     IOU_THRESHOLD = 0.9
     CLOSE_TO_FRAME_PIXELS = 20
     IMAGE_PADDING = 20
+    CROP_WRITER_WORKERS = 2  # threads encoding the vehicle images
+    CROP_FLUSH_INTERVAL = 300  # frames between writes of the improved vehicle images
     INTERESTED_CLASS_IDS = [1, 2, 3, 4, 7]
     DISPLACEMENT_FRAME_COUNT_THRESHOLD = 10
     DISPLACEMENT_YAW_THRESHOLD = 4
+
+    PIPELINE_ENABLED = True  # decode, detect and post-process frames in parallel stages
+    FRAME_QUEUE_SIZE = 8  # decoded frames waiting for the detector
+    RESULT_QUEUE_SIZE = 8  # detected frames waiting for post-processing
+    DETECTION_BATCH_SIZE = 4  # frames per YOLO forward pass
+    DETECTION_IMAGE_SIZE = None  # longer side the frames are downscaled to for YOLO (e.g. 640), None for full resolution
+    MAX_FRAME_STRIDE = 1  # frames between YOLO runs on steady segments, 1 detects every frame
+    DETECTION_BACKEND = "torch"  # torch, onnx, openvino or openvino_int8; the weights are exported once
+    DETECTION_THREADS = None  # CPU threads of the inference, None for the runtime default
+    DETECTION_WARMUP_RUNS = 2  # forward passes on blank frames before the video starts
+    EXPORT_IMAGE_SIZE = None  # input size of the exported models, None for the training size
+    INT8_CALIBRATION_DATA = None  # dataset YAML for the INT8 calibration, e.g. the training data.yaml
+    TILED_DETECTION = False  # detect on overlapping full-resolution tiles, for small vehicles
+    TILE_SIZE = 1024  # side of the tiles in pixels, also the model input size in tiled mode
+    TILE_OVERLAP = 0.2  # fraction of a tile shared with its neighbours
+    TILE_MERGE_THRESHOLD = 0.5  # intersection over the smaller box to merge boxes across tiles
+    TILE_MOTION_THRESHOLD = 4.0  # mean gray level change to detect a tile again, 0 for every frame
+    TILE_REFRESH_INTERVAL = 30  # frames between detections of all tiles, moving or not
+
+    SHARD_OVERLAP_FRAMES = 60  # frames shared by neighbouring shards to stitch track ids
+    SHARD_ID_STRIDE = 1_000_000  # vehicle id offset between shards
+    SHARD_STITCH_IOU_THRESHOLD = 0.5
+
+    CHECKPOINT_PATH = "checkpoint.pkl"
+    CHECKPOINT_INTERVAL = 1000  # frames between checkpoints
+
+    BATCH_OUTPUT_DIR = "./flights"  # --batch writes the outputs of every flight to a directory here
+    BATCH_HASH_SAMPLES = 64  # 1 MB blocks hashed to detect a changed video, None for the whole file
+
+    DETECTION_CACHE_DIR = None  # record the tracked detections here for --from-detections, e.g. "./detections"
+
+    PROFILE_TRACE_PATH = "profile_trace.json"  # Chrome trace written by --profile
+
+    GEOJSON_STREAM_PATH = "./demo/frontend/src/pathGEO.ndjson"  # features as they are detected
+    GEOJSON_BATCH_SIZE = 1000  # features buffered before appending them to the stream
+    TRACK_RETIRE_FRAMES = 150  # frames without a detection before a track is written out
+    REID_ENABLED = False  # re-link tracks lost for a few frames by color and predicted position
+    REID_BANK_SIZE = 4096  # vehicles kept for re-linking, the least recently seen are evicted
+    REID_MAX_AGE_FRAMES = 150  # frames a lost vehicle can still be re-linked
+    REID_GATE_METERS = 10.0  # distance from the predicted position a new track must be within
+    REID_MIN_SIMILARITY = 0.8  # Bhattacharyya coefficient of the color histograms to re-link
+    REID_UPDATE_INTERVAL = 10  # frames between updates of the color histogram of a vehicle
+
+    OUTLIER_EPS_METERS = 1.1  # DBSCAN radius within a vehicle path, about 0.00001° of latitude
+    OUTLIER_MIN_SAMPLES = 3
+    EXPORT_WORKERS = 4  # threads used by the outlier filter
+    SIMPLIFY_TOLERANCE_METERS = None  # Douglas-Peucker tolerance of the exported paths (e.g. 1.0), None to keep all points
+    PATH_TILES_DIR = None  # also export path tiles here, e.g. "./demo/frontend/public/tiles"
+    PATH_TILE_ZOOMS = (12, 14, 16, 18)  # zoom levels the paths are simplified and tiled for
+    PATH_TILE_WINDOW_MS = 60_000  # time window of every tile file
+    PATH_TILE_TOLERANCE_PIXELS = 1.0  # Douglas-Peucker tolerance of every zoom level, on screen
+
+    LIVE_MAX_LATENCY_MS = 500  # live frames older than this are dropped instead of processed
+    LIVE_FRAME_BUFFER = 2  # newest live frames kept while the detector is busy
+    LIVE_TELEMETRY_WINDOW = 300  # recent live telemetry samples kept for interpolation
+    PUBLISHER_HOST = "127.0.0.1"
+    PUBLISHER_PORT = 8765  # live positions are served at http://host:port/events
+    PUBLISHER_QUEUE_SIZE = 100  # events buffered per subscriber before the oldest are dropped
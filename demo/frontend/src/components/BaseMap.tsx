@@ -1,7 +1,9 @@
-import { useEffect } from "react";
+import { useEffect, useState } from "react";
 import { Map, Source, Layer } from "react-map-gl";
-import type { LayerProps } from "react-map-gl";
+import type { LayerProps, MapRef } from "react-map-gl";
 import PathJson from "@/pathGEO.json";
+import { usePathTiles } from "@/hooks/use-path-tiles";
+import type { MapView } from "@/hooks/use-path-tiles";
 
 import { useAtom } from "jotai";
 import {
@@ -31,6 +33,8 @@ const startingPoint = {
 PathJson.features.unshift(startingPoint);
 
 const MAPBOX_TOKEN = import.meta.env.VITE_APP_PUBLIC_MAPBOX_TOKEN as string;
+// e.g. "/tiles" when the paths are exported to demo/frontend/public/tiles
+const PATH_TILES_URL = import.meta.env.VITE_APP_PATH_TILES_URL as string | undefined;
 
 const pointLayer: LayerProps = {
   id: "point",
@@ -43,6 +47,29 @@ const pointLayer: LayerProps = {
   },
 };
 
+const pathLayer: LayerProps = {
+  id: "path",
+  type: "line",
+  layout: { "line-join": "round", "line-cap": "round" },
+  paint: {
+    "line-color": ["get", "color"],
+    "line-width": 3,
+  },
+};
+
+const viewOf = (map: ReturnType<MapRef["getMap"]>): MapView => {
+  const bounds = map.getBounds()!;
+  return {
+    bounds: [
+      bounds.getWest(),
+      bounds.getSouth(),
+      bounds.getEast(),
+      bounds.getNorth(),
+    ],
+    zoom: map.getZoom(),
+  };
+};
+
 export default function BaseMap() {
   const [visibleData, setVisibleData] = useAtom(visibleDataAtom);
   const [currentIndex, setCurrentIndex] = useAtom(currentIndexAtom);
@@ -51,6 +78,8 @@ export default function BaseMap() {
     foundVehiclesImagesAtom
   );
   const [mapStyle] = useAtom(mapStyleAtom);
+  const [view, setView] = useState<MapView | null>(null);
+  const pathTiles = usePathTiles(PATH_TILES_URL, view);
 
   useEffect(() => {
     if (!isAnimating) return;
@@ -157,7 +186,14 @@ export default function BaseMap() {
           mapStyle={mapStyle}
           mapboxAccessToken={MAPBOX_TOKEN}
           interactiveLayerIds={["point"]} // Ensures hover only works for point layers
+          onLoad={(event) => setView(viewOf(event.target))}
+          onMoveEnd={(event) => setView(viewOf(event.target))}
         >
+          {PATH_TILES_URL && (
+            <Source type="geojson" data={pathTiles.data}>
+              <Layer {...pathLayer} />
+            </Source>
+          )}
           <Source type="geojson" data={visibleData}>
             <Layer {...pointLayer} />
           </Source>
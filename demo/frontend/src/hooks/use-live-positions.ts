@@ -0,0 +1,47 @@
+import * as React from "react"
+import { useSetAtom } from "jotai"
+
+import { foundVehiclesImagesAtom, visibleDataAtom } from "@/atoms"
+
+type PositionsEvent = {
+  frame_idx: number
+  frame_time: string
+  latency_ms: number
+  features: GeoJSON.Feature[]
+}
+
+// Adds the positions published by `python3 main.py --live ...` to the map as they arrive
+export function useLivePositions(url: string | undefined) {
+  const setVisibleData = useSetAtom(visibleDataAtom)
+  const setFoundVehiclesImages = useSetAtom(foundVehiclesImagesAtom)
+
+  React.useEffect(() => {
+    if (!url) return
+
+    const source = new EventSource(url)
+    source.onmessage = (message) => {
+      const event: PositionsEvent = JSON.parse(message.data)
+      if (event.features.length === 0) return
+
+      setVisibleData((prevData) => ({
+        ...prevData,
+        features: [...prevData.features, ...event.features],
+      }))
+      setFoundVehiclesImages((vehicles) => {
+        const newVehicles = event.features
+          .map((feature) => feature.properties!)
+          .filter(
+            (properties) =>
+              !vehicles.some((vehicle) => vehicle.vehicle_id === properties.vehicle_id)
+          )
+          .map((properties) => ({
+            vehicle_id: properties.vehicle_id,
+            confidence: parseFloat(properties.confidence),
+            color: properties.color,
+          }))
+        return newVehicles.length ? [...vehicles, ...newVehicles] : vehicles
+      })
+    }
+    return () => source.close()
+  }, [url, setVisibleData, setFoundVehiclesImages])
+}
@@ -0,0 +1,108 @@
+import * as React from "react"
+
+type PathTilesIndex = {
+  start_time: string
+  duration_ms: number
+  window_ms: number
+  zooms: number[]
+  bounds: [number, number, number, number] | null
+  tiles: Record<string, Record<string, number[]>>
+  vehicles: { vehicle_id: string; color: string; start_ms: number; end_ms: number }[]
+}
+
+export type MapView = {
+  bounds: [number, number, number, number] // west, south, east, north
+  zoom: number
+}
+
+const EMPTY: GeoJSON.FeatureCollection = { type: "FeatureCollection", features: [] }
+
+function tileX(longitude: number, zoom: number) {
+  return Math.floor(((longitude + 180) / 360) * 2 ** zoom)
+}
+
+function tileY(latitude: number, zoom: number) {
+  const radians = (latitude * Math.PI) / 180
+  return Math.floor(((1 - Math.asinh(Math.tan(radians)) / Math.PI) / 2) * 2 ** zoom)
+}
+
+// Cuts a path piece to its points recorded up to `timeMs`, null if it starts later
+function untilTime(feature: GeoJSON.Feature, timeMs: number): GeoJSON.Feature | null {
+  const times: number[] = feature.properties?.times ?? []
+  let count = 0
+  while (count < times.length && times[count] <= timeMs) count++
+  if (count === times.length) return feature
+  if (count === 0) return null
+
+  const geometry = feature.geometry as GeoJSON.LineString
+  const coordinates = geometry.coordinates.slice(0, count)
+  const keptTimes = times.slice(0, count)
+  if (count === 1) {
+    // a LineString needs two points
+    coordinates.push(coordinates[0])
+    keptTimes.push(keptTimes[0])
+  }
+  return {
+    ...feature,
+    geometry: { ...geometry, coordinates },
+    properties: { ...feature.properties, times: keptTimes },
+  }
+}
+
+// Loads the vehicle paths exported with `Config.PATH_TILES_DIR` for the tiles in view,
+// at the closest exported zoom level, and up to `timeMs` after the flight start if given
+export function usePathTiles(url: string | undefined, view: MapView | null, timeMs?: number) {
+  const [index, setIndex] = React.useState<PathTilesIndex | null>(null)
+  const [data, setData] = React.useState<GeoJSON.FeatureCollection>(EMPTY)
+  const cache = React.useRef(new Map<string, Promise<GeoJSON.Feature[]>>())
+
+  React.useEffect(() => {
+    if (!url) return
+    fetch(`${url}/index.json`)
+      .then((response) => response.json())
+      .then(setIndex)
+  }, [url])
+
+  React.useEffect(() => {
+    if (!url || !index || !view) return
+
+    const zoom =
+      [...index.zooms].reverse().find((level) => level <= Math.ceil(view.zoom)) ??
+      Math.min(...index.zooms)
+    const lastWindow = timeMs === undefined ? Infinity : Math.floor(timeMs / index.window_ms)
+    const [west, south, east, north] = view.bounds
+    const paths = []
+    for (let x = tileX(west, zoom); x <= tileX(east, zoom); x++) {
+      for (let y = tileY(north, zoom); y <= tileY(south, zoom); y++) {
+        for (const window of index.tiles[zoom]?.[`${x}/${y}`] ?? []) {
+          if (window > lastWindow) continue
+          const path = `${url}/${zoom}/${x}/${y}/${window}.json`
+          if (!cache.current.has(path)) {
+            cache.current.set(
+              path,
+              fetch(path)
+                .then((response) => response.json())
+                .then((collection: GeoJSON.FeatureCollection) => collection.features)
+            )
+          }
+          paths.push(cache.current.get(path)!)
+        }
+      }
+    }
+
+    let cancelled = false
+    Promise.all(paths).then((tiles) => {
+      if (cancelled) return
+      const features =
+        timeMs === undefined
+          ? tiles.flat()
+          : tiles.flat().flatMap((feature) => untilTime(feature, timeMs) ?? [])
+      setData({ type: "FeatureCollection", features })
+    })
+    return () => {
+      cancelled = true
+    }
+  }, [url, index, view, timeMs])
+
+  return { index, data }
+}
@@ -2,6 +2,7 @@ import BaseMap from "@/components/BaseMap";
 import FoundVehiclesList from "@/components/FoundVehiclesList";
 import DroneFootageVideo from "@/components/DroneFootageVideo";
 import PathJson from "@/pathGEO.json";
+import { useLivePositions } from "@/hooks/use-live-positions";
 
 import { useAutoAnimate } from "@formkit/auto-animate/react";
 
@@ -60,6 +61,8 @@ export default function Home() {
 
   const setMapStyle = useSetAtom(mapStyleAtom);
 
+  useLivePositions(import.meta.env.VITE_APP_LIVE_EVENTS_URL);
+
   const restartAnimation = () => {
     setVisibleData({ type: "FeatureCollection", features: [] });
     setCurrentIndex(0);
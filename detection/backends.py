@@ -0,0 +1,110 @@
+import os
+
+# Ultralytics export settings of every inference backend, None keeps the PyTorch weights
+BACKENDS = {
+    "torch": None,
+    "onnx": {"format": "onnx", "dynamic": True},
+    "openvino": {"format": "openvino", "dynamic": True},
+    "openvino_int8": {"format": "openvino", "dynamic": True, "int8": True},
+}
+
+
+def exported_model_path(model_path: str, backend: str) -> str:
+    """
+    Get where Ultralytics writes the export of a model for a backend.
+
+    Args:
+        model_path: Path to the PyTorch `.pt` weights
+        backend: One of `BACKENDS`
+    Returns:
+        str: Path to the exported model file or directory
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    settings = BACKENDS[backend]
+    if settings is None:
+        return model_path
+
+    stem = os.path.splitext(model_path)[0]
+    if settings["format"] == "onnx":
+        return f"{stem}.onnx"
+    return f"{stem}_int8_openvino_model" if settings.get("int8") else f"{stem}_openvino_model"
+
+
+def export_model(
+    model_path: str,
+    backend: str,
+    image_size: int = None,
+    calibration_data: str = None,
+) -> str:
+    """
+    Export the PyTorch weights for a backend, unless an export newer than the weights exists.
+
+    Args:
+        model_path: Path to the PyTorch `.pt` weights
+        backend: One of `BACKENDS`
+        image_size: Input size of the exported model, None for the training size of the model
+        calibration_data: Dataset YAML used to calibrate the INT8 quantization,
+            None for the Ultralytics default
+    Returns:
+        str: Path to the model to load for the backend
+    """
+    path = exported_model_path(model_path, backend)
+    if path == model_path:
+        return path
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(model_path):
+        return path
+
+    from ultralytics import YOLO
+
+    settings = dict(BACKENDS[backend])
+    if image_size:
+        settings["imgsz"] = image_size
+    if settings.get("int8") and calibration_data:
+        settings["data"] = calibration_data
+    print(f"Exporting {model_path} for {backend}")
+    return str(YOLO(model_path).export(**settings))
+
+
+def set_backend_threads(model, threads: int) -> bool:
+    """
+    Limit the CPU threads of a loaded model.
+    PyTorch is limited process-wide; ONNX Runtime sessions and OpenVINO models are
+    created again with the thread count, so this must run after the first inference,
+    which is when Ultralytics loads them.
+
+    Args:
+        model: An Ultralytics `YOLO` model after its first inference
+        threads: Number of threads
+    Returns:
+        bool: False if the runtime of the model was not recognized and only PyTorch was limited
+    """
+    import torch
+
+    torch.set_num_threads(threads)
+    backend = getattr(getattr(model, "predictor", None), "model", None)
+    if backend is None or getattr(backend, "pt", False):
+        return backend is not None
+
+    if getattr(backend, "onnx", False) and hasattr(backend, "session"):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        backend.session = onnxruntime.InferenceSession(
+            str(backend.w), options, providers=backend.session.get_providers()
+        )
+        return True
+
+    if getattr(backend, "xml", False) and hasattr(backend, "ov_compiled_model"):
+        backend.ov_compiled_model = backend.core.compile_model(
+            backend.ov_model,
+            device_name="CPU",
+            config={
+                "PERFORMANCE_HINT": getattr(backend, "inference_mode", "LATENCY"),
+                "INFERENCE_NUM_THREADS": threads,
+            },
+        )
+        return True
+    return False
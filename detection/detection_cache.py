@@ -0,0 +1,167 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from .yolo import Detections
+
+# One row per tracked detection, in frame order
+DETECTION_DTYPE = np.dtype(
+    [
+        ("frame_idx", np.int32),
+        ("track_id", np.int32),  # vehicle id after the id offset and re-linking, 0 untracked
+        ("class_id", np.int16),
+        ("conf", np.float32),
+        ("xyxy", np.float64, 4),  # full-resolution pixels, as the tracker georeferenced them
+    ]
+)
+# One row per processed frame, including the frames without detections
+FRAME_DTYPE = np.dtype([("frame_idx", np.int32), ("time_ms", np.float64)])
+
+
+def _save_npy(raw_path: str, npy_path: str, dtype: np.dtype) -> None:
+    """
+    Turn a file of raw records into a `.npy` file that can be memory-mapped.
+    """
+    count = os.path.getsize(raw_path) // dtype.itemsize
+    with open(npy_path, "wb") as file, open(raw_path, "rb") as raw:
+        np.lib.format.write_array_header_2_0(
+            file,
+            {
+                "descr": np.lib.format.dtype_to_descr(dtype),
+                "fortran_order": False,
+                "shape": (count,),
+            },
+        )
+        shutil.copyfileobj(raw, file)
+    os.remove(raw_path)
+
+
+class DetectionCacheWriter:
+    """
+    Records the tracked detections of every frame, so the georeferencing and the export can
+    be run again with other settings without the detector (see `load_detection_cache`).
+
+    Rows are appended to raw files while the video is processed and turned into
+    memory-mappable `.npy` files on `close`, next to a `meta.json` with what is needed to
+    replay them. A run resumed from a checkpoint continues the files of the interrupted run.
+    """
+
+    def __init__(self, directory: str, meta: dict, resume_frame: int = None):
+        """
+        Args:
+            directory: The directory to write the cache to
+            meta: Properties of the run saved in `meta.json`, e.g. the video and its frame rate
+            resume_frame: The frame a resumed run continues at, the rows of this frame and the
+                later ones are dropped; None to start a new cache
+        """
+        self.directory = directory
+        self.meta = meta
+        os.makedirs(directory, exist_ok=True)
+        self.detections_path = os.path.join(directory, "detections.bin")
+        self.frames_path = os.path.join(directory, "frames.bin")
+        if resume_frame is None:
+            for path in (self.detections_path, self.frames_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        elif not os.path.exists(self.frames_path):
+            print(f"The detection cache misses the frames before {resume_frame}")
+        else:
+            self._truncate(self.detections_path, DETECTION_DTYPE, resume_frame)
+            self._truncate(self.frames_path, FRAME_DTYPE, resume_frame)
+        self.detections_file = open(self.detections_path, "ab")
+        self.frames_file = open(self.frames_path, "ab")
+
+    @staticmethod
+    def _truncate(path: str, dtype: np.dtype, frame_idx: int) -> None:
+        """
+        Drop the rows of a raw file from `frame_idx` on, and a row cut short by a crash.
+        """
+        count = os.path.getsize(path) // dtype.itemsize
+        if count:
+            rows = np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+            count = int(np.searchsorted(rows["frame_idx"], frame_idx))
+            del rows
+        with open(path, "r+b") as file:
+            file.truncate(count * dtype.itemsize)
+
+    def write(self, frame_idx: int, time_ms: float, detections: Detections) -> None:
+        """
+        Record the detections of a frame.
+
+        Args:
+            frame_idx: The index of the frame
+            time_ms: The presentation time of the frame in the video
+            detections: The detections of the frame, with vehicle ids as track ids
+        """
+        rows = np.empty(len(detections.conf), dtype=DETECTION_DTYPE)
+        rows["frame_idx"] = frame_idx
+        rows["track_id"] = detections.track_id
+        rows["class_id"] = detections.class_id
+        rows["conf"] = detections.conf
+        rows["xyxy"] = detections.xyxy
+        self.detections_file.write(rows.tobytes())
+        self.frames_file.write(np.array([(frame_idx, time_ms)], dtype=FRAME_DTYPE).tobytes())
+
+    def flush(self) -> None:
+        """
+        Write the buffered rows, e.g. before a checkpoint that a resumed run continues from.
+        """
+        self.detections_file.flush()
+        self.frames_file.flush()
+
+    def close(self, save: bool = True) -> None:
+        """
+        Save the cache as `.npy` files and its `meta.json`.
+
+        Args:
+            save: False to only close the raw files, e.g. for a run to resume
+        """
+        self.detections_file.close()
+        self.frames_file.close()
+        if not save:
+            return
+        for path, dtype in (
+            (self.detections_path, DETECTION_DTYPE),
+            (self.frames_path, FRAME_DTYPE),
+        ):
+            _save_npy(path, os.path.splitext(path)[0] + ".npy", dtype)
+        with open(os.path.join(self.directory, "meta.json"), "w") as file:
+            json.dump(self.meta, file, indent=2)
+
+
+def load_detection_cache(directory: str) -> tuple:
+    """
+    Open a detection cache written by `DetectionCacheWriter`, memory-mapped.
+
+    Args:
+        directory: The directory of the cache
+    Returns:
+        tuple: The meta data, the frames (`FRAME_DTYPE`) and the detections (`DETECTION_DTYPE`)
+    """
+    with open(os.path.join(directory, "meta.json"), "r") as file:
+        meta = json.load(file)
+    frames = np.load(os.path.join(directory, "frames.npy"), mmap_mode="r")
+    detections = np.load(os.path.join(directory, "detections.npy"), mmap_mode="r")
+    return meta, frames, detections
+
+
+def frame_detections(detections: np.ndarray, start: int, stop: int) -> Detections:
+    """
+    Get the detections of one frame from the cached rows.
+
+    Args:
+        detections: The cached detections
+        start: The first row of the frame
+        stop: The end of the rows of the frame (exclusive)
+    Returns:
+        Detections: The detections as the tracker got them
+    """
+    rows = detections[start:stop]
+    return Detections(
+        xyxy=np.array(rows["xyxy"]),
+        conf=np.array(rows["conf"]),
+        class_id=rows["class_id"].astype(int),
+        track_id=rows["track_id"].astype(int),
+    )
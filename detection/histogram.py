@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
 
+HSV_SIGNATURE_BINS = (18, 8)  # hue and saturation bins of `hsv_signature`
+
 def compute_color_histogram(image: np.ndarray, bbox: tuple) -> np.ndarray:
     """
     Compute the color histogram of the region of interest (ROI) in the image
@@ -31,3 +33,38 @@ def compare_histograms(hist1: np.ndarray, hist2: np.ndarray, method: int) -> flo
         float: The similarity score between the two histograms
     """
     return cv2.compareHist(hist1, hist2, method)
+
+def hsv_signature(
+    image: np.ndarray,
+    x1: int,
+    y1: int,
+    x2: int,
+    y2: int,
+    bins: tuple = HSV_SIGNATURE_BINS,
+    inset: float = 0.15,
+) -> np.ndarray:
+    """
+    Compute the hue-saturation histogram of a bounding box as a unit vector, so the
+    Bhattacharyya coefficient of two signatures is their dot product.
+
+    Args:
+        image (numpy.ndarray): The input image.
+        x1 (int): The x-coordinate of the top-left corner of the bounding box
+        y1 (int): The y-coordinate of the top-left corner of the bounding box
+        x2 (int): The x-coordinate of the bottom-right corner of the bounding box
+        y2 (int): The y-coordinate of the bottom-right corner of the bounding box
+        bins (tuple): Number of hue and saturation bins
+        inset (float): Fraction of the box cut off on every side to leave out the road
+    Returns:
+        numpy.ndarray: The square root of the normalized histogram,
+            float32 of length `bins[0] * bins[1]`
+    """
+    dx = int((x2 - x1) * inset)
+    dy = int((y2 - y1) * inset)
+    roi = image[y1 + dy : max(y2 - dy, y1 + dy + 1), x1 + dx : max(x2 - dx, x1 + dx + 1)]
+    hsv_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv_roi], [0, 1], None, list(bins), [0, 180, 0, 256]).ravel()
+    total = hist.sum()
+    if total > 0:
+        hist /= total
+    return np.sqrt(hist, dtype=np.float32)
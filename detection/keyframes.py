@@ -0,0 +1,77 @@
+import numpy as np
+
+from .yolo import Detections
+
+
+class AdaptiveStride:
+    """
+    Chooses how many frames to skip between two detector runs (keyframes).
+
+    The stride doubles after every keyframe that shows the same vehicles as the previous
+    one, up to `max_stride`, and drops back to 1 as soon as a vehicle appears or
+    disappears, or when the caller reports that the camera is turning too fast.
+    """
+
+    def __init__(self, max_stride: int):
+        self.max_stride = max(1, max_stride)
+        self.stride = 1
+        self.track_ids = None
+
+    def update(self, track_ids: np.ndarray) -> int:
+        """
+        Adapt the stride to the tracks found on a keyframe.
+
+        Args:
+            track_ids: The track ids of the keyframe detections
+        Returns:
+            int: The number of frames until the next keyframe
+        """
+        track_ids = frozenset(track_ids.tolist()) - {0}
+        if track_ids != self.track_ids:
+            self.stride = 1
+        else:
+            self.stride = min(2 * self.stride, self.max_stride)
+        self.track_ids = track_ids
+        return self.stride
+
+    def reset(self) -> int:
+        """
+        Detect on every frame again, e.g. while the drone yaw is unstable.
+
+        Returns:
+            int: The number of frames until the next keyframe
+        """
+        self.stride = 1
+        return self.stride
+
+
+def interpolate_detections(start: Detections, end: Detections, fraction: float) -> Detections:
+    """
+    Estimate the detections of a frame between two keyframes by moving the boxes of the
+    tracks found on both keyframes linearly. The motion of the drone is part of the box
+    motion, so this compensates it as long as it is steady between the keyframes.
+
+    Args:
+        start: The detections of the earlier keyframe
+        end: The detections of the later keyframe
+        fraction: Position of the frame between the keyframes, from 0 (start) to 1 (end)
+    Returns:
+        Detections: The interpolated detections of the tracks seen on both keyframes
+    """
+    track_ids, start_index, end_index = np.intersect1d(
+        start.track_id[start.track_id != 0],
+        end.track_id[end.track_id != 0],
+        assume_unique=True,
+        return_indices=True,
+    )
+    start_index = np.flatnonzero(start.track_id != 0)[start_index]
+    end_index = np.flatnonzero(end.track_id != 0)[end_index]
+
+    start_boxes = start.xyxy[start_index]
+    end_boxes = end.xyxy[end_index]
+    return Detections(
+        xyxy=start_boxes + (end_boxes - start_boxes) * fraction,
+        conf=np.minimum(start.conf[start_index], end.conf[end_index]),
+        class_id=end.class_id[end_index],
+        track_id=track_ids,
+    )
@@ -0,0 +1,157 @@
+import math
+
+import numpy as np
+
+METERS_PER_DEGREE = 111_320
+
+
+class ReIDBank:
+    """
+    Appearance and last position of recently seen vehicles, for re-linking a vehicle whose
+    track was lost (e.g. in a shadow) and came back with a new track id.
+
+    The signatures of all vehicles are rows of one matrix, so a new track is compared with
+    every lost vehicle in a single matrix-vector product. Candidates must have been lost for
+    at most `max_age` frames and be within `gate_meters` (plus `gate_growth_meters` per lost
+    frame) of where they would be at their last speed. When the bank is full, the vehicle
+    updated least recently is evicted.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        capacity: int = 4096,
+        max_age: int = 150,
+        gate_meters: float = 10.0,
+        gate_growth_meters: float = 0.2,
+        min_similarity: float = 0.8,
+        momentum: float = 0.8,
+    ):
+        """
+        Args:
+            dimension: Length of the appearance signatures
+            capacity: Maximum number of vehicles kept
+            max_age: Number of frames a lost vehicle can still be re-linked
+            gate_meters: Distance from the predicted position within which a new track
+                can be the vehicle
+            gate_growth_meters: Distance added to the gate for every frame the vehicle was lost
+            min_similarity: Minimum Bhattacharyya coefficient of the signatures to re-link
+            momentum: Weight of the stored signature when a new one of the same vehicle is added
+        """
+        self.capacity = capacity
+        self.max_age = max_age
+        self.gate_meters = gate_meters
+        self.gate_growth_meters = gate_growth_meters
+        self.min_similarity = min_similarity
+        self.momentum = momentum
+
+        self.signatures = np.zeros((capacity, dimension), dtype=np.float32)
+        self.car_ids = np.full(capacity, -1, dtype=np.int64)
+        self.last_frames = np.full(capacity, np.iinfo(np.int64).min // 2, dtype=np.int64)
+        self.positions = np.zeros((capacity, 2), dtype=np.float64)  # lat, lon
+        self.velocities = np.zeros((capacity, 2), dtype=np.float64)  # degrees per frame
+        self.slots = {}  # car id -> row
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, car_id: int) -> bool:
+        return car_id in self.slots
+
+    def _slot(self, car_id: int) -> int:
+        slot = self.slots.get(car_id)
+        if slot is not None:
+            return slot
+
+        if len(self.slots) < self.capacity:
+            slot = len(self.slots)
+        else:  # evict the vehicle updated least recently
+            slot = int(np.argmin(self.last_frames))
+            del self.slots[int(self.car_ids[slot])]
+        self.slots[car_id] = slot
+        self.car_ids[slot] = car_id
+        self.signatures[slot] = 0
+        self.velocities[slot] = 0
+        return slot
+
+    def update(
+        self,
+        car_id: int,
+        frame_idx: int,
+        lat: float,
+        lon: float,
+        signature: np.ndarray = None,
+    ) -> None:
+        """
+        Record where a vehicle was seen and, optionally, how it looked.
+
+        Args:
+            car_id: The ID of the vehicle
+            frame_idx: The index of the frame
+            lat: The latitude of the vehicle
+            lon: The longitude of the vehicle
+            signature: Its appearance signature, None to keep the stored one
+        """
+        is_new = car_id not in self.slots
+        slot = self._slot(car_id)
+        if not is_new:
+            gap = frame_idx - self.last_frames[slot]
+            if gap > 0:
+                velocity = (np.array([lat, lon]) - self.positions[slot]) / gap
+                self.velocities[slot] = 0.5 * self.velocities[slot] + 0.5 * velocity
+        self.positions[slot] = lat, lon
+        self.last_frames[slot] = frame_idx
+
+        if signature is not None:
+            if is_new or not self.signatures[slot].any():
+                self.signatures[slot] = signature
+            else:
+                blended = self.momentum * self.signatures[slot] + (1 - self.momentum) * signature
+                self.signatures[slot] = blended / max(np.linalg.norm(blended), 1e-12)
+
+    def match(
+        self,
+        signature: np.ndarray,
+        frame_idx: int,
+        lat: float,
+        lon: float,
+        exclude: set = None,
+    ) -> int:
+        """
+        Find the lost vehicle a new track most likely is.
+
+        Args:
+            signature: The appearance signature of the new track
+            frame_idx: The index of the frame the track appeared on
+            lat: The latitude of the new track
+            lon: The longitude of the new track
+            exclude: IDs of vehicles that can't be the track, e.g. those visible on the frame
+        Returns:
+            int: The ID of the vehicle, None if no lost vehicle is close and similar enough
+        """
+        if not self.slots:
+            return None
+        used = len(self.slots)  # rows are filled in order and reused on eviction
+        gaps = frame_idx - self.last_frames[:used]
+        candidates = (gaps > 0) & (gaps <= self.max_age)
+        for car_id in exclude or ():
+            slot = self.slots.get(car_id)
+            if slot is not None:
+                candidates[slot] = False
+        if not candidates.any():
+            return None
+
+        predicted = self.positions[:used] + self.velocities[:used] * gaps[:, None]
+        north = (predicted[:, 0] - lat) * METERS_PER_DEGREE
+        east = (predicted[:, 1] - lon) * METERS_PER_DEGREE * math.cos(math.radians(lat))
+        gates = self.gate_meters + self.gate_growth_meters * gaps
+        candidates &= north * north + east * east <= gates * gates
+        if not candidates.any():
+            return None
+
+        rows = np.flatnonzero(candidates)
+        similarities = self.signatures[rows] @ signature
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.min_similarity:
+            return None
+        return int(self.car_ids[rows[best]])
@@ -0,0 +1,302 @@
+import cv2
+import numpy as np
+
+from ultralytics.engine.results import Boxes
+from ultralytics.trackers.track import TRACKER_MAP
+from ultralytics.utils import IterableSimpleNamespace, yaml_load
+from ultralytics.utils.checks import check_yaml
+
+from .boxes import box_intersection_over_smaller
+from .yolo import YOLODetector
+
+MOTION_SCALE = 8  # frames are downscaled by this factor to look for motion
+
+
+def plan_tiles(width: int, height: int, tile_size: int, overlap: float) -> np.ndarray:
+    """
+    Cover a frame with square tiles overlapping by at least `overlap` of their size.
+    The last tile of every row and column is moved back inside the frame, so all tiles
+    have the same size unless the frame is smaller than a tile.
+
+    Args:
+        width: Width of the frame in pixels
+        height: Height of the frame in pixels
+        tile_size: Side of the tiles in pixels
+        overlap: Fraction of a tile shared with its neighbours
+    Returns:
+        np.ndarray: (n, 4) tiles in xyxy format
+    """
+
+    def starts(length: int) -> np.ndarray:
+        if length <= tile_size:
+            return np.zeros(1, dtype=int)
+        step = tile_size * (1 - overlap)
+        count = int(np.ceil((length - tile_size) / step)) + 1
+        return np.linspace(0, length - tile_size, count).round().astype(int)
+
+    xs, ys = np.meshgrid(starts(width), starts(height))
+    xs, ys = xs.ravel(), ys.ravel()
+    return np.column_stack(
+        [xs, ys, np.minimum(xs + tile_size, width), np.minimum(ys + tile_size, height)]
+    )
+
+
+def merge_tile_detections(
+    xyxy: np.ndarray, conf: np.ndarray, class_id: np.ndarray, threshold: float
+) -> np.ndarray:
+    """
+    Merge the boxes of a vehicle found on several overlapping tiles.
+    A vehicle cut by a tile edge has a truncated box on that tile, which overlaps its
+    full box on the neighbouring tile by a low IoU but a high intersection over the smaller
+    box. Boxes of the same class overlapping more than `threshold` that way are merged into
+    the most confident one, grown to cover them all.
+
+    Args:
+        xyxy: (n, 4) boxes in frame pixels
+        conf: (n,) confidence scores
+        class_id: (n,) class ids
+        threshold: Minimum intersection over the smaller box to merge two boxes
+    Returns:
+        np.ndarray: (m, 6) merged boxes as x1, y1, x2, y2, confidence, class id
+    """
+    order = np.argsort(-conf, kind="stable")
+    xyxy, conf, class_id = xyxy[order], conf[order], class_id[order]
+    overlaps = box_intersection_over_smaller(xyxy, xyxy) >= threshold
+    overlaps &= class_id[:, None] == class_id[None, :]
+
+    merged = []
+    used = np.zeros(len(xyxy), dtype=bool)
+    for index in range(len(xyxy)):
+        if used[index]:
+            continue
+        group = overlaps[index] & ~used
+        used |= group
+        boxes = xyxy[group]
+        merged.append(
+            [*boxes[:, :2].min(axis=0), *boxes[:, 2:].max(axis=0), conf[index], class_id[index]]
+        )
+    return np.array(merged, dtype=np.float32).reshape(-1, 6)
+
+
+def create_tracker(config: str, frame_rate: int = 30):
+    """
+    Create the Ultralytics tracker `model.track` would use, to track detections made
+    outside of it.
+
+    Args:
+        config: Tracker configuration, e.g. "botsort.yaml" or "bytetrack.yaml"
+        frame_rate: Frame rate of the video, sets how long lost tracks are kept
+    Returns:
+        The `BOTSORT` or `BYTETracker` instance
+    """
+    args = IterableSimpleNamespace(**yaml_load(check_yaml(config)))
+    return TRACKER_MAP[args.tracker_type](args=args, frame_rate=frame_rate)
+
+
+class TiledYOLODetector(YOLODetector):
+    """
+    Detects small vehicles on large frames by running the model on overlapping tiles at
+    their native resolution, all tiles of a frame in one batch. The boxes are merged
+    across tiles and tracked on the whole frame.
+
+    Tiles whose content did not change since they were last detected are skipped, and the
+    previous boxes inside them are kept; every `refresh_interval` frames all tiles are
+    detected again, so vehicles that stopped are not carried over forever.
+    """
+
+    def __init__(
+        self,
+        *args,
+        tile_size: int = 1024,
+        overlap: float = 0.2,
+        merge_threshold: float = 0.5,
+        motion_threshold: float = 4.0,
+        refresh_interval: int = 30,
+        tracker: str = "botsort.yaml",
+        **kwargs,
+    ):
+        """
+        Args:
+            tile_size: Side of the tiles in pixels, also the input size of the model
+            overlap: Fraction of a tile shared with its neighbours
+            merge_threshold: Minimum intersection over the smaller box to merge two boxes
+                found on different tiles
+            motion_threshold: Mean absolute change in gray levels above which a tile is
+                detected again, 0 to detect every tile on every frame
+            refresh_interval: Frames between detections of all tiles
+            tracker: Ultralytics tracker configuration
+            Other arguments are passed to `YOLODetector`
+        """
+        super().__init__(*args, **kwargs)
+        # predict() takes its default arguments from the overrides, so tiles aren't downscaled
+        self.model.overrides["imgsz"] = tile_size
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.merge_threshold = merge_threshold
+        self.motion_threshold = motion_threshold
+        self.refresh_interval = refresh_interval
+        self.tracker = create_tracker(tracker)
+        self.tiles = None
+        self.reference = None  # downscaled gray frame as of the last detection of every tile
+        self.previous = np.zeros((0, 6), dtype=np.float32)  # merged boxes of the last frame
+        self.frame_count = 0
+        self.tiles_detected = 0
+        self.tiles_skipped = 0
+
+    def warm_up(self, width: int, height: int, batch_size: int = 1, runs: int = 2) -> float:
+        tile_count = len(plan_tiles(width, height, self.tile_size, self.overlap))
+        return super().warm_up(
+            min(width, self.tile_size),
+            min(height, self.tile_size),
+            batch_size * tile_count,
+            runs,
+        )
+
+    def reset_tracker(self) -> None:
+        self.tracker.reset()
+        self.tiles = None
+        self.reference = None
+        self.previous = np.zeros((0, 6), dtype=np.float32)
+        self.frame_count = 0
+
+    def active_tiles(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Find the tiles of a frame to detect, and remember their content for the next frames.
+
+        Args:
+            frame: The frame
+        Returns:
+            np.ndarray: Boolean mask of the tiles to detect
+        """
+        height, width = frame.shape[:2]
+        if self.tiles is None:
+            self.tiles = plan_tiles(width, height, self.tile_size, self.overlap)
+
+        gray = cv2.cvtColor(
+            cv2.resize(
+                frame,
+                (max(1, width // MOTION_SCALE), max(1, height // MOTION_SCALE)),
+                interpolation=cv2.INTER_AREA,
+            ),
+            cv2.COLOR_BGR2GRAY,
+        )
+        cells = self.tiles // MOTION_SCALE
+        if (
+            self.reference is None
+            or self.motion_threshold <= 0
+            or self.frame_count % self.refresh_interval == 0
+        ):
+            active = np.ones(len(self.tiles), dtype=bool)
+        else:
+            change = cv2.absdiff(gray, self.reference)
+            active = np.array(
+                [
+                    change[y1 : max(y2, y1 + 1), x1 : max(x2, x1 + 1)].mean()
+                    > self.motion_threshold
+                    for x1, y1, x2, y2 in cells.tolist()
+                ]
+            )
+
+        if self.reference is None:
+            self.reference = gray
+        else:
+            for x1, y1, x2, y2 in cells[active].tolist():
+                self.reference[y1:y2, x1:x2] = gray[y1:y2, x1:x2]
+        self.frame_count += 1
+        return active
+
+    def merge(self, active: np.ndarray, results: list) -> np.ndarray:
+        """
+        Combine the boxes found on the detected tiles with the previous boxes whose center
+        lies in none of them.
+
+        Args:
+            active: Boolean mask of the detected tiles
+            results: The YOLO results of the detected tiles, in tile order
+        Returns:
+            np.ndarray: (n, 6) merged boxes as x1, y1, x2, y2, confidence, class id
+        """
+        tiles = self.tiles[active]
+        centers = (self.previous[:, :2] + self.previous[:, 2:4]) / 2
+        in_active = (
+            (centers[:, None] >= tiles[None, :, :2]) & (centers[:, None] < tiles[None, :, 2:])
+        ).all(axis=2).any(axis=1)
+        detections = [self.previous[~in_active]]
+
+        for (x1, y1, _, _), result in zip(tiles.tolist(), results):
+            boxes = result.boxes
+            detections.append(
+                np.column_stack(
+                    [
+                        boxes.xyxy.cpu().numpy().reshape(-1, 4) + [x1, y1, x1, y1],
+                        boxes.conf.cpu().numpy(),
+                        boxes.cls.cpu().numpy(),
+                    ]
+                )
+            )
+
+        detections = np.concatenate(detections)
+        self.previous = merge_tile_detections(
+            detections[:, :4], detections[:, 4], detections[:, 5], self.merge_threshold
+        )
+        return self.previous
+
+    def track(self, frame: np.ndarray, merged: np.ndarray) -> Boxes:
+        """
+        Update the tracker with the merged boxes of a frame.
+
+        Returns:
+            Boxes: The tracked boxes, with ids, in the format of a YOLO result
+        """
+        tracks = self.tracker.update(Boxes(merged, frame.shape[:2]), frame)
+        if not len(tracks):
+            return Boxes(np.zeros((0, 6), dtype=np.float32), frame.shape[:2])
+        return Boxes(tracks[:, :-1], frame.shape[:2])  # the last column is the detection index
+
+    def detect_objects_batch(self, frames: list) -> list:
+        """
+        Detect objects on the changed tiles of several frames with a single forward pass,
+        then merge and track the boxes one frame at a time, in order.
+
+        Args:
+            frames (list): List of consecutive frames
+        Returns:
+            list: List of bounding boxes for detected objects, one entry per frame
+        """
+        actives = [self.active_tiles(frame) for frame in frames]
+        crops = [
+            frame[y1:y2, x1:x2]
+            for frame, active in zip(frames, actives)
+            for x1, y1, x2, y2 in self.tiles[active].tolist()
+        ]
+        results = []
+        if crops:
+            results = self.model.predict(
+                crops,
+                conf=self.conf_threshold,
+                iou=self.iou_threshold,
+                batch=len(crops),
+                verbose=False,
+            )
+        self.tiles_detected += len(crops)
+        self.tiles_skipped += sum(len(active) for active in actives) - len(crops)
+
+        batch_boxes = []
+        start = 0
+        for frame, active in zip(frames, actives):
+            count = int(active.sum())
+            merged = self.merge(active, results[start : start + count])
+            start += count
+            batch_boxes.append(self.track(frame, merged))
+        return batch_boxes
+
+    def detect_objects(self, frame: np.ndarray) -> Boxes:
+        """
+        Detect objects on the changed tiles of a frame and track them.
+
+        Args:
+            frame: The frame
+        Returns:
+            Boxes: The tracked boxes
+        """
+        return self.detect_objects_batch([frame])[0]
@@ -0,0 +1,145 @@
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import cv2
+import numpy as np
+
+
+def crop_score(confidence: float, x1: int, y1: int, x2: int, y2: int) -> float:
+    """
+    Rank a crop of a vehicle: confident detections of a fully visible (large) box come first.
+
+    Args:
+        confidence: The confidence score of the detection
+        x1: The x-coordinate of the top-left corner of the bounding box
+        y1: The y-coordinate of the top-left corner of the bounding box
+        x2: The x-coordinate of the bottom-right corner of the bounding box
+        y2: The y-coordinate of the bottom-right corner of the bounding box
+    Returns:
+        float: The score of the crop, higher is better
+    """
+    return float(confidence) * max(0, x2 - x1) * max(0, y2 - y1)
+
+
+class VehicleCropWriter:
+    """
+    Keeps the best crop of every vehicle and writes it as a JPEG in background threads.
+
+    `offer` is cheap enough to call for every detection: the crop is copied only when it
+    beats the best crop seen so far. Improved crops are encoded and written on `flush`,
+    after which only their score is kept in memory. Files are replaced atomically, and a
+    write never overwrites a newer crop of the same vehicle.
+    """
+
+    def __init__(self, directory: str, padding: int = 0, workers: int = 2, profiler=None):
+        """
+        Args:
+            directory: The directory to write the crops to
+            padding: Number of pixels added around the bounding boxes
+            workers: Number of encoder threads
+            profiler: A `StageProfiler` timing the writes, None to not time them
+        """
+        self.profiler = profiler
+        self.directory = directory
+        self.padding = padding
+        self.scores = {}
+        self.pending = {}
+        self.versions = {}
+        self.written = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def path(self, car_id: int) -> str:
+        return f"{self.directory}/vehicle_{car_id}.jpg"
+
+    def offer(
+        self,
+        car_id: int,
+        frame: np.ndarray,
+        x1: int,
+        y1: int,
+        x2: int,
+        y2: int,
+        confidence: float,
+    ) -> bool:
+        """
+        Keep the crop of a detection if it is the best one of its vehicle so far.
+
+        Args:
+            car_id: The ID of the vehicle
+            frame: The frame of the detection
+            x1: The x-coordinate of the top-left corner of the bounding box
+            y1: The y-coordinate of the top-left corner of the bounding box
+            x2: The x-coordinate of the bottom-right corner of the bounding box
+            y2: The y-coordinate of the bottom-right corner of the bounding box
+            confidence: The confidence score of the detection
+        Returns:
+            bool: True if the crop replaced the previous best crop of the vehicle
+        """
+        score = crop_score(confidence, x1, y1, x2, y2)
+        if score <= self.scores.get(car_id, -1.0):
+            return False
+
+        y1_pad = max(0, y1 - self.padding)
+        y2_pad = min(frame.shape[0], y2 + self.padding)
+        x1_pad = max(0, x1 - self.padding)
+        x2_pad = min(frame.shape[1], x2 + self.padding)
+        self.scores[car_id] = score
+        self.pending[car_id] = frame[y1_pad:y2_pad, x1_pad:x2_pad].copy()
+        return True
+
+    def flush(self, wait: bool = False) -> None:
+        """
+        Queue the improved crops for writing.
+
+        Args:
+            wait: Block until all queued crops are on the disk
+        """
+        pending, self.pending = self.pending, {}
+        for car_id, crop in pending.items():
+            version = self.versions[car_id] = self.versions.get(car_id, 0) + 1
+            self.futures.append(self.executor.submit(self._write, car_id, version, crop))
+
+        done = [future for future in self.futures if wait or future.done()]
+        self.futures = [future for future in self.futures if not (wait or future.done())]
+        for future in done:
+            future.result()  # re-raise write errors
+
+    def _write(self, car_id: int, version: int, crop: np.ndarray) -> None:
+        with self.profiler.stage("crop_write") if self.profiler else nullcontext():
+            self._encode_and_replace(car_id, version, crop)
+
+    def _encode_and_replace(self, car_id: int, version: int, crop: np.ndarray) -> None:
+        ok, encoded = cv2.imencode(".jpg", crop)
+        if not ok:
+            raise ValueError(f"Could not encode the image of vehicle {car_id}")
+
+        path = self.path(car_id)
+        temporary_path = f"{path}.{version}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(encoded.tobytes())
+        with self.lock:
+            if version > self.written.get(car_id, 0):
+                os.replace(temporary_path, path)
+                self.written[car_id] = version
+            else:
+                os.remove(temporary_path)
+
+    def close(self) -> None:
+        """
+        Write the remaining crops and stop the encoder threads.
+        """
+        try:
+            self.flush(wait=True)
+        finally:
+            self.executor.shutdown(wait=True)
@@ -1,11 +1,106 @@
+import time
+
+from typing import NamedTuple
+
+import numpy as np
 from ultralytics import YOLO
 
+from .backends import export_model, set_backend_threads
+
+
+class Detections(NamedTuple):
+    """
+    Tracked detections of a single frame as plain NumPy arrays.
+    """
+
+    xyxy: np.ndarray  # (n, 4) box corners in pixels
+    conf: np.ndarray  # (n,) confidence scores
+    class_id: np.ndarray  # (n,) class ids
+    track_id: np.ndarray  # (n,) tracker ids, 0 for untracked boxes
+
+    @classmethod
+    def from_boxes(cls, boxes) -> "Detections":
+        """
+        Convert the boxes of an Ultralytics result.
+
+        Args:
+            boxes: The `Boxes` of a YOLO result
+        Returns:
+            Detections: The detections of the frame
+        """
+        count = len(boxes)
+        return cls(
+            xyxy=boxes.xyxy.cpu().numpy().reshape(count, 4),
+            conf=boxes.conf.cpu().numpy(),
+            class_id=boxes.cls.cpu().numpy().astype(int),
+            track_id=np.zeros(count, dtype=int)
+            if boxes.id is None
+            else boxes.id.cpu().numpy().astype(int),
+        )
+
 
 class YOLODetector:
-    def __init__(self, model_path: str, conf_threshold: float = 0.8, iou_threshold: float = 0.9):
-        self.model = YOLO(model_path)
+    def __init__(
+        self,
+        model_path: str,
+        conf_threshold: float = 0.8,
+        iou_threshold: float = 0.9,
+        backend: str = "torch",
+        threads: int = None,
+        image_size: int = None,
+        calibration_data: str = None,
+    ):
+        """
+        Args:
+            model_path: Path to the PyTorch `.pt` weights
+            conf_threshold: Minimum confidence of a detection
+            iou_threshold: IoU threshold of the non-maximum suppression
+            backend: Inference backend from `BACKENDS`, the weights are exported for it once
+            threads: Number of CPU threads of the inference, None for the runtime default
+            image_size: Input size of exported models, None for the training size of the model
+            calibration_data: Dataset YAML to calibrate the INT8 quantization with
+        """
+        self.backend = backend
+        self.model_path = export_model(model_path, backend, image_size, calibration_data)
+        self.model = YOLO(self.model_path, task="detect")
         self.conf_threshold = conf_threshold
         self.iou_threshold = iou_threshold
+        self.threads = threads
+        self.warmed_up = False
+
+    def warm_up(self, width: int, height: int, batch_size: int = 1, runs: int = 2) -> float:
+        """
+        Load the backend and run it on blank frames, so the first video frames don't pay for
+        the lazy model loading and the graph compilation. Applies the thread count, which
+        needs the loaded backend. The tracker is not touched.
+
+        Args:
+            width: Width of the frames the detector will get
+            height: Height of the frames the detector will get
+            batch_size: Largest number of frames per forward pass
+            runs: Number of forward passes per batch size
+        Returns:
+            float: Seconds the warm-up took
+        """
+        start = time.perf_counter()
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        for _ in range(runs):
+            for size in {1, batch_size}:
+                self.model.predict(
+                    [frame] * size, conf=self.conf_threshold, batch=size, verbose=False
+                )
+        if self.threads and not set_backend_threads(self.model, self.threads):
+            print(f"Could not set the thread count of the {self.backend} backend")
+        self.warmed_up = True
+        return time.perf_counter() - start
+
+    def reset_tracker(self) -> None:
+        """
+        Forget the tracks of the previous video, so the next video starts with fresh
+        track ids. The model stays loaded.
+        """
+        for tracker in getattr(getattr(self.model, "predictor", None), "trackers", []):
+            tracker.reset()
 
     def detect_objects(self, frame: str) -> list:
         """
@@ -20,3 +115,23 @@ class YOLODetector:
             frame, persist=True, conf=self.conf_threshold, iou=self.iou_threshold
         )
         return results[0].boxes
+
+    def detect_objects_batch(self, frames: list) -> list:
+        """
+        Detect objects in several frames with a single forward pass of the YOLO model.
+        Ultralytics updates the tracker with the results of the batch one frame at a time,
+        in order, so the track ids are the same as when calling `detect_objects` per frame.
+
+        Args:
+            frames (list): List of consecutive frames
+        Returns:
+            list: List of bounding boxes for detected objects, one entry per frame
+        """
+        results = self.model.track(
+            frames,
+            persist=True,
+            conf=self.conf_threshold,
+            iou=self.iou_threshold,
+            batch=len(frames),
+        )
+        return [result.boxes for result in results]
@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 
 def adjust_lat_long_with_direction(lat: float, lon: float, displacement: float, direction_deg: float) -> tuple:
     """
@@ -41,3 +43,28 @@ def adjust_lat_long_with_direction(lat: float, lon: float, displacement: float,
     
     return new_lat, new_lon
 
+
+def adjust_lat_long_with_direction_array(
+    lat: np.ndarray, lon: np.ndarray, displacement: np.ndarray, direction_deg: np.ndarray
+) -> tuple:
+    """
+    Vectorized version of `adjust_lat_long_with_direction`, all arguments are broadcast
+    against each other.
+
+    Args:
+        lat: Latitudes (in decimal degrees).
+        lon: Longitudes (in decimal degrees).
+        displacement: The total displacements (in meters).
+        direction_deg: Directions in degrees relative to the compass (0° = North, 90° = East).
+    Returns:
+        Tuple: Arrays of adjusted latitudes and longitudes (in decimal degrees).
+    """
+    direction_rad = np.radians(direction_deg)
+
+    displacement_x = displacement * np.sin(direction_rad)  # East-West (positive is East)
+    displacement_y = displacement * np.cos(direction_rad)  # North-South (positive is North)
+
+    new_lat = lat + displacement_y / 111320
+    new_lon = lon + displacement_x / (111320 * np.cos(np.radians(lat)))
+
+    return new_lat, new_lon
@@ -0,0 +1,81 @@
+import json
+import os
+
+
+class GeoJSONSink:
+    """
+    Appends GeoJSON features to a newline-delimited GeoJSON (NDJSON) file.
+    Features are buffered and written in batches, so readers of the file see the
+    positions shortly after they are detected and memory use doesn't grow with
+    the length of the flight.
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000, resume_offset: int = None):
+        """
+        Args:
+            path: Path to the NDJSON file
+            batch_size: Number of features to buffer before writing them
+            resume_offset: Continue a file truncated to this many bytes instead of starting a new one
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.buffer = []
+        if resume_offset is None:
+            self.file = open(path, "wb")
+        else:
+            os.truncate(path, resume_offset)
+            self.file = open(path, "ab")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, feature: dict) -> None:
+        """
+        Add a feature to the file.
+
+        Args:
+            feature: GeoJSON feature dictionary
+        """
+        self.buffer.append(json.dumps(feature))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.buffer:
+            self.file.write(("\n".join(self.buffer) + "\n").encode())
+            self.buffer = []
+        self.file.flush()
+
+    def tell(self) -> int:
+        """
+        Get the size of the file with all buffered features written, used to
+        resume the file from a checkpoint.
+        """
+        self.flush()
+        return self.file.tell()
+
+    def close(self) -> None:
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+def iter_ndjson_features(path: str):
+    """
+    Read the features of an NDJSON file one by one.
+
+    Args:
+        path: Path to the NDJSON file
+    Returns:
+        Iterator[tuple]: The byte offset, the raw JSON text and the parsed feature of every line
+    """
+    with open(path, "rb") as file:
+        offset = 0
+        for line in file:
+            line_offset, offset = offset, offset + len(line)
+            line = line.rstrip(b"\n")
+            if line:
+                yield line_offset, line.decode(), json.loads(line)
@@ -1,41 +1,195 @@
 import json
-from .simplification import remove_outliers_with_dbscan
+
+import numpy as np
+
+from .geojson_sink import iter_ndjson_features
+from .simplification import per_track_inlier_mask, simplify_paths_mask
+
+
+def filter_paths_mask(
+    coordinates: np.ndarray,
+    vehicle_ids: np.ndarray,
+    eps_meters: float = 2.0,
+    min_samples: int = 3,
+    min_points: int = 5,
+    workers: int = 1,
+    frame_indices: np.ndarray = None,
+    simplify_tolerance_meters: float = None,
+) -> np.ndarray:
+    """
+    Select the points that are kept in the exported paths: outliers are removed from every
+    vehicle path with DBSCAN, then vehicles with less than `min_points` remaining points are dropped.
+    Optionally the remaining paths are simplified with the Douglas-Peucker algorithm.
+
+    Args:
+        coordinates (np.ndarray): (n, 2) longitude and latitude of every point
+        vehicle_ids (np.ndarray): Vehicle id of every point
+        eps_meters (float): Maximum distance in meters between two points to be considered in the same neighborhood
+        min_samples (int): Minimum number of points to form a cluster
+        min_points (int): Minimum number of points of a vehicle path
+        workers (int): Number of threads for the neighbor search
+        frame_indices (np.ndarray): Frame index of every point, orders the points along their path
+        simplify_tolerance_meters (float): Maximum distance in meters of a removed point from the
+            simplified path, None to keep all points
+    Returns:
+        np.ndarray: Boolean mask of the points to keep
+    """
+    if not len(coordinates):
+        return np.zeros(0, dtype=bool)
+
+    keep = per_track_inlier_mask(
+        coordinates, vehicle_ids, eps_meters, min_samples, workers=workers
+    )
+    print(f"Removed {np.count_nonzero(~keep)} outliers from {len(coordinates)} paths")
+
+    _, vehicle_index = np.unique(vehicle_ids, return_inverse=True)
+    point_counts = np.bincount(vehicle_index, weights=keep)
+    keep &= point_counts[vehicle_index] >= min_points
+
+    if simplify_tolerance_meters is not None:
+        if frame_indices is None:
+            frame_indices = np.arange(len(coordinates))
+        kept = np.flatnonzero(keep)
+        keep[kept] = simplify_paths_mask(
+            np.asarray(coordinates)[kept],
+            np.asarray(vehicle_ids)[kept],
+            np.asarray(frame_indices)[kept],
+            simplify_tolerance_meters,
+        )
+        print(f"Simplified paths from {len(kept)} to {np.count_nonzero(keep)} points")
+    return keep
+
+
+def first_in_frame(frame_keys: np.ndarray) -> np.ndarray:
+    """
+    Find the first point of every frame, which delays the map animation until the next frame.
+
+    Args:
+        frame_keys (np.ndarray): Frame time of every exported point, in export order
+    Returns:
+        np.ndarray: Boolean mask, True for the first point of each frame
+    """
+    delays = np.zeros(len(frame_keys), dtype=bool)
+    if len(frame_keys):
+        delays[np.unique(frame_keys, return_index=True)[1]] = True
+    return delays
 
 
 def export_for_geo_json(
-    car_paths: list, output_path: str, eps: float = 0.00001, min_samples: int = 3
+    car_paths: list,
+    output_path: str,
+    eps_meters: float = 2.0,
+    min_samples: int = 3,
+    workers: int = 1,
+    simplify_tolerance_meters: float = None,
 ) -> None:
     """
     Export car paths to a GeoJSON file after removing outliers using DBSCAN.
+    The point that delays the animation is moved to the first kept point of every frame.
 
     Args:
         car_paths (list): List of GeoJSON feature dictionaries representing car paths
         output_path (str): Path to the output GeoJSON file
-        eps (float): Maximum distance between two points to be considered in the same neighborhood
+        eps_meters (float): Maximum distance in meters between two points to be considered in the same neighborhood
         min_samples (int): Minimum number of points to form a cluster
+        workers (int): Number of threads for the neighbor search
+        simplify_tolerance_meters (float): Maximum distance in meters of a removed point from the
+            simplified path, None to keep all points
     """
-    export_geo_format = {"type": "FeatureCollection", "features": []}
-
-    removed_outliers = remove_outliers_with_dbscan(
-        car_paths, eps=eps, min_samples=min_samples
-    )
-    print(
-        f"Removed {len(car_paths) - len(removed_outliers)} outliers from {len(car_paths)} paths"
+    frame_indices = [feature["properties"].get("frame_idx") for feature in car_paths]
+    keep = filter_paths_mask(
+        np.array([feature["geometry"]["coordinates"] for feature in car_paths]),
+        np.array([feature["properties"]["vehicle_id"] for feature in car_paths]),
+        eps_meters=eps_meters,
+        min_samples=min_samples,
+        workers=workers,
+        frame_indices=None if None in frame_indices else np.array(frame_indices),
+        simplify_tolerance_meters=simplify_tolerance_meters,
     )
+    features = [feature for feature, kept in zip(car_paths, keep) if kept]
+    frame_times = [feature["properties"]["frame_time"] for feature in features]
+    for index, delay in enumerate(first_in_frame(np.array(frame_times)).tolist()):
+        if features[index]["properties"]["delay"] != delay:
+            features[index] = {
+                **features[index],
+                "properties": {**features[index]["properties"], "delay": delay},
+            }
+    export_geo_format = {
+        "type": "FeatureCollection",
+        "features": features,
+    }
 
-    car_counts = {}
-    for feature in removed_outliers:
-        car_id = feature["properties"]["vehicle_id"]
-        car_counts[car_id] = car_counts.get(car_id, 0) + 1
+    with open(output_path, "w") as file:
+        json.dump(export_geo_format, file)
 
-    removed_outliers = [
-        feature
-        for feature in removed_outliers
-        if car_counts[feature["properties"]["vehicle_id"]] >= 5
-    ]
 
-    for feature in removed_outliers:
-        export_geo_format["features"].append(feature)
+def export_ndjson_for_geo_json(
+    ndjson_path: str,
+    output_path: str,
+    eps_meters: float = 2.0,
+    min_samples: int = 3,
+    workers: int = 1,
+    simplify_tolerance_meters: float = None,
+) -> None:
+    """
+    Export the car paths streamed to an NDJSON file as a GeoJSON FeatureCollection,
+    with the same filtering as `export_for_geo_json`.
+    The stream holds whole trajectories one after the other, the exported features are
+    ordered by frame again, with the point that delays the animation first in its frame.
+    The file is read twice: once to collect the coordinates and the order of the points,
+    and once to copy the kept features, so only a few numbers per point are held in memory.
 
-    with open(output_path, "w") as file:
-        json.dump(export_geo_format, file)
+    Args:
+        ndjson_path (str): Path to the NDJSON file with one GeoJSON feature per line
+        output_path (str): Path to the output GeoJSON file
+        eps_meters (float): Maximum distance in meters between two points to be considered in the same neighborhood
+        min_samples (int): Minimum number of points to form a cluster
+        workers (int): Number of threads for the neighbor search
+        simplify_tolerance_meters (float): Maximum distance in meters of a removed point from the
+            simplified path, None to keep all points
+    """
+    offsets = []
+    coordinates = []
+    vehicle_ids = []
+    frame_indices = []
+    frame_times = []
+    delays = []
+    for offset, _, feature in iter_ndjson_features(ndjson_path):
+        properties = feature["properties"]
+        offsets.append(offset)
+        coordinates.append(feature["geometry"]["coordinates"])
+        vehicle_ids.append(properties["vehicle_id"])
+        frame_indices.append(properties.get("frame_idx", 0))
+        frame_times.append(properties["frame_time"])
+        delays.append(properties["delay"])
+
+    frame_indices = np.array(frame_indices)
+    keep = filter_paths_mask(
+        np.array(coordinates),
+        np.array(vehicle_ids),
+        eps_meters=eps_meters,
+        min_samples=min_samples,
+        workers=workers,
+        frame_indices=frame_indices,
+        simplify_tolerance_meters=simplify_tolerance_meters,
+    )
+    order = np.lexsort((np.arange(len(offsets)), np.logical_not(delays), frame_indices))
+    order = order[keep[order]]
+    offsets = np.array(offsets, dtype=np.int64)[order]
+    new_delays = first_in_frame(np.array(frame_times)[order])
+    changed = new_delays != np.array(delays, dtype=bool)[order]
+    del coordinates, vehicle_ids, frame_indices, frame_times, delays, order
+
+    with open(ndjson_path, "rb") as source, open(output_path, "w") as file:
+        file.write('{"type": "FeatureCollection", "features": [')
+        for index, offset in enumerate(offsets.tolist()):
+            source.seek(offset)
+            if index:
+                file.write(", ")
+            line = source.readline().rstrip(b"\n").decode()
+            if changed[index]:
+                feature = json.loads(line)
+                feature["properties"]["delay"] = bool(new_delays[index])
+                line = json.dumps(feature)
+            file.write(line)
+        file.write("]}")
@@ -0,0 +1,272 @@
+import json
+import math
+import os
+import shutil
+
+import numpy as np
+
+from preprocessing.drone_data import format_frame_time, parse_frame_time
+
+from .geojson_sink import iter_ndjson_features
+from .map_utils import filter_paths_mask
+from .simplification import douglas_peucker, to_local_meters
+
+EQUATOR_METERS_PER_PIXEL = 156_543.03392  # Web Mercator meters per 256 px tile pixel at zoom 0
+DAY_MS = 86_400_000
+
+
+def tile_coordinates(coordinates: np.ndarray, zoom: int) -> np.ndarray:
+    """
+    Convert longitude and latitude to fractional Web Mercator tile coordinates, so the
+    integer part is the x/y of the map tile the point is on.
+
+    Args:
+        coordinates (np.ndarray): (n, 2) array of longitude and latitude in degrees
+        zoom (int): The zoom level of the tiles
+    Returns:
+        np.ndarray: (n, 2) array of tile x and y
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    scale = 2**zoom
+    x = (coordinates[:, 0] + 180) / 360 * scale
+    latitude = np.radians(coordinates[:, 1])
+    y = (1 - np.arcsinh(np.tan(latitude)) / math.pi) / 2 * scale
+    return np.column_stack([x, y])
+
+
+def unwrap_days(times: np.ndarray, frame_indices: np.ndarray) -> np.ndarray:
+    """
+    Turn times of day into times that keep growing past midnight, by adding a day every
+    time the clock goes back more than half a day from one frame to the next.
+
+    Args:
+        times (np.ndarray): Milliseconds since midnight of every point
+        frame_indices (np.ndarray): The frame of every point, orders the points in time
+    Returns:
+        np.ndarray: Milliseconds since the midnight before the flight
+    """
+    if not len(times):
+        return times
+    order = np.argsort(frame_indices, kind="stable")
+    ordered = times[order]
+    days = np.cumsum(np.diff(ordered, prepend=ordered[0]) < -DAY_MS // 2)
+    unwrapped = np.empty_like(times)
+    unwrapped[order] = ordered + days * DAY_MS
+    return unwrapped
+
+
+def clear_tiles(output_dir: str) -> None:
+    """
+    Remove the tiles of a previous export, and nothing else.
+
+    Args:
+        output_dir (str): The directory of the tiles
+    Raises:
+        ValueError: If the directory has other content than an export, e.g. a wrong path
+    """
+    if not os.path.isdir(output_dir) or not os.listdir(output_dir):
+        return
+    index_path = os.path.join(output_dir, "index.json")
+    if not os.path.exists(index_path):
+        raise ValueError(f"{output_dir} is not empty and has no path tiles index.json")
+    with open(index_path, "r") as file:
+        zooms = json.load(file).get("zooms", [])
+    for zoom in zooms:
+        shutil.rmtree(os.path.join(output_dir, str(zoom)), ignore_errors=True)
+    os.remove(index_path)
+
+
+def segment_tiles(tiles: np.ndarray) -> list:
+    """
+    Find the map tiles every segment of a path passes through, by sampling every segment
+    at least twice per tile it spans.
+
+    Args:
+        tiles (np.ndarray): (n, 2) fractional tile coordinates of the path points
+    Returns:
+        list: For every segment, the set of (x, y) tiles it touches
+    """
+    result = []
+    for start, end in zip(tiles[:-1], tiles[1:]):
+        steps = int(np.ceil(np.abs(end - start).max() * 2)) + 1
+        samples = start + np.linspace(0, 1, steps + 1)[:, None] * (end - start)
+        result.append(set(map(tuple, np.floor(samples).astype(int).tolist())))
+    return result
+
+
+def path_pieces(
+    coordinates: np.ndarray,
+    times: np.ndarray,
+    zoom: int,
+    window_ms: int,
+    tolerance_pixels: float,
+) -> dict:
+    """
+    Simplify a vehicle path for a zoom level and cut it by map tile and time window.
+    Every piece holds the segments of the path that touch one tile and start in one time
+    window, as runs of consecutive points.
+
+    Args:
+        coordinates (np.ndarray): (n, 2) longitude and latitude of the path, in time order
+        times (np.ndarray): Milliseconds since the start of the flight of every point
+        zoom (int): The zoom level
+        window_ms (int): Length of the time windows
+        tolerance_pixels (float): Maximum distance in screen pixels of a removed point
+            from the simplified path
+    Returns:
+        dict: (x, y, window) to the list of runs, every run an array of point indices
+    """
+    meters_per_pixel = (
+        EQUATOR_METERS_PER_PIXEL * math.cos(math.radians(coordinates[:, 1].mean())) / 2**zoom
+    )
+    kept = np.flatnonzero(
+        douglas_peucker(to_local_meters(coordinates), tolerance_pixels * meters_per_pixel)
+    )
+    windows = (times[kept] // window_ms).tolist()
+    tiles = tile_coordinates(coordinates[kept], zoom)
+    if len(kept) == 1:
+        x, y = np.floor(tiles[0]).astype(int).tolist()
+        return {(x, y, windows[0]): [kept]}
+
+    pieces = {}
+    for segment, touched in enumerate(segment_tiles(tiles)):
+        for x, y in touched:
+            runs = pieces.setdefault((x, y, windows[segment]), [])
+            if runs and runs[-1][-1] == segment:
+                runs[-1].append(segment + 1)  # continue the run of the previous segment
+            else:
+                runs.append([segment, segment + 1])
+    return {key: [kept[run] for run in runs] for key, runs in pieces.items()}
+
+
+def export_path_tiles(
+    ndjson_path: str,
+    output_dir: str,
+    zooms: tuple = (12, 14, 16, 18),
+    window_ms: int = 60_000,
+    tolerance_pixels: float = 1.0,
+    eps_meters: float = 2.0,
+    min_samples: int = 3,
+    workers: int = 1,
+) -> dict:
+    """
+    Export the car paths streamed to an NDJSON file as vehicle LineStrings split into
+    static files by zoom level, map tile and time window, so a map only loads the paths
+    it shows. The paths are filtered like in `export_for_geo_json`, then simplified for
+    every zoom level to `tolerance_pixels` on screen. Every LineString has the time of
+    each of its points in its `times` property, in milliseconds since the flight start.
+
+    The files are written to `output_dir/{zoom}/{x}/{y}/{window}.json`, and
+    `output_dir/index.json` lists the tiles and windows that have paths, the vehicles and
+    the time span of the flight.
+
+    Args:
+        ndjson_path (str): Path to the NDJSON file with one GeoJSON feature per line
+        output_dir (str): The directory to write the tiles to, the tiles of a previous
+            export there are replaced
+        zooms (tuple): Zoom levels to export
+        window_ms (int): Length of the time windows in milliseconds
+        tolerance_pixels (float): Maximum distance in screen pixels of a removed point
+            from the simplified path
+        eps_meters (float): Maximum distance in meters between two points to be considered in the same neighborhood
+        min_samples (int): Minimum number of points to form a cluster
+        workers (int): Number of threads for the neighbor search
+    Returns:
+        dict: The index written to `index.json`
+    """
+    clear_tiles(output_dir)
+    coordinates = []
+    vehicle_ids = []
+    frame_indices = []
+    times = []
+    colors = {}
+    for _, _, feature in iter_ndjson_features(ndjson_path):
+        properties = feature["properties"]
+        coordinates.append(feature["geometry"]["coordinates"])
+        vehicle_ids.append(properties["vehicle_id"])
+        frame_indices.append(properties.get("frame_idx", 0))
+        times.append(parse_frame_time(properties["frame_time"]))
+        colors[properties["vehicle_id"]] = properties["color"]
+
+    coordinates = np.array(coordinates, dtype=np.float64).reshape(-1, 2)
+    vehicle_ids = np.array(vehicle_ids)
+    frame_indices = np.array(frame_indices)
+    times = unwrap_days(np.array(times, dtype=np.int64), frame_indices)
+    keep = filter_paths_mask(
+        coordinates,
+        vehicle_ids,
+        eps_meters=eps_meters,
+        min_samples=min_samples,
+        workers=workers,
+        frame_indices=frame_indices,
+    )
+    coordinates, vehicle_ids, frame_indices, times = (
+        values[keep] for values in (coordinates, vehicle_ids, frame_indices, times)
+    )
+    start_ms = int(times.min()) if len(times) else 0
+    times -= start_ms
+
+    tiles = {}  # (zoom, x, y, window) -> features
+    vehicles = []
+    order = np.lexsort((frame_indices, vehicle_ids))
+    bounds = np.flatnonzero(vehicle_ids[order][1:] != vehicle_ids[order][:-1]) + 1
+    for path in np.split(order, bounds) if len(order) else []:
+        vehicle_id = str(vehicle_ids[path[0]])
+        path_coordinates = coordinates[path]
+        path_times = times[path]
+        vehicles.append(
+            {
+                "vehicle_id": vehicle_id,
+                "color": colors[vehicle_id],
+                "start_ms": int(path_times[0]),
+                "end_ms": int(path_times[-1]),
+            }
+        )
+        for zoom in zooms:
+            pieces = path_pieces(path_coordinates, path_times, zoom, window_ms, tolerance_pixels)
+            for (x, y, window), runs in pieces.items():
+                features = tiles.setdefault((zoom, x, y, window), [])
+                for run in runs:
+                    if len(run) == 1:
+                        run = np.repeat(run, 2)  # a LineString needs two points
+                    features.append(
+                        {
+                            "type": "Feature",
+                            "geometry": {
+                                "type": "LineString",
+                                "coordinates": path_coordinates[run].round(7).tolist(),
+                            },
+                            "properties": {
+                                "vehicle_id": vehicle_id,
+                                "color": colors[vehicle_id],
+                                "times": path_times[run].tolist(),
+                            },
+                        }
+                    )
+
+    index_tiles = {str(zoom): {} for zoom in zooms}
+    for (zoom, x, y, window), features in sorted(tiles.items()):
+        tile_dir = os.path.join(output_dir, str(zoom), str(x), str(y))
+        os.makedirs(tile_dir, exist_ok=True)
+        with open(os.path.join(tile_dir, f"{window}.json"), "w") as file:
+            json.dump({"type": "FeatureCollection", "features": features}, file)
+        index_tiles[str(zoom)].setdefault(f"{x}/{y}", []).append(window)
+
+    index = {
+        "start_time": format_frame_time(start_ms),
+        "duration_ms": int(times.max()) if len(times) else 0,
+        "window_ms": window_ms,
+        "zooms": list(zooms),
+        "bounds": (
+            [*coordinates.min(axis=0).tolist(), *coordinates.max(axis=0).tolist()]
+            if len(coordinates)
+            else None
+        ),
+        "tiles": index_tiles,
+        "vehicles": vehicles,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "index.json"), "w") as file:
+        json.dump(index, file)
+    print(f"Exported {len(vehicles)} paths to {len(tiles)} tiles in {output_dir}")
+    return index
@@ -0,0 +1,115 @@
+import json
+import queue
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class PositionPublisher:
+    """
+    Publishes the vehicle positions of every processed frame as Server-Sent Events.
+
+    Clients subscribe with `new EventSource("http://host:port/events")` and receive one
+    JSON event per frame. Every subscriber has its own bounded queue; a client that
+    reads slower than the frames are processed loses its oldest events instead of
+    slowing down the tracker or delaying the newer positions.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        queue_size: int = 100,
+        heartbeat_seconds: float = 15.0,
+    ):
+        """
+        Args:
+            host: The address to listen on
+            port: The port to listen on, 0 picks a free port
+            queue_size: Number of events buffered per subscriber
+            heartbeat_seconds: Idle time after which a comment is sent to keep the connection open
+        """
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"Publishing vehicle positions at http://{host}:{self.port}/events")
+
+    def _handler(self) -> type:
+        publisher = self
+
+        class EventStreamHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/events":
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                publisher._stream(self.wfile)
+
+            def log_message(self, format, *args):
+                pass  # one line per subscriber request would flood the tracker output
+
+        return EventStreamHandler
+
+    def _stream(self, wfile) -> None:
+        events = queue.Queue(maxsize=self.queue_size)
+        with self.lock:
+            self.subscribers.add(events)
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=self.heartbeat_seconds)
+                except queue.Empty:
+                    event = b": heartbeat\n\n"
+                if event is None:  # the publisher is closing
+                    return
+                wfile.write(event)
+                wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client went away
+        finally:
+            with self.lock:
+                self.subscribers.discard(events)
+
+    def publish(self, event: dict) -> None:
+        """
+        Send an event to all subscribers.
+
+        Args:
+            event: JSON-serializable event data
+        """
+        message = f"data: {json.dumps(event)}\n\n".encode()
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for events in subscribers:
+            self._put(events, message)
+
+    @staticmethod
+    def _put(events: queue.Queue, message) -> None:
+        while True:
+            try:
+                events.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    events.get_nowait()  # drop the oldest event
+                except queue.Empty:
+                    pass
+
+    def close(self) -> None:
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for events in subscribers:
+            self._put(events, None)
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
@@ -0,0 +1,145 @@
+import math
+
+from collections import OrderedDict
+
+import numpy as np
+
+from .coordinates import adjust_lat_long_with_direction_array
+
+
+class GroundProjector:
+    """
+    Projects pixel coordinates of a nadir camera to latitude and longitude.
+
+    This is the vectorized counterpart of `benchmarks.reference.map_to_coordinates`: the
+    pixel-to-meter factors are computed once per (focal length, altitude) pair and
+    kept in a least recently used cache of `cache_size` pairs (interpolated telemetry
+    gives most frames a new pair, so an unbounded cache would grow for the whole
+    flight), and all points of a frame, or of a batch of frames, are converted with
+    a single set of NumPy operations. Results match the scalar path within 1e-9
+    degrees (about 0.1 mm on the ground).
+    """
+
+    def __init__(
+        self,
+        sensor_width: float,
+        resolution_width: int,
+        resolution_height: int,
+        cache_size: int = 1024,
+    ):
+        """
+        Args:
+            sensor_width: Width of the camera sensor in mm
+            resolution_width: Width of the frames in pixels
+            resolution_height: Height of the frames in pixels
+            cache_size: Number of (focal length, altitude) pairs whose factors are kept
+        """
+        self.cache_size = cache_size
+        self.sensor_width = sensor_width
+        self.sensor_height = sensor_width / (resolution_width / resolution_height)
+        self.resolution_width = resolution_width
+        self.resolution_height = resolution_height
+        self._factors = OrderedDict()
+
+    def pixel_to_meter(self, focal_length: float, altitude: float) -> tuple:
+        """
+        Get the size of a pixel on the ground.
+
+        Args:
+            focal_length: Focal length of the camera in mm
+            altitude: Altitude of the camera above the ground in meters
+        Returns:
+            tuple: Meters per pixel along the x and y axis of the image
+        """
+        key = (focal_length, altitude)
+        factors = self._factors.get(key)
+        if factors is not None:
+            self._factors.move_to_end(key)
+        else:
+            fov_horizontal = 2 * math.atan(self.sensor_width / (2 * focal_length))
+            fov_vertical = 2 * math.atan(self.sensor_height / (2 * focal_length))
+            ground_width = 2 * (altitude * math.tan(fov_horizontal / 2))
+            ground_height = 2 * (altitude * math.tan(fov_vertical / 2))
+            factors = (
+                ground_width / self.resolution_width,
+                ground_height / self.resolution_height,
+            )
+            self._factors[key] = factors
+            if len(self._factors) > self.cache_size:
+                self._factors.popitem(last=False)
+        return factors
+
+    def _pixel_to_meter_array(self, focal_length: np.ndarray, altitude: np.ndarray) -> tuple:
+        """
+        Get the pixel-to-meter factors for arrays of focal lengths and altitudes,
+        computing each distinct pair only once.
+        """
+        focal_length, altitude = np.broadcast_arrays(focal_length, altitude)
+        pairs, inverse = np.unique(
+            np.stack([focal_length.ravel(), altitude.ravel()], axis=1),
+            axis=0,
+            return_inverse=True,
+        )
+        factors = np.array([self.pixel_to_meter(f, a) for f, a in pairs.tolist()])
+        factors = factors[inverse.ravel()]
+        return (
+            factors[:, 0].reshape(focal_length.shape),
+            factors[:, 1].reshape(focal_length.shape),
+        )
+
+    def project(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        drone_lat,
+        drone_lon,
+        altitude,
+        focal_length,
+        gb_yaw,
+        yaw_unstable=False,
+    ) -> tuple:
+        """
+        Map pixel coordinates to latitude and longitude.
+        The drone arguments are either scalars (all points belong to one frame)
+        or arrays with one value per point (points of several frames).
+
+        Args:
+            x: The x-coordinates of the points
+            y: The y-coordinates of the points
+            drone_lat: Latitude of the drone
+            drone_lon: Longitude of the drone
+            altitude: Absolute altitude of the drone in meters
+            focal_length: Focal length of the camera in mm
+            gb_yaw: Gimbal yaw in degrees (-180 - 180)
+            yaw_unstable: Whether the drone yaw changed too fast to trust the displacement
+        Returns:
+            tuple: Arrays of latitudes and longitudes of the points
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        direction = np.asarray(gb_yaw, dtype=np.float64) + 180
+
+        if np.any((direction < 0) | (direction > 360)):
+            raise ValueError("Gimbal yaw should be in the range of 0-360 degrees")
+
+        if np.ndim(focal_length) == 0 and np.ndim(altitude) == 0:
+            pixel_to_meter_x, pixel_to_meter_y = self.pixel_to_meter(
+                float(focal_length), float(altitude)
+            )
+        else:
+            pixel_to_meter_x, pixel_to_meter_y = self._pixel_to_meter_array(
+                np.asarray(focal_length, dtype=np.float64),
+                np.asarray(altitude, dtype=np.float64),
+            )
+
+        displacement_x_meters = (x - self.resolution_width / 2) * pixel_to_meter_x
+        displacement_y_meters = (y - self.resolution_height / 2) * pixel_to_meter_y
+        displacement = np.hypot(displacement_x_meters, displacement_y_meters)
+        displacement = np.where(yaw_unstable, 0.0, displacement)
+
+        return adjust_lat_long_with_direction_array(
+            np.asarray(drone_lat, dtype=np.float64),
+            np.asarray(drone_lon, dtype=np.float64),
+            displacement,
+            direction,
+        )
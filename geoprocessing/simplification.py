@@ -1,54 +1,82 @@
 import numpy as np
 from sklearn.cluster import DBSCAN
+from sklearn.neighbors import NearestNeighbors
 
+EARTH_RADIUS = 6_371_000  # meters
 
-def douglas_peucker(features: list, tolerance: float) -> list:
+
+def douglas_peucker(points: np.ndarray, tolerance: float) -> np.ndarray:
     """
-    Simplifies a list of GeoJSON features representing a path using the Douglas-Peucker algorithm.
+    Simplify a path with the Douglas-Peucker algorithm.
+    The segments are processed from an explicit stack instead of recursion, and the
+    distances of all points of a segment are computed with a single set of NumPy
+    operations.
 
     Args:
-        features (list of dict): List of GeoJSON feature dictionaries
-        tolerance (float): Maximum distance threshold for simplification
+        points (np.ndarray): (n, 2) array of the path points in a planar coordinate system
+        tolerance (float): Maximum distance of a removed point from the simplified path
     Returns:
-        list of dict: Simplified list of GeoJSON feature dictionaries
+        np.ndarray: Boolean mask of the points kept in the simplified path
+    """
+    points = np.asarray(points, dtype=np.float64)
+    keep = np.zeros(len(points), dtype=bool)
+    if len(points) < 3:
+        keep[:] = True  # Cannot simplify further
+        return keep
+
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        # Distance of the inner points from the segment between start and end
+        inner = points[start + 1 : end] - points[start]
+        line = points[end] - points[start]
+        line_length_sq = line @ line
+        if line_length_sq > 0:
+            projection = np.clip(inner @ line / line_length_sq, 0.0, 1.0)
+            inner = inner - projection[:, None] * line
+        distances = np.einsum("ij,ij->i", inner, inner)
+
+        furthest = int(np.argmax(distances))
+        # If the furthest point is further than the tolerance, split the path
+        if distances[furthest] > tolerance * tolerance:
+            furthest += start + 1
+            keep[furthest] = True
+            stack.append((start, furthest))
+            stack.append((furthest, end))
+
+    return keep
+
+
+def simplify_paths_mask(
+    coordinates: np.ndarray, vehicle_ids: np.ndarray, order: np.ndarray, tolerance_meters: float
+) -> np.ndarray:
     """
-    if len(features) < 3:
-        return features  # Cannot simplify further
+    Simplify the path of every vehicle with the Douglas-Peucker algorithm in meters.
 
-    start, end = (
-        features["geometry"]["coordinates"][0],
-        features["geometry"]["coordinates"][-1],
-    )
+    Args:
+        coordinates (np.ndarray): (n, 2) array of longitude and latitude of every point
+        vehicle_ids (np.ndarray): Vehicle id of every point
+        order (np.ndarray): Sort key of the points along their path, e.g. the frame index
+        tolerance_meters (float): Maximum distance in meters of a removed point from the simplified path
+    Returns:
+        np.ndarray: Boolean mask of the points kept in the simplified paths
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    keep = np.zeros(len(coordinates), dtype=bool)
+    if not len(coordinates):
+        return keep
 
-    # Find the point furthest from the line segment
-    line = np.array([end[0] - start[0], end[1] - start[1]])
-    line_length = np.linalg.norm(line)
-    if line_length == 0:
-        return [start, end]
-
-    line_unit = line / line_length
-    max_distance = 0
-    furthest_index = 0
-
-    for i in range(1, len(features) - 1):
-        point = np.array(features[i]["geometry"]["coordinates"]) - np.array(start)
-        distance = np.linalg.norm(np.cross(point, line_unit))
-        start_to_point = np.array(point) - np.array(start)
-        projection = np.dot(start_to_point, line_unit)
-        closest_point = np.array(start) + projection * line_unit
-        distance = np.linalg.norm(point - closest_point)
-
-        if distance > max_distance:
-            max_distance = distance
-            furthest_index = i
-
-    # If the furthest point is greater than the tolerance, split the path
-    if max_distance > tolerance:
-        left = douglas_peucker(features[: furthest_index + 1], tolerance)
-        right = douglas_peucker(features[furthest_index:], tolerance)
-        return left[:-1] + right  # Remove duplicate point
-    else:
-        return [start, end]  # No points to remove
+    _, vehicle_index = np.unique(vehicle_ids, return_inverse=True)
+    vehicle_index = vehicle_index.ravel()
+    path_order = np.lexsort((np.arange(len(coordinates)), order, vehicle_index))
+    bounds = np.flatnonzero(np.diff(vehicle_index[path_order])) + 1
+    for path in np.split(path_order, bounds):
+        keep[path] = douglas_peucker(to_local_meters(coordinates[path]), tolerance_meters)
+    return keep
 
 
 def douglas_peucker_path_simlification(features: list, simplification_threshold: float) -> list:
@@ -56,25 +84,44 @@ def douglas_peucker_path_simlification(features: list, simplification_threshold:
     Simplifies a list of GeoJSON features representing paths using the Douglas-Peucker algorithm.
 
     Args:
-        features (list of dict): List of GeoJSON feature dictionaries
-        simplification_threshold (float): Maximum distance threshold for simplification
+        features (list of dict): List of GeoJSON point feature dictionaries
+        simplification_threshold (float): Maximum distance in meters of a removed point from its path
     Returns:
-        list of dict: Simplified list of GeoJSON feature dictionaries
+        list of dict: Features of the points kept in the simplified paths, in their original order
+    """
+    if not features:
+        return []
+
+    keep = simplify_paths_mask(
+        np.array([feature["geometry"]["coordinates"] for feature in features]),
+        np.array([feature["properties"]["vehicle_id"] for feature in features]),
+        np.array([feature["properties"].get("frame_idx", 0) for feature in features]),
+        simplification_threshold,
+    )
+    return [feature for feature, kept in zip(features, keep) if kept]
+
 
+def dbscan_inlier_mask(
+    coordinates: np.ndarray, eps: float, min_samples: int, algorithm: str = "auto"
+) -> np.ndarray:
     """
-    simplified_features = []
-    features_by_car_id = {}
-    for feature in features:
-        car_id = feature["properties"]["car_id"]
-        if car_id not in features_by_car_id:
-            features_by_car_id[car_id] = []
-        features_by_car_id[car_id].append(feature)
+    Find the points that DBSCAN doesn't label as noise.
+
+    Args:
+        coordinates (np.ndarray): (n, 2) array of point coordinates
+        eps (float): Maximum distance between two points to be considered in the same neighborhood
+        min_samples (int): Minimum number of points to form a cluster
+        algorithm (str): Neighbor search algorithm of sklearn, e.g. "kd_tree" or "ball_tree"
 
-    for car_id, features in features_by_car_id.items():
-        simplified_path = douglas_peucker(features, simplification_threshold)
-        simplified_features.append(simplified_path)
+    Returns:
+        np.ndarray: Boolean mask, True for the points that belong to a cluster
+    """
+    db = DBSCAN(
+        eps=eps, min_samples=min_samples, metric="euclidean", algorithm=algorithm
+    ).fit(coordinates)
 
-    return simplified_features
+    # -1 label means outlier
+    return db.labels_ != -1
 
 
 def remove_outliers_with_dbscan(features: list, eps: float, min_samples: int) -> list:
@@ -92,15 +139,95 @@ def remove_outliers_with_dbscan(features: list, eps: float, min_samples: int) ->
     # Extract coordinates from features
     coords = [feature["geometry"]["coordinates"] for feature in features]
 
-    # Convert coordinates to numpy array
-    data = np.array(coords)
+    inliers = dbscan_inlier_mask(np.array(coords), eps=eps, min_samples=min_samples)
 
-    # Apply DBSCAN
-    db = DBSCAN(eps=eps, min_samples=min_samples, metric="euclidean").fit(data)
-
-    # Filter out outliers (-1 label means outlier)
+    # Filter out outliers
     filtered_features = [
-        feature for feature, label in zip(features, db.labels_) if label != -1
+        feature for feature, inlier in zip(features, inliers) if inlier
     ]
 
     return filtered_features
+
+
+def to_local_meters(coordinates: np.ndarray) -> np.ndarray:
+    """
+    Project longitude and latitude to a local east-north plane in meters, centered
+    on the mean of the points. The error is well below a centimeter for points a
+    few kilometers apart, which covers a vehicle path in a drone video.
+
+    Args:
+        coordinates (np.ndarray): (n, 2) array of longitude and latitude in degrees
+    Returns:
+        np.ndarray: (n, 2) array of east and north offsets in meters
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    origin = coordinates.mean(axis=0)
+    offsets = np.radians(coordinates - origin) * EARTH_RADIUS
+    offsets[:, 0] *= np.cos(np.radians(origin[1]))
+    return offsets
+
+
+def per_track_inlier_mask(
+    coordinates: np.ndarray,
+    vehicle_ids: np.ndarray,
+    eps_meters: float,
+    min_samples: int,
+    workers: int = 1,
+) -> np.ndarray:
+    """
+    Remove outliers from every vehicle path separately with DBSCAN in meters.
+    Every path is projected to its own local plane, and the paths are stacked along a
+    third axis more than `eps_meters` apart, so one KD-tree covers all paths at once
+    without any path supporting the points of another one.
+
+    Only the noise labels of DBSCAN are needed, not the clusters: a point is a core point
+    if its `min_samples`-th nearest neighbor (itself included) is within `eps_meters`, and
+    any other point is noise unless a core point is within `eps_meters` of it. Both are
+    nearest neighbor queries of a few points, so a parked vehicle with thousands of points
+    in one spot doesn't make DBSCAN keep neighborhoods growing with the square of the
+    points, and the result is the same as running DBSCAN on every path.
+
+    Args:
+        coordinates (np.ndarray): (n, 2) array of longitude and latitude of every point
+        vehicle_ids (np.ndarray): Vehicle id of every point
+        eps_meters (float): Maximum distance in meters between two points to be considered in the same neighborhood
+        min_samples (int): Minimum number of points to form a cluster
+        workers (int): Number of threads for the neighbor search
+    Returns:
+        np.ndarray: Boolean mask, True for the points that belong to a cluster of their path
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    if not len(coordinates):
+        return np.zeros(0, dtype=bool)
+
+    _, vehicle_index, counts = np.unique(
+        vehicle_ids, return_inverse=True, return_counts=True
+    )
+    vehicle_index = vehicle_index.ravel()
+    origin = np.stack(
+        [
+            np.bincount(vehicle_index, weights=coordinates[:, 0]) / counts,
+            np.bincount(vehicle_index, weights=coordinates[:, 1]) / counts,
+        ],
+        axis=1,
+    )[vehicle_index]
+
+    points = np.empty((len(coordinates), 3))
+    points[:, :2] = np.radians(coordinates - origin) * EARTH_RADIUS
+    points[:, 0] *= np.cos(np.radians(origin[:, 1]))
+    points[:, 2] = vehicle_index * (2 * eps_meters)
+
+    if len(points) < min_samples:
+        return np.zeros(len(points), dtype=bool)
+    neighbors = NearestNeighbors(n_neighbors=min_samples, algorithm="kd_tree", n_jobs=workers)
+    distances, _ = neighbors.fit(points).kneighbors(points)
+    inliers = distances[:, -1] <= eps_meters
+
+    # Border points, within reach of a core point of their path
+    core = points[inliers]
+    border = ~inliers
+    if len(core) and border.any():
+        neighbors = NearestNeighbors(n_neighbors=1, algorithm="kd_tree", n_jobs=workers)
+        distances, _ = neighbors.fit(core).kneighbors(points[border])
+        inliers[border] = distances[:, 0] <= eps_meters
+    return inliers
@@ -0,0 +1,129 @@
+import numpy as np
+
+TRAJECTORY_DTYPE = np.dtype(
+    [
+        ("frame_idx", np.int32),
+        ("lat", np.float64),
+        ("lon", np.float64),
+        ("confidence", np.float32),
+        ("delay", np.bool_),
+    ]
+)
+
+
+class Trajectory:
+    """
+    Positions of one vehicle, stored in a growable structured array.
+    """
+
+    __slots__ = ("points", "size")
+
+    def __init__(self, capacity: int = 64):
+        self.points = np.empty(capacity, dtype=TRAJECTORY_DTYPE)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(
+        self, frame_idx: int, lat: float, lon: float, confidence: float, delay: bool
+    ) -> None:
+        if self.size == len(self.points):
+            grown = np.empty(2 * len(self.points), dtype=TRAJECTORY_DTYPE)
+            grown[: self.size] = self.points
+            self.points = grown
+        self.points[self.size] = (frame_idx, lat, lon, confidence, delay)
+        self.size += 1
+
+    @property
+    def last_frame(self) -> int:
+        return int(self.points["frame_idx"][self.size - 1])
+
+    def columns(self) -> np.ndarray:
+        """
+        Get the stored positions.
+
+        Returns:
+            np.ndarray: Structured array of `TRAJECTORY_DTYPE`, without copying
+        """
+        return self.points[: self.size]
+
+    def __getstate__(self):
+        return self.columns().copy()
+
+    def __setstate__(self, points):
+        self.points = points
+        self.size = len(points)
+
+
+class TrajectoryStore:
+    """
+    Positions of the currently tracked vehicles, one `Trajectory` per vehicle id.
+    Vehicles that haven't been seen for a while are taken out with `pop_stale`,
+    so only the live tracks are kept in memory.
+    """
+
+    def __init__(self):
+        self.tracks = {}
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def __contains__(self, car_id: int) -> bool:
+        return car_id in self.tracks
+
+    def __getitem__(self, car_id: int) -> Trajectory:
+        return self.tracks[car_id]
+
+    def append(
+        self,
+        car_id: int,
+        frame_idx: int,
+        lat: float,
+        lon: float,
+        confidence: float,
+        delay: bool,
+    ) -> None:
+        """
+        Add a position of a vehicle.
+
+        Args:
+            car_id: The ID of the vehicle
+            frame_idx: The index of the frame
+            lat: The latitude of the vehicle
+            lon: The longitude of the vehicle
+            confidence: The confidence score of the detection
+            delay: Whether this is the point of the frame that delays the map animation
+        """
+        trajectory = self.tracks.get(car_id)
+        if trajectory is None:
+            trajectory = self.tracks[car_id] = Trajectory()
+        trajectory.append(frame_idx, lat, lon, confidence, delay)
+
+    def pop_stale(self, frame_idx: int, max_age: int) -> list:
+        """
+        Remove the trajectories of the vehicles not seen in the last `max_age` frames.
+
+        Args:
+            frame_idx: The index of the current frame
+            max_age: Number of frames after which a vehicle is considered gone
+        Returns:
+            list: (car_id, Trajectory) pairs of the removed vehicles
+        """
+        stale = [
+            car_id
+            for car_id, trajectory in self.tracks.items()
+            if frame_idx - trajectory.last_frame > max_age
+        ]
+        return [(car_id, self.tracks.pop(car_id)) for car_id in stale]
+
+    def pop_all(self) -> list:
+        """
+        Remove all trajectories.
+
+        Returns:
+            list: (car_id, Trajectory) pairs of all vehicles
+        """
+        tracks = list(self.tracks.items())
+        self.tracks = {}
+        return tracks
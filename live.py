@@ -0,0 +1,204 @@
+import sys
+import time
+
+from typing import Iterator
+
+import numpy as np
+
+from detection.yolo import YOLODetector
+from geoprocessing.position_publisher import PositionPublisher
+from preprocessing.drone_data import TelemetryStore, compute_yaw_instability
+from preprocessing.frame_source import FrameSource
+from preprocessing.live_source import LiveFrameSource, LiveTelemetry, TelemetryBuffer, now_ms
+from main import CarTracker, create_detector
+from profiling import StageProfiler
+from config import Config
+
+
+class LiveCarTracker(CarTracker):
+    """
+    Tracks the vehicles of a live drone stream and publishes their positions as they are found.
+
+    Frames are read from a network stream, the telemetry of every frame is interpolated
+    from the live telemetry at the time the frame arrived, and the positions of every
+    frame are sent to the subscribers of a `PositionPublisher`. Frames are detected one
+    at a time as soon as they arrive; batching and keyframe strides are not used since
+    they hold frames back. The paths are still streamed to the NDJSON file and exported
+    to GeoJSON when the stream ends.
+    """
+
+    def __init__(
+        self,
+        stream_url: str,
+        telemetry_source: str,
+        publisher: PositionPublisher,
+        replay: bool = False,
+        features_path: str = None,
+        profiler: StageProfiler = None,
+    ):
+        """
+        Args:
+            stream_url: URL of the video stream, or path of a video to replay in real time
+            telemetry_source: `udp://host:port` to receive the telemetry on, or a telemetry file to replay
+            publisher: Where the positions of every frame are published
+            replay: Replay `stream_url` as a video file at its frame rate, e.g. for tests
+            features_path: Where the GeoJSON features are streamed, defaults to
+                `Config.GEOJSON_STREAM_PATH`
+            profiler: Records the time spent in every stage, None to not profile
+        """
+        self.stream_url = stream_url
+        self.telemetry_source = telemetry_source
+        self.replay = replay
+        self.publisher = publisher
+        # Replayed video and telemetry share a clock so they stay in sync
+        self.start_time_ms = now_ms()
+        super().__init__(features_path=features_path, video_path=stream_url, profiler=profiler)
+        self.stop_frame = sys.maxsize
+        self.yaw_flags = np.zeros(1024, dtype=bool)
+        self.yaw_unstable = self.yaw_flags[:0]
+        self.frame_received_ms = None
+
+    def open_telemetry(self) -> TelemetryStore:
+        """
+        Start receiving the telemetry; the rows of the frames are added as they are read.
+
+        Returns:
+            TelemetryStore: An empty telemetry buffer
+        """
+        self.telemetry_sync = None
+        self.fps = 0
+        self.frame_offset = 0
+        self.live_telemetry = LiveTelemetry(
+            self.telemetry_source,
+            start_time_ms=self.start_time_ms,
+            window=Config.LIVE_TELEMETRY_WINDOW,
+        )
+        return TelemetryBuffer()
+
+    def open_frame_source(self) -> FrameSource:
+        return LiveFrameSource(
+            self.stream_url,
+            replay=self.replay,
+            start_time_ms=self.start_time_ms + self.video_offset_ms,
+            buffer_frames=Config.LIVE_FRAME_BUFFER,
+            max_latency_ms=Config.LIVE_MAX_LATENCY_MS,
+            detector_size=Config.DETECTION_IMAGE_SIZE,
+        )
+
+    def add_frame_telemetry(self, row: np.ndarray) -> int:
+        """
+        Add the telemetry of the next frame and flag it if the drone yaw is unstable.
+
+        Args:
+            row: A record of `TELEMETRY_DTYPE`
+        Returns:
+            int: The index of the frame
+        """
+        frame_idx = len(self.drone_data)
+        self.drone_data.append(row)
+
+        if frame_idx == len(self.yaw_flags):
+            self.yaw_flags = np.concatenate((self.yaw_flags, np.zeros_like(self.yaw_flags)))
+        window = Config.DISPLACEMENT_FRAME_COUNT_THRESHOLD
+        self.yaw_flags[frame_idx] = compute_yaw_instability(
+            self.drone_data.column("gb_yaw")[-window - 2 :],
+            window,
+            Config.DISPLACEMENT_YAW_THRESHOLD,
+        )[-1]
+        self.yaw_unstable = self.yaw_flags[: frame_idx + 1]
+        return frame_idx
+
+    def read_frames(self) -> Iterator[tuple]:
+        """
+        Read the stream frames that arrive while telemetry is available.
+        Frames are numbered in the order they are processed, skipped and dropped frames
+        don't get an index.
+
+        Returns:
+            Iterator[tuple]: The frame index, the full-resolution frame and the frame
+                downscaled for the detector
+        """
+        for _, frame, detector_frame in self.profiler.iterate("decode", self.frame_source.read()):
+            row = self.live_telemetry.at(self.frame_source.frame_time_ms)
+            if row is None:  # no telemetry yet
+                self.frame_source.release_detector_frame(detector_frame)
+                self.frame_source.release(frame)
+                continue
+
+            self.frame_received_ms = self.frame_source.frame_time_ms
+            yield self.add_frame_telemetry(row), frame, detector_frame
+
+    def process_detections(self, frame_idx: int, frame: np.ndarray, detections) -> None:
+        """
+        Georeference the detections of one frame and publish the positions of the frame.
+        """
+        super().process_detections(frame_idx, frame, detections)
+        self.profiler.gauge("latency_ms", now_ms() - self.frame_received_ms)
+        features = [
+            self.position_feature(car_id, *trajectory.columns()[-1].tolist())
+            for car_id, trajectory in self.trajectories.tracks.items()
+            if trajectory.last_frame == frame_idx
+        ]
+        self.publisher.publish(
+            {
+                "frame_idx": frame_idx,
+                "frame_time": self.drone_data[frame_idx]["timestamp"],
+                "latency_ms": round(now_ms() - self.frame_received_ms),
+                "features": features,
+            }
+        )
+
+    def run_recognition(self, detector: YOLODetector) -> None:
+        """
+        Detect and georeference every frame as soon as it arrives, until the stream ends.
+        """
+        self.profiler.start_frames()
+        started = time.perf_counter()
+        frame_count = 0
+        for frame_idx, frame, detector_frame in self.read_frames():
+            with self.profiler.stage("detect"):
+                boxes = detector.detect_objects(detector_frame)
+            detections = self.to_frame_detections(boxes)
+            self.frame_source.release_detector_frame(detector_frame)
+            self.postprocess_frame(frame_idx, frame, detections)
+            frame_count += 1
+
+        elapsed = time.perf_counter() - started
+        print(
+            f"Processed {frame_count} of {self.frame_source.received} received frames"
+            f" in {elapsed:.1f}s, {self.frame_source.dropped} dropped to keep up with the stream"
+        )
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.frame_source.stopped.set()
+        self.live_telemetry.close()
+        super().__exit__(exc_type, exc_val, exc_tb)
+
+
+def run_live_recognition(
+    stream_url: str,
+    telemetry_source: str,
+    replay: bool = False,
+    profiler: StageProfiler = None,
+) -> None:
+    """
+    Track the vehicles of a live stream and serve their positions until the stream ends.
+
+    Args:
+        stream_url: URL of the video stream, or path of a video to replay in real time
+        telemetry_source: `udp://host:port` to receive the telemetry on, or a telemetry file to replay
+        replay: Replay `stream_url` as a video file at its frame rate
+        profiler: Records the time spent in every stage, None to not profile
+    """
+    publisher = PositionPublisher(
+        Config.PUBLISHER_HOST,
+        Config.PUBLISHER_PORT,
+        queue_size=Config.PUBLISHER_QUEUE_SIZE,
+    )
+    try:
+        with LiveCarTracker(
+            stream_url, telemetry_source, publisher, replay=replay, profiler=profiler
+        ) as tracker:
+            tracker.run_recognition(create_detector())
+    finally:
+        publisher.close()
@@ -1,26 +1,203 @@
+import argparse
+import os
 import numpy as np
-import math
-import cv2
 
-from preprocessing.drone_data import load_drone_data
-
-from detection.yolo import YOLODetector
+from typing import Iterator
+
+from preprocessing.drone_data import (
+    TelemetryStore,
+    compute_yaw_instability,
+    format_frame_time,
+    load_drone_data,
+)
+from preprocessing.frame_source import FrameSource, fit_size, probe_video
+from preprocessing.telemetry_sync import TelemetrySync
+
+from detection.detection_cache import DetectionCacheWriter
+from detection.histogram import HSV_SIGNATURE_BINS, hsv_signature
+from detection.keyframes import AdaptiveStride, interpolate_detections
+from detection.reid import ReIDBank
+from detection.vehicle_crops import VehicleCropWriter
+from detection.yolo import Detections, YOLODetector
+
+from geoprocessing.geojson_sink import GeoJSONSink
+from geoprocessing.map_utils import export_ndjson_for_geo_json
+from geoprocessing.path_tiles import export_path_tiles
+from geoprocessing.projection import GroundProjector
+from geoprocessing.trajectories import Trajectory, TrajectoryStore
+
+from checkpoint import load_checkpoint, remove_checkpoint, save_checkpoint
+from pipeline import ThreadedConsumer, threaded_iter
+from profiling import NO_PROFILER, StageProfiler
+from utils import batched, clear_directory
+from config import Config
 
-from geoprocessing.coordinates import adjust_lat_long_with_direction
-from geoprocessing.map_utils import export_for_geo_json
 
-from utils import clear_directory
-from config import Config
+def create_detector(threads: int = None) -> YOLODetector:
+    """
+    Load the detector with the configured backend and warm it up on frames of the
+    configured size.
+
+    Args:
+        threads: Number of CPU threads of the inference, defaults to `Config.DETECTION_THREADS`
+    Returns:
+        YOLODetector: The warmed-up detector
+    """
+    options = dict(
+        conf_threshold=Config.CONFIDENCE_THRESHOLD,
+        iou_threshold=Config.IOU_THRESHOLD,
+        backend=Config.DETECTION_BACKEND,
+        threads=threads or Config.DETECTION_THREADS,
+        image_size=Config.EXPORT_IMAGE_SIZE,
+        calibration_data=Config.INT8_CALIBRATION_DATA,
+    )
+    if Config.TILED_DETECTION:
+        from detection.tiling import TiledYOLODetector
+
+        detector = TiledYOLODetector(
+            Config.YOLO_MODEL_PATH,
+            tile_size=Config.TILE_SIZE,
+            overlap=Config.TILE_OVERLAP,
+            merge_threshold=Config.TILE_MERGE_THRESHOLD,
+            motion_threshold=Config.TILE_MOTION_THRESHOLD,
+            refresh_interval=Config.TILE_REFRESH_INTERVAL,
+            **options,
+        )
+    else:
+        detector = YOLODetector(Config.YOLO_MODEL_PATH, **options)
+    width, height = fit_size(
+        Config.CAMERA_RESOLUTION_WIDTH,
+        Config.CAMERA_RESOLUTION_HEIGHT,
+        Config.DETECTION_IMAGE_SIZE,
+    )
+    elapsed = detector.warm_up(
+        width,
+        height,
+        batch_size=Config.DETECTION_BATCH_SIZE,
+        runs=Config.DETECTION_WARMUP_RUNS,
+    )
+    print(f"Warmed up the {detector.backend} detector in {elapsed:.2f}s")
+    return detector
 
 
 class CarTracker:
-    def __init__(self):
-        self.cap = cv2.VideoCapture(Config.VIDEO_PATH)
-        self.car_geo_paths = {}
-        self.car_geo_json_paths = []
+    def __init__(
+        self,
+        start_frame: int = 0,
+        stop_frame: int = None,
+        overlap_frames: int = 0,
+        id_offset: int = 0,
+        checkpoint_path: str = None,
+        resume: bool = False,
+        features_path: str = None,
+        video_path: str = None,
+        video_offset_ms: float = None,
+        detections_path: str = None,
+        telemetry_path: str = None,
+        profiler: StageProfiler = None,
+    ):
+        """
+        Args:
+            start_frame: The first frame to map vehicles on
+            stop_frame: The frame to stop at (exclusive), defaults to the end of the drone data
+            overlap_frames: Number of frames before `start_frame` to run the tracker on
+                without mapping; the detections of these frames and of the last
+                `overlap_frames` frames are kept in `overlap_detections` to stitch
+                track ids with neighbouring frame ranges
+            id_offset: Number added to the tracker ids to get the vehicle ids
+            checkpoint_path: Where to save the tracker state every `Config.CHECKPOINT_INTERVAL` frames
+            resume: Continue from the checkpoint at `checkpoint_path` if there is one
+            features_path: The NDJSON file the GeoJSON features are streamed to, defaults to
+                `Config.GEOJSON_STREAM_PATH`
+            video_path: The video to process, defaults to `Config.VIDEO_PATH`
+            video_offset_ms: Time of the first video frame in the flight recording, for clips
+                cut out of it; defaults to `Config.VIDEO_OFFSET_MS`
+            detections_path: The directory to record the tracked detections of every frame
+                to, for `--from-detections`; None to not record them
+            telemetry_path: The drone data already matched to the frames of the video and
+                saved with `save_telemetry`, memory-mapped instead of resampled again
+            profiler: Records the time spent in every stage, None to not profile
+        """
+        self.profiler = profiler or NO_PROFILER
+        self.trajectories = TrajectoryStore()
         self.car_colors = {}
         self.car_ids = []
-        self.drone_data = load_drone_data(Config.DRONE_DATA_PATH)
+        self.video_path = video_path or Config.VIDEO_PATH
+        self.video_offset_ms = (
+            Config.VIDEO_OFFSET_MS if video_offset_ms is None else video_offset_ms
+        )
+        self.telemetry_path = telemetry_path
+        self.drone_data = self.open_telemetry()
+        self.start_frame = start_frame
+        self.stop_frame = (
+            len(self.drone_data)
+            if stop_frame is None
+            else min(stop_frame, len(self.drone_data))
+        )
+        self.overlap_frames = overlap_frames
+        self.overlap_detections = {}
+        self.id_offset = id_offset
+        self.last_vehicle_id = id_offset  # highest vehicle id any detection got, mapped or not
+        self.track_aliases = {}  # tracker id re-linked to an earlier vehicle -> vehicle id
+        self.reid_bank = (
+            ReIDBank(
+                HSV_SIGNATURE_BINS[0] * HSV_SIGNATURE_BINS[1],
+                capacity=Config.REID_BANK_SIZE,
+                max_age=Config.REID_MAX_AGE_FRAMES,
+                gate_meters=Config.REID_GATE_METERS,
+                min_similarity=Config.REID_MIN_SIMILARITY,
+            )
+            if Config.REID_ENABLED
+            else None
+        )
+        self.checkpoint_path = checkpoint_path
+        self.resumed = False
+        self.features_offset = None
+        self.crop_writer = VehicleCropWriter(
+            Config.CAR_IMAGE_PATH,
+            padding=Config.IMAGE_PADDING,
+            workers=Config.CROP_WRITER_WORKERS,
+            profiler=self.profiler,
+        )
+        if resume and checkpoint_path:
+            state = load_checkpoint(checkpoint_path)
+            if state is not None:
+                self.restore_checkpoint(state)
+        self.feature_sink = GeoJSONSink(
+            features_path or Config.GEOJSON_STREAM_PATH,
+            batch_size=Config.GEOJSON_BATCH_SIZE,
+            resume_offset=self.features_offset,
+        )
+        self.last_checkpoint_frame = self.start_frame - 1
+        self.frame_source = self.open_frame_source()
+        self.frame_times = {}  # presentation time of the frames read, until they are recorded
+        self.detection_cache = (
+            DetectionCacheWriter(
+                detections_path,
+                {
+                    "video_path": self.video_path,
+                    "drone_data_path": Config.DRONE_DATA_PATH,
+                    "video_offset_ms": self.video_offset_ms,
+                    "fps": self.fps,
+                    "frame_count": self.video_frame_count,
+                    "frame_shape": self.frame_source.frames.shape,
+                    "stop_frame": self.stop_frame,
+                },
+                resume_frame=self.start_frame if self.resumed else None,
+            )
+            if detections_path
+            else None
+        )
+        self.yaw_unstable = compute_yaw_instability(
+            self.drone_data.column("gb_yaw"),
+            Config.DISPLACEMENT_FRAME_COUNT_THRESHOLD,
+            Config.DISPLACEMENT_YAW_THRESHOLD,
+        )
+        self.projector = GroundProjector(
+            Config.SENSOR_WIDTH,
+            Config.CAMERA_RESOLUTION_WIDTH,
+            Config.CAMERA_RESOLUTION_HEIGHT,
+        )
         self.classes = {
             0: "boat",
             1: "bus",
@@ -35,175 +212,610 @@ class CarTracker:
         }  # class ids from the yolo model (detector.model.names)
 
     def __enter__(self):
-        clear_directory(Config.CAR_IMAGE_PATH)
+        if not self.resumed:
+            clear_directory(Config.CAR_IMAGE_PATH)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.car_geo_json_paths:
-            export_for_geo_json(self.car_geo_json_paths, Config.GEOJSON_OUTPUT_PATH)
-        self.cap.release()
-
-    def map_to_coordinates(
-        self,
-        x: int,
-        y: int,
-        frame_idx: int,
-        drone_info: dict,
-    ) -> tuple:
+        self.flush_trajectories()
+        self.feature_sink.close()
+        self.crop_writer.close()
+        if self.detection_cache is not None:
+            # A replay gives every vehicle the color it got in this run
+            self.detection_cache.meta["car_colors"] = {
+                str(car_id): list(color) for car_id, color in self.car_colors.items()
+            }
+            # An interrupted run keeps its raw rows for --resume
+            self.detection_cache.close(save=exc_type is None)
+        if os.path.getsize(self.feature_sink.path):
+            with self.profiler.stage("export"):
+                export_ndjson_for_geo_json(
+                    self.feature_sink.path,
+                    Config.GEOJSON_OUTPUT_PATH,
+                    eps_meters=Config.OUTLIER_EPS_METERS,
+                    min_samples=Config.OUTLIER_MIN_SAMPLES,
+                    workers=Config.EXPORT_WORKERS,
+                    simplify_tolerance_meters=Config.SIMPLIFY_TOLERANCE_METERS,
+                )
+                if Config.PATH_TILES_DIR:
+                    export_path_tiles(
+                        self.feature_sink.path,
+                        Config.PATH_TILES_DIR,
+                        zooms=Config.PATH_TILE_ZOOMS,
+                        window_ms=Config.PATH_TILE_WINDOW_MS,
+                        tolerance_pixels=Config.PATH_TILE_TOLERANCE_PIXELS,
+                        eps_meters=Config.OUTLIER_EPS_METERS,
+                        min_samples=Config.OUTLIER_MIN_SAMPLES,
+                        workers=Config.EXPORT_WORKERS,
+                    )
+        self.frame_source.close()
+        if exc_type is None and self.checkpoint_path:
+            remove_checkpoint(self.checkpoint_path)
+
+    def open_telemetry(self) -> TelemetryStore:
         """
-        Map the pixel coordinates of a car to its corresponding latitude and longitude.
+        Load the drone data and match it to the frames of the video.
 
-        Args:
-            x: The x-coordinate of the car
-            y: The y-coordinate of the car
-            frame_idx: The index of the current frame
-            drone_info: The drone information
         Returns:
-            tuple: The latitude and longitude of the car
+            TelemetryStore: The telemetry of every frame covered by the drone data
         """
+        self.telemetry_sync = TelemetrySync(load_drone_data(Config.DRONE_DATA_PATH))
+        self.fps, self.video_frame_count = probe_video(self.video_path)
+        # Index of the first video frame in the flight recording, orders the features of clips
+        self.frame_offset = round(self.video_offset_ms * self.fps / 1000) if self.fps > 0 else 0
+        if self.telemetry_path:
+            # Copy-on-write, `sync_frame_time` may replace rows without touching the file
+            return TelemetryStore.open(self.telemetry_path, mmap_mode="c")
+        return self.sync_drone_data(self.video_frame_count)
+
+    def open_frame_source(self) -> FrameSource:
+        """
+        Open the video at the first frame the tracker runs on.
 
-        drone_lat = drone_info["latitude"]
-        drone_lon = drone_info["longitude"]
-        altitude = drone_info["abs_alt"]  # Absolute altitude in meters
-        focal_length = drone_info["focal_len"]  # Focal length in mm
-        gb_yaw = (
-            drone_info["gb_yaw"] + 180
-        )  # Gimbal yaw in degrees (0 - 360), we add 180 to convert it to absolute value
-
-        if gb_yaw not in range(0, 360):
-            raise ValueError("Gimbal yaw should be in the range of 0-360 degrees")
-
-        sensor_width = Config.SENSOR_WIDTH
-        sensor_height = sensor_width / (
-            Config.CAMERA_RESOLUTION_WIDTH / Config.CAMERA_RESOLUTION_HEIGHT
+        Returns:
+            FrameSource: The frames up to `stop_frame`
+        """
+        return FrameSource(
+            self.video_path,
+            start=max(0, self.start_frame - self.overlap_frames),
+            stop=self.stop_frame,
+            detector_size=Config.DETECTION_IMAGE_SIZE,
+            buffer_count=Config.FRAME_QUEUE_SIZE
+            + Config.RESULT_QUEUE_SIZE
+            + 2 * Config.DETECTION_BATCH_SIZE
+            + Config.MAX_FRAME_STRIDE,
         )
 
-        # Calculate the horizontal and vertical FOVs (in radians)
-        fov_horizontal = 2 * math.atan(sensor_width / (2 * focal_length))
-        fov_vertical = 2 * math.atan(sensor_height / (2 * focal_length))
-
-        # Calculate the ground coverage width and height
-        ground_width = 2 * (altitude * math.tan(fov_horizontal / 2))  # in meters
-        ground_height = 2 * (altitude * math.tan(fov_vertical / 2))  # in meters
-
-        # Calculate the pixel-to-meter conversion factor
-        pixel_to_meter_x = ground_width / Config.CAMERA_RESOLUTION_WIDTH
-        pixel_to_meter_y = ground_height / Config.CAMERA_RESOLUTION_HEIGHT
+    def sync_drone_data(self, frame_count: int) -> TelemetryStore:
+        """
+        Get the telemetry of every video frame by matching the frame times to the SRT times,
+        so trimmed clips and videos with a different frame rate than the SRT line up.
 
-        # Calculate the center of the image (in pixels)
-        center_x = Config.CAMERA_RESOLUTION_WIDTH / 2
-        center_y = Config.CAMERA_RESOLUTION_HEIGHT / 2
+        Args:
+            frame_count: Number of frames of the video, 0 when unknown
+        Returns:
+            TelemetryStore: The telemetry of every frame covered by the drone data
+        """
+        if self.fps <= 0:  # unknown frame rate, assume one SRT block per frame
+            return self.telemetry_sync.telemetry
+        if not frame_count:
+            frame_count = (
+                int((self.telemetry_sync.duration_ms - self.video_offset_ms) * self.fps / 1000) + 1
+            )
+        return self.telemetry_sync.for_video(self.fps, frame_count, self.video_offset_ms)
+
+    def checkpoint_state(self, frame_idx: int) -> dict:
+        """
+        Get the state needed to continue the run after the given frame.
 
-        # Calculate the displacement in pixels (relative to center)
-        displacement_x_pixels = x - center_x
-        displacement_y_pixels = y - center_y
+        Args:
+            frame_idx: The last frame that was fully processed
+        Returns:
+            dict: The tracker state
+        """
+        return {
+            "video_path": self.video_path,
+            "drone_data_path": Config.DRONE_DATA_PATH,
+            "frame_idx": frame_idx,
+            "car_ids": self.car_ids,
+            "car_colors": self.car_colors,
+            "trajectories": self.trajectories,
+            "features_offset": self.feature_sink.tell(),
+            "crop_scores": self.crop_writer.scores,
+            "reid_bank": self.reid_bank,
+            "track_aliases": self.track_aliases,
+            "last_vehicle_id": self.last_vehicle_id,
+        }
+
+    def restore_checkpoint(self, state: dict) -> None:
+        """
+        Continue a run from a checkpoint.
+        The tracker starts over after the checkpointed frame, so its ids are offset
+        past every vehicle id given out so far, including the ids of detections that
+        were never mapped (e.g. too close to the frame edge) but were recorded. Vehicles
+        visible across the restart get a new id unless re-identification links them to
+        their old one.
 
-        # Convert the displacement from pixels to meters
-        displacement_x_meters = displacement_x_pixels * pixel_to_meter_x
-        displacement_y_meters = displacement_y_pixels * pixel_to_meter_y
+        Args:
+            state: The state saved by `checkpoint_state`
+        """
+        if (state["video_path"], state["drone_data_path"]) != (
+            self.video_path,
+            Config.DRONE_DATA_PATH,
+        ):
+            raise ValueError(
+                f"The checkpoint belongs to {state['video_path']}, not {self.video_path}"
+            )
+
+        self.car_ids = state["car_ids"]
+        self.car_colors = state["car_colors"]
+        self.trajectories = state["trajectories"]
+        self.features_offset = state["features_offset"]
+        self.crop_writer.scores = state.get("crop_scores", {})
+        if self.reid_bank is not None and state.get("reid_bank") is not None:
+            # The vehicles visible across the restart can be re-linked to their old ids
+            self.reid_bank = state["reid_bank"]
+        self.track_aliases = state.get("track_aliases", {})
+        self.start_frame = state["frame_idx"] + 1
+        self.id_offset = max(state.get("last_vehicle_id", 0), max(self.car_ids, default=0))
+        self.last_vehicle_id = self.id_offset
+        self.resumed = True
+        print(f"Resuming from frame {self.start_frame}")
+
+    def save_checkpoint_if_due(self, frame_idx: int) -> None:
+        """
+        Save the tracker state if `Config.CHECKPOINT_INTERVAL` frames passed since the last checkpoint.
 
-        # Calculate the straight-line displacement (Euclidean distance)
-        displacement = math.sqrt(displacement_x_meters**2 + displacement_y_meters**2)
+        Args:
+            frame_idx: The last frame that was fully processed
+        """
+        if not self.checkpoint_path:
+            return
+        if frame_idx - self.last_checkpoint_frame < Config.CHECKPOINT_INTERVAL:
+            return
+
+        with self.profiler.stage("checkpoint"):
+            self.crop_writer.flush(wait=True)  # the saved crop scores must match the files
+            if self.detection_cache is not None:
+                self.detection_cache.flush()
+            save_checkpoint(self.checkpoint_path, self.checkpoint_state(frame_idx))
+        self.last_checkpoint_frame = frame_idx
+
+    def is_yaw_unstable(self, frame_idx: int) -> bool:
+        """
+        Check if the drone yaw changed more than `Config.DISPLACEMENT_YAW_THRESHOLD` degrees
+        between two consecutive frames of the last `Config.DISPLACEMENT_FRAME_COUNT_THRESHOLD` frames.
+        The flags of all frames are computed once when the drone data is loaded.
 
-        # If the yaw for the last M frames did cahge more than N degrees we reset the displacement
-        # to avoid dispacement when the drone is rotating fast
-        if frame_idx > Config.DISPLACEMENT_FRAME_COUNT_THRESHOLD:
-            yaw_changes = []
-            for i in range(
-                frame_idx - Config.DISPLACEMENT_FRAME_COUNT_THRESHOLD, frame_idx
-            ):
-                yaw_changes.append(
-                    abs(self.drone_data[i]["gb_yaw"] - self.drone_data[i - 1]["gb_yaw"])
-                )
-            if max(yaw_changes) > Config.DISPLACEMENT_YAW_THRESHOLD:
-                displacement = 0
+        Args:
+            frame_idx: The index of the current frame
+        Returns:
+            bool: True if the drone is rotating too fast to trust the displacement
+        """
+        return bool(self.yaw_unstable[frame_idx])
 
-        new_lat, new_lon = adjust_lat_long_with_direction(
-            drone_lat, drone_lon, displacement, gb_yaw
-        )
+    def export_trajectory(self, car_id: int, trajectory: Trajectory) -> None:
+        """
+        Write the positions of a car to the GeoJSON stream, wich is used in Mapbox visualization.
 
-        return new_lat, new_lon
+        Args:
+            car_id: The ID of the car
+            trajectory: The positions of the car
+        """
+        for frame_idx, lat, lon, confidence, delay in trajectory.columns().tolist():
+            self.feature_sink.write(
+                self.position_feature(car_id, frame_idx, lat, lon, confidence, delay)
+            )
 
-    def generate_car_geo_json(
+    def position_feature(
         self,
         car_id: int,
+        frame_idx: int,
         lat: float,
         lon: float,
         confidence: float,
-        drone_info: dict,
         delay: bool,
-    ) -> None:
+    ) -> dict:
         """
-        Generate GeoJSON data for a car's current position, wich is used in Mapbox visualization.
+        Build the GeoJSON feature of one position of a car.
 
         Args:
             car_id: The ID of the car
+            frame_idx: The index of the frame
             lat: The latitude of the car
             lon: The longitude of the car
             confidence: The confidence score of the detection
-            drone_info: The drone information
-            delay: Whether to add a delay to the car's position dot
-        """
-        self.car_geo_json_paths.append(
-            {
-                "type": "Feature",
-                "geometry": {"type": "Point", "coordinates": [lon, lat]},
-                "properties": {
-                    "vehicle_id": f"vehicle_{car_id}",
-                    "timestamp": f"2024-12-09T{str(drone_info['timestamp'][:-3])}Z",
-                    "color": f"#{self.car_colors[car_id][0]:02X}{self.car_colors[car_id][1]:02X}{self.car_colors[car_id][2]:02X}",
-                    "frame_time": drone_info["timestamp"],
-                    "confidence": f"{confidence:.4f}",
-                    "delay": delay,
-                },
-            }
-        )
+            delay: Whether this is the point of the frame that delays the map animation
+        Returns:
+            dict: GeoJSON feature
+        """
+        frame_time = format_frame_time(self.drone_data.column("timestamp_ms")[frame_idx])
+        return {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": {
+                "vehicle_id": f"vehicle_{car_id}",
+                "timestamp": f"2024-12-09T{frame_time[:-3]}Z",
+                "color": "#{:02X}{:02X}{:02X}".format(*self.car_colors[car_id]),
+                "frame_time": frame_time,
+                "frame_idx": frame_idx + self.frame_offset,
+                "confidence": f"{confidence:.4f}",
+                "delay": delay,
+            },
+        }
+
+    def flush_trajectories(self) -> None:
+        """
+        Write the trajectories of all tracked cars to the GeoJSON stream.
+        """
+        for car_id, trajectory in self.trajectories.pop_all():
+            self.export_trajectory(car_id, trajectory)
 
-    def save_vehicle_image(self, car_id: int, car_img: np.ndarray) -> None:
+    def create_vehicle_entry(self, car_id: int) -> None:
         """
-        Save the image of a found vehicle to the disk.
+        Create and add to the tracker a new entry for a vehicle that has been detected.
 
         Args:
             car_id: The ID of the vehicle
-            car_img: The image of the vehicle
         """
-        filename = f"{Config.CAR_IMAGE_PATH}/vehicle_{car_id}.jpg"
-        cv2.imwrite(filename, car_img)
+        self.car_colors[car_id] = (
+            np.random.randint(0, 255),
+            np.random.randint(0, 255),
+            np.random.randint(0, 255),
+        )
+        self.car_ids.append(car_id)
+
+    def read_frames(self) -> Iterator[tuple]:
+        """
+        Read the video frames that have matching drone data.
+        The telemetry of frames whose presentation time is off the nominal frame rate
+        is interpolated again at their real time.
+
+        Returns:
+            Iterator[tuple]: The frame index, the full-resolution frame and the frame
+                downscaled for the detector
+        """
+        for frame_idx, frame, detector_frame in self.profiler.iterate(
+            "decode", self.frame_source.read()
+        ):
+            time_ms = self.video_offset_ms + self.frame_source.frame_time_ms
+            if not self.sync_frame_time(frame_idx, time_ms):
+                self.frame_source.release_detector_frame(detector_frame)
+                self.frame_source.release(frame)
+                break  # Break the loop if we have processed all the drone data
+            if self.detection_cache is not None:
+                self.frame_times[frame_idx] = time_ms
+
+            yield frame_idx, frame, detector_frame
 
-    def create_vehicle_entry(
+    def sync_frame_time(self, frame_idx: int, time_ms: float) -> bool:
+        """
+        Interpolate the telemetry of a frame again at its presentation time when it is off
+        the nominal frame rate, after dropped frames or with a variable frame rate, and
+        update the yaw flags of the frames that compare their yaw with it.
+
+        Args:
+            frame_idx: The index of the frame
+            time_ms: The presentation time of the frame in the flight recording
+        Returns:
+            bool: False if the drone data does not cover the frame
+        """
+        if self.fps > 0:
+            expected_ms = self.video_offset_ms + frame_idx * 1000 / self.fps
+            if abs(time_ms - expected_ms) > 500 / self.fps:
+                if not self.telemetry_sync.covers(time_ms):
+                    return False
+                self.drone_data.data[frame_idx] = self.telemetry_sync.resample(time_ms).data[0]
+                self.update_yaw_flags(frame_idx)
+        return True
+
+    def update_yaw_flags(self, frame_idx: int) -> None:
+        """
+        Recompute the yaw flags that depend on the yaw of a frame whose telemetry changed,
+        those of the `Config.DISPLACEMENT_FRAME_COUNT_THRESHOLD` + 1 frames after it.
+
+        Args:
+            frame_idx: The frame whose telemetry changed
+        """
+        window = Config.DISPLACEMENT_FRAME_COUNT_THRESHOLD
+        start = max(0, frame_idx - window)
+        stop = min(len(self.drone_data), frame_idx + window + 2)
+        self.yaw_unstable[frame_idx + 1 : stop] = compute_yaw_instability(
+            self.drone_data.column("gb_yaw")[start:stop],
+            window,
+            Config.DISPLACEMENT_YAW_THRESHOLD,
+        )[frame_idx + 1 - start :]
+
+    def to_frame_detections(self, boxes) -> Detections:
+        """
+        Convert the boxes found on a detector frame to full-resolution detections.
+
+        Args:
+            boxes: The `Boxes` of a YOLO result
+        Returns:
+            Detections: The detections of the frame
+        """
+        detections = Detections.from_boxes(boxes)
+        return detections._replace(
+            xyxy=self.frame_source.to_frame_coordinates(detections.xyxy)
+        )
+
+    def process_detections(
+        self, frame_idx: int, frame: np.ndarray, detections: Detections
+    ) -> None:
+        """
+        Georeference the detections of one frame, keep the best crop of every vehicle
+        and add their positions to the GeoJSON data.
+
+        Args:
+            frame_idx: The index of the frame
+            frame: The frame the detections were made on
+            detections: The tracked detections of the frame
+        """
+        # Skip the untracked detections and the classes that are not vehicles
+        tracked = (detections.track_id != 0) & np.isin(
+            detections.class_id, Config.INTERESTED_CLASS_IDS
+        )
+        if len(detections.track_id):
+            self.last_vehicle_id = max(
+                self.last_vehicle_id, int(detections.track_id.max()) + self.id_offset
+            )
+
+        if self.overlap_frames and (
+            frame_idx < self.start_frame
+            or frame_idx >= self.stop_frame - self.overlap_frames
+        ):
+            self.overlap_detections[frame_idx] = (
+                np.array(
+                    [
+                        self.track_aliases.get(car_id, car_id)
+                        for car_id in (detections.track_id[tracked] + self.id_offset).tolist()
+                    ],
+                    dtype=np.int64,
+                ),
+                detections.xyxy[tracked],
+            )
+        if frame_idx < self.start_frame:
+            return  # The tracker is only warming up on this frame
+
+        drone_info = self.drone_data[frame_idx]
+
+        # Extracting the coordinates from the detection boxes (xyxy format)
+        boxes = detections.xyxy.astype(int)
+        x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+        keep = (
+            tracked
+            # Skip the detections that are too close to the frame
+            & (x1 >= Config.CLOSE_TO_FRAME_PIXELS)
+            & (y1 >= Config.CLOSE_TO_FRAME_PIXELS)
+            & (x2 <= frame.shape[1] - Config.CLOSE_TO_FRAME_PIXELS)
+            & (y2 <= frame.shape[0] - Config.CLOSE_TO_FRAME_PIXELS)
+        )
+        if not keep.any():
+            return
+
+        boxes = boxes[keep]
+        car_ids = (detections.track_id[keep] + self.id_offset).tolist()
+        confidences = detections.conf[keep]
+
+        lats, lons = self.projector.project(
+            (boxes[:, 0] + boxes[:, 2]) // 2,
+            (boxes[:, 1] + boxes[:, 3]) // 2,
+            drone_info["latitude"],
+            drone_info["longitude"],
+            drone_info["abs_alt"],
+            drone_info["focal_len"],
+            drone_info["gb_yaw"],
+            self.is_yaw_unstable(frame_idx),
+        )
+        if self.reid_bank is not None:
+            # A vehicle near the frame edge is still visible, so it can't be a new track
+            visible_ids = {
+                self.track_aliases.get(car_id, car_id)
+                for car_id in (detections.track_id[tracked] + self.id_offset).tolist()
+            }
+            car_ids = self.relink_tracks(
+                frame_idx, frame, boxes, car_ids, lats, lons, visible_ids
+            )
+
+        for box_index, (car_id, (x1, y1, x2, y2), lat, lon, confidence) in enumerate(
+            zip(car_ids, boxes.tolist(), lats.tolist(), lons.tolist(), confidences)
+        ):
+            if car_id not in self.car_ids:
+                self.create_vehicle_entry(car_id)
+            self.crop_writer.offer(car_id, frame, x1, y1, x2, y2, confidence)
+
+            # Add the car's current position to its trajectory
+            self.trajectories.append(
+                car_id,
+                frame_idx,
+                lat,
+                lon,
+                confidence,
+                delay=box_index == 0,  # add delay only to one point on the frame
+            )
+
+    def relink_tracks(
         self,
-        car_id: int,
+        frame_idx: int,
         frame: np.ndarray,
-        x1: int,
-        y1: int,
-        x2: int,
-        y2: int,
-    ) -> None:
+        boxes: np.ndarray,
+        car_ids: list,
+        lats: np.ndarray,
+        lons: np.ndarray,
+        visible_ids: set,
+    ) -> list:
         """
-        Create and add to the tracker a new entry for a vehicle that has been detected.
+        Give the new tracks that are a vehicle lost a few frames ago the id of that vehicle,
+        and record the position and color of every vehicle of the frame in the re-ID bank.
 
         Args:
-            car_id: The ID of the vehicle
-            frame: The current frame
-            x1: The x-coordinate of the top-left corner of the vehicle bounding box
-            y1: The y-coordinate of the top-left corner of the vehicle bounding box
-            x2: The x-coordinate of the bottom-right corner of the vehicle bounding box
-            y2: The y-coordinate of the bottom-right corner of the vehicle bounding
+            frame_idx: The index of the frame
+            frame: The frame the detections were made on
+            boxes: The xyxy boxes of the detections
+            car_ids: The vehicle ids of the detections
+            lats: The latitudes of the detections
+            lons: The longitudes of the detections
+            visible_ids: The vehicle ids of all tracked detections of the frame, including
+                those too close to the frame edge to be georeferenced
+        Returns:
+            list: The vehicle ids of the detections after re-linking
+        """
+        car_ids = [self.track_aliases.get(car_id, car_id) for car_id in car_ids]
+        refresh = frame_idx % Config.REID_UPDATE_INTERVAL == 0
+
+        # Record the vehicles still tracked first, so they are not candidates for the new tracks
+        new_tracks = []
+        for index, car_id in enumerate(car_ids):
+            if car_id not in self.reid_bank:
+                new_tracks.append(index)
+                continue
+            signature = hsv_signature(frame, *boxes[index].tolist()) if refresh else None
+            self.reid_bank.update(car_id, frame_idx, lats[index], lons[index], signature)
+
+        for index in new_tracks:
+            signature = hsv_signature(frame, *boxes[index].tolist())
+            vehicle_id = self.reid_bank.match(
+                signature, frame_idx, lats[index], lons[index], exclude=visible_ids
+            )
+            if vehicle_id is not None:
+                self.track_aliases[car_ids[index]] = vehicle_id
+                car_ids[index] = vehicle_id
+            self.reid_bank.update(car_ids[index], frame_idx, lats[index], lons[index], signature)
+        return car_ids
+
+    def postprocess_frame(
+        self, frame_idx: int, frame: np.ndarray, detections: Detections
+    ) -> None:
         """
-        y1_pad = max(0, y1 - Config.IMAGE_PADDING)
-        y2_pad = min(frame.shape[0], y2 + Config.IMAGE_PADDING)
-        x1_pad = max(0, x1 - Config.IMAGE_PADDING)
-        x2_pad = min(frame.shape[1], x2 + Config.IMAGE_PADDING)
-        car_img = frame[y1_pad:y2_pad, x1_pad:x2_pad].copy()
+        Process the detections of a frame, write the trajectories of the vehicles that left
+        to the GeoJSON stream, queue the improved vehicle crops for writing every
+        `Config.CROP_FLUSH_INTERVAL` frames and checkpoint the tracker state when it is due.
 
-        self.save_vehicle_image(car_id, car_img)
+        Args:
+            frame_idx: The index of the frame
+            frame: The frame the detections were made on
+            detections: The tracked detections of the frame
+        """
+        self.profiler.count("detections", len(detections.conf))
+        with self.profiler.stage("georeference"):
+            self.process_detections(frame_idx, frame, detections)
+        if self.detection_cache is not None:
+            with self.profiler.stage("record_detections"):
+                self.record_detections(frame_idx, detections)
+        with self.profiler.stage("write_features"):
+            for car_id, trajectory in self.trajectories.pop_stale(
+                frame_idx, Config.TRACK_RETIRE_FRAMES
+            ):
+                self.export_trajectory(car_id, trajectory)
+        if frame_idx % Config.CROP_FLUSH_INTERVAL == 0:
+            with self.profiler.stage("crop_flush"):
+                self.crop_writer.flush()
+        self.save_checkpoint_if_due(frame_idx)
+        self.frame_source.release(frame)
+        self.profiler.frame_done()
+
+    def record_detections(self, frame_idx: int, detections: Detections) -> None:
+        """
+        Add the detections of a frame to the detection cache, with the vehicle ids they got
+        on this frame so a replay needs neither the id offset nor the re-identification.
 
-        self.car_colors[car_id] = (
-            np.random.randint(0, 255),
-            np.random.randint(0, 255),
-            np.random.randint(0, 255),
+        Args:
+            frame_idx: The index of the frame
+            detections: The tracked detections of the frame
+        """
+        vehicle_ids = [
+            self.track_aliases.get(car_id, car_id) if track_id else 0
+            for track_id, car_id in zip(
+                detections.track_id.tolist(), (detections.track_id + self.id_offset).tolist()
+            )
+        ]
+        self.detection_cache.write(
+            frame_idx,
+            self.frame_times.pop(frame_idx),
+            detections._replace(track_id=np.array(vehicle_ids, dtype=np.int64)),
         )
-        self.car_ids.append(car_id)
+
+    def detect_frames(self, detector: YOLODetector, frames: Iterator) -> Iterator:
+        """
+        Run the detector over the frames in batches of `Config.DETECTION_BATCH_SIZE`.
+
+        Args:
+            detector: The YOLO detector
+            frames: The frames from `read_frames` to run the detection on
+        Returns:
+            Iterator[tuple]: The frame index, the frame and its detections, in frame order
+        """
+        if Config.MAX_FRAME_STRIDE > 1:
+            yield from self.detect_keyframes(detector, frames)
+            return
+
+        if Config.DETECTION_BATCH_SIZE == 1:
+            for frame_idx, frame, detector_frame in frames:
+                with self.profiler.stage("detect"):
+                    boxes = detector.detect_objects(detector_frame)
+                detections = self.to_frame_detections(boxes)
+                self.frame_source.release_detector_frame(detector_frame)
+                yield frame_idx, frame, detections
+            return
+
+        for batch in batched(frames, Config.DETECTION_BATCH_SIZE):
+            with self.profiler.stage("detect"):
+                batch_boxes = detector.detect_objects_batch(
+                    [detector_frame for _, _, detector_frame in batch]
+                )
+            batch_detections = [self.to_frame_detections(boxes) for boxes in batch_boxes]
+            for (frame_idx, frame, detector_frame), detections in zip(batch, batch_detections):
+                self.frame_source.release_detector_frame(detector_frame)
+                yield frame_idx, frame, detections
+
+    def detect_keyframes(self, detector: YOLODetector, frames: Iterator) -> Iterator:
+        """
+        Run the detector only on keyframes and interpolate the boxes of the frames between them.
+        The keyframe stride grows up to `Config.MAX_FRAME_STRIDE` while the same vehicles stay
+        in view, and falls back to every frame when vehicles appear or leave, or when the
+        drone yaw is unstable. Keyframes are detected one at a time, since every stride
+        depends on the detections of the previous keyframe.
+
+        Args:
+            detector: The YOLO detector
+            frames: The frames from `read_frames` to run the detection on
+        Returns:
+            Iterator[tuple]: The frame index, the frame and its detections, in frame order
+        """
+        stride = AdaptiveStride(Config.MAX_FRAME_STRIDE)
+        keyframe = None
+        skipped = []
+        next_keyframe = 0
+
+        def detect(frame_idx: int, frame: np.ndarray, detector_frame: np.ndarray) -> Iterator:
+            nonlocal keyframe, skipped, next_keyframe
+            with self.profiler.stage("detect"):
+                boxes = detector.detect_objects(detector_frame)
+            detections = self.to_frame_detections(boxes)
+            self.frame_source.release_detector_frame(detector_frame)
+            for skipped_idx, skipped_frame, skipped_detector_frame in skipped:
+                self.frame_source.release_detector_frame(skipped_detector_frame)
+                fraction = (skipped_idx - keyframe[0]) / (frame_idx - keyframe[0])
+                yield skipped_idx, skipped_frame, interpolate_detections(
+                    keyframe[1], detections, fraction
+                )
+            yield frame_idx, frame, detections
+
+            keyframe = (frame_idx, detections)
+            skipped = []
+            step = stride.update(detections.track_id)
+            if self.yaw_unstable[frame_idx + 1 : frame_idx + step + 1].any():
+                step = stride.reset()
+            next_keyframe = frame_idx + step
+
+        for frame_idx, frame, detector_frame in frames:
+            if frame_idx < next_keyframe:
+                skipped.append((frame_idx, frame, detector_frame))
+            else:
+                yield from detect(frame_idx, frame, detector_frame)
+        if skipped:
+            yield from detect(*skipped.pop())
 
     def run_recognition(self, detector: YOLODetector) -> None:
         """
@@ -214,73 +826,135 @@ class CarTracker:
         If a similar car is not found, we create a new car entry in the tracker.
         After processing all the frames, we save the GeoJSON data, image data, and other map data.
         """
-        while self.cap.isOpened():
-            ret, frame = self.cap.read()
-            if not ret:  # If the frame is not read correctly, break the loop
-                break
+        self.profiler.start_frames()
+        if Config.PIPELINE_ENABLED:
+            self.run_pipelined_recognition(detector)
+            return
 
-            frame_idx = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
-            if frame_idx >= len(self.drone_data):
-                break  # Break the loop if we have processed all the drone data
-
-            drone_info = self.drone_data[frame_idx]
-            detections = detector.detect_objects(frame)
-
-            box_index = 0
-            for box in detections:
-                if not box.id:
-                    continue
-
-                class_id = box.cls[0]
-                if class_id not in Config.INTERESTED_CLASS_IDS:
-                    continue  # Skip the class if it is not a vehicle
-
-                x1, y1, x2, y2 = box.xyxy[
-                    0
-                ]  # Extracting the coordinates from the detection box (xyxy format)
-                x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                # Skip the detection if it is too close to the frame
-                if (
-                    x1 < Config.CLOSE_TO_FRAME_PIXELS
-                    or y1 < Config.CLOSE_TO_FRAME_PIXELS
-                    or x2 > frame.shape[1] - Config.CLOSE_TO_FRAME_PIXELS
-                    or y2 > frame.shape[0] - Config.CLOSE_TO_FRAME_PIXELS
-                ):
-                    continue
-
-                car_id = int(box.id[0])
-
-                if car_id and car_id not in self.car_ids:
-                    self.create_vehicle_entry(car_id, frame, x1, y1, x2, y2)
-
-                lat, lon = self.map_to_coordinates(
-                    (x1 + x2) // 2, (y1 + y2) // 2, frame_idx, drone_info
-                )
-
-                # Add the car's current position to the GeoJSON feature collection
-                self.generate_car_geo_json(
-                    car_id,
-                    lat,
-                    lon,
-                    box.conf[0],
-                    drone_info,
-                    delay=True
-                    if box_index == 0
-                    else False,  # add delay only to one point on the frame
-                )
-                box_index += 1
+        for frame_idx, frame, detections in self.detect_frames(
+            detector, self.read_frames()
+        ):
+            self.postprocess_frame(frame_idx, frame, detections)
 
-                # For other maps (e.g., kepler.gl or folium)
-                if car_id not in self.car_geo_paths:
-                    self.car_geo_paths[car_id] = []
-                self.car_geo_paths[car_id].append((lat, lon))
+    def run_pipelined_recognition(self, detector: YOLODetector) -> None:
+        """
+        Run the car recognition pipeline as three concurrent stages:
+        a decoder thread reading frames, the detector on the calling thread and
+        a post-processing thread georeferencing the detections and saving crops.
+        The stages are connected with bounded queues, so a slow stage throttles
+        the others, and every stage handles frames in video order.
+        """
+        frames = threaded_iter(
+            self.read_frames(),
+            maxsize=Config.FRAME_QUEUE_SIZE,
+            depth=lambda size: self.profiler.gauge("frame_queue", size),
+        )
+        with ThreadedConsumer(
+            self.postprocess_frame, maxsize=Config.RESULT_QUEUE_SIZE
+        ) as postprocessing:
+            for frame_idx, frame, detections in self.detect_frames(detector, frames):
+                self.profiler.gauge("result_queue", postprocessing.items.qsize())
+                postprocessing.submit(frame_idx, frame, detections)
 
 
 if __name__ == "__main__":
-    with CarTracker() as tracker:
-        detector = YOLODetector(
-            Config.YOLO_MODEL_PATH,
-            conf_threshold=Config.CONFIDENCE_THRESHOLD,
-            iou_threshold=Config.IOU_THRESHOLD,
+    parser = argparse.ArgumentParser(description="Map vehicle paths from drone footage")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="process overlapping frame ranges of the video in parallel processes",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue an interrupted run from its last checkpoint",
+    )
+    parser.add_argument(
+        "--chunk",
+        nargs=2,
+        action="append",
+        metavar=("VIDEO", "START_SECONDS"),
+        help="process a clip cut out of the flight video at the given start time, repeat for several clips",
+    )
+    parser.add_argument(
+        "--live",
+        metavar="URL",
+        help="track the vehicles of a live stream (e.g. rtsp:// or udp://) and publish their positions",
+    )
+    parser.add_argument(
+        "--telemetry",
+        default=Config.DRONE_DATA_PATH,
+        help="live telemetry as udp://host:port, or a telemetry file to replay (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="with --live, replay a video file at its frame rate instead of reading a stream",
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="MANIFEST",
+        help="process the flights listed in a JSON manifest, --workers at a time, "
+        "skipping the ones whose result is up to date",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="with --batch, process the flights even if their result is up to date",
+    )
+    parser.add_argument(
+        "--from-detections",
+        metavar="DIR",
+        help="georeference and export the detections an earlier run recorded to "
+        "Config.DETECTION_CACHE_DIR again, without the video or the detector",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=Config.PROFILE_TRACE_PATH,
+        metavar="TRACE_PATH",
+        help="time every stage, print a summary and write a Chrome trace (default: %(const)s)",
+    )
+    args = parser.parse_args()
+
+    profiler = StageProfiler() if args.profile else None
+    if profiler and (args.chunk or args.batch or args.workers > 1):
+        parser.error("--profile needs a single process run, without --workers, --chunk or --batch")
+
+    if args.from_detections:
+        from replay import run_replay
+
+        run_replay(args.from_detections, profiler=profiler)
+    elif args.batch:
+        from batch import run_batch
+
+        run_batch(args.batch, max(1, args.workers), force=args.force)
+    elif args.live:
+        from live import run_live_recognition
+
+        run_live_recognition(args.live, args.telemetry, replay=args.replay, profiler=profiler)
+    elif args.chunk:
+        from sharding import run_chunked_recognition
+
+        run_chunked_recognition(
+            [(video_path, float(start) * 1000) for video_path, start in args.chunk],
+            max(1, args.workers),
         )
-        tracker.run_recognition(detector)
+    elif args.workers > 1:
+        from sharding import run_sharded_recognition
+
+        run_sharded_recognition(args.workers)
+    else:
+        with CarTracker(
+            checkpoint_path=Config.CHECKPOINT_PATH,
+            resume=args.resume,
+            detections_path=Config.DETECTION_CACHE_DIR,
+            profiler=profiler,
+        ) as tracker:
+            tracker.run_recognition(create_detector())
+
+    if profiler:
+        print(profiler.format_summary())
+        profiler.save(args.profile)
+        print(f"Saved the trace to {args.profile}")
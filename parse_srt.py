@@ -1,80 +1,241 @@
 import json
 import re
 
-from datetime import datetime
-from typing import List, Dict
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterator, List, TextIO
 
+import numpy as np
 
-def parse_srt(filename: str) -> List[Dict]:
+from preprocessing.drone_data import TELEMETRY_DTYPE, save_telemetry
+
+# [iso: 100] [shutter: 1/798.21] [fnum: 2.8] [ev: 0] [color_md : default] [ae_meter_md: 1] [focal_len: 24.00] [dzoom_ratio: 1.00], [latitude: 48.267013] [longitude: 25.914562] [rel_alt: 102.229 abs_alt: 426.185] [gb_yaw: -65.8 gb_pitch: -89.9 gb_roll: 0.0]
+
+# All fields of a DJI frame block, in the order the drone writes them
+SRT_FRAME_RE = re.compile(
+    r"FrameCnt: (\d+), DiffTime: (\d+)ms.*?"
+    r"(\d{4}-\d{2}-\d{2}) (\d{2}):(\d{2}):(\d{2})\.(\d{3}).*?"
+    r"focal_len: ([\d.-]+).*?"
+    r"latitude: ([\d.-]+).*?longitude: ([\d.-]+).*?"
+    r"rel_alt: ([\d.-]+).*?abs_alt: ([\d.-]+).*?"
+    r"gb_yaw: ([\d.-]+).*?gb_pitch: ([\d.-]+).*?gb_roll: ([\d.-]+)",
+    re.DOTALL,
+)
+
+# Fallback patterns for blocks with missing or reordered fields
+frame_re = re.compile(r"FrameCnt: (\d+), DiffTime: (\d+)ms")
+timestamp_re = re.compile(r"(\d{4}-\d{2}-\d{2}) (\d{2}):(\d{2}):(\d{2})\.(\d{3})")
+gps_re = re.compile(r"latitude: ([\d.-]+).*?longitude: ([\d.-]+)")
+alt_re = re.compile(r"rel_alt: ([\d.-]+).*?abs_alt: ([\d.-]+)")
+gb_re = re.compile(r"gb_yaw: ([\d.-]+).*?gb_pitch: ([\d.-]+).*?gb_roll: ([\d.-]+)")
+focal_len_re = re.compile(r"focal_len: ([\d.-]+)")
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@lru_cache(maxsize=16)
+def _epoch_ms(day: str) -> int:
     """
-    Parse an SRT file and extract frame data into a list of dictionaries.
+    Milliseconds from the Unix epoch to the start of a day in the YYYY-MM-DD format.
+    """
+    return (date.fromisoformat(day).toordinal() - EPOCH_ORDINAL) * 86_400_000
+
+
+def _timestamp_ms(day: str, hour: str, minute: str, second: str, millisecond: str) -> int:
+    return (
+        _epoch_ms(day)
+        + ((int(hour) * 60 + int(minute)) * 60 + int(second)) * 1000
+        + int(millisecond)
+    )
+
+
+def iter_srt_blocks(file: TextIO) -> Iterator[str]:
+    """
+    Lazily split an SRT file into the blocks of each frame.
 
     Args:
-        filename (str): Path to the SRT file
-    
+        file (TextIO): Opened SRT file
     Returns:
-        List[Dict]: List of dictionaries containing frame data
-    
+        Iterator[str]: The text of every non-empty block
     """
-    data_list = []
-    with open(filename, "r", encoding="utf-8") as file:
-        content = file.read()
+    lines = []
+    for line in file:
+        if line.strip():
+            lines.append(line)
+        elif lines:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+def parse_block(block: str) -> Dict:
+    """
+    Parse the fields of a frame block one by one, skipping the ones that are missing.
 
-    # Split the content into blocks for each frame
-    blocks = content.strip().split("\n\n")
+    Args:
+        block (str): The text of a frame block
+    Returns:
+        Dict: The frame data that was found in the block
+    """
+    frame_data = {}
+
+    # Extract frame count and diff time
+    frame_match = frame_re.search(block)
+    if frame_match:
+        frame_data["frame_cnt"] = int(frame_match.group(1))
+        frame_data["diff_time"] = f"{frame_match.group(2)}ms"
+
+    # Extract timestamp
+    timestamp_match = timestamp_re.search(block)
+    if timestamp_match:
+        _, hour, minute, second, millisecond = timestamp_match.groups()
+        frame_data["timestamp"] = f"{hour}:{minute}:{second}:{millisecond}"
+
+    # Extract GPS data
+    gps_match = gps_re.search(block)
+    if gps_match:
+        frame_data["latitude"] = float(gps_match.group(1))
+        frame_data["longitude"] = float(gps_match.group(2))
+
+    # Extract altitude data
+    alt_match = alt_re.search(block)
+    if alt_match:
+        frame_data["rel_alt"] = float(alt_match.group(1))
+        frame_data["abs_alt"] = float(alt_match.group(2))
+
+    # Extract gimbal data
+    gb_match = gb_re.search(block)
+    if gb_match:
+        frame_data["gb_yaw"] = float(gb_match.group(1))
+        frame_data["gb_pitch"] = float(gb_match.group(2))
+        frame_data["gb_roll"] = float(gb_match.group(3))
+
+    # Extract focal length
+    focal_len_match = focal_len_re.search(block)
+    if focal_len_match:
+        frame_data["focal_len"] = float(focal_len_match.group(1))
+
+    return frame_data
+
+
+def iter_srt_frames(file: TextIO) -> Iterator[Dict]:
+    """
+    Lazily parse the frames of an SRT file into dictionaries.
 
-    # [iso: 100] [shutter: 1/798.21] [fnum: 2.8] [ev: 0] [color_md : default] [ae_meter_md: 1] [focal_len: 24.00] [dzoom_ratio: 1.00], [latitude: 48.267013] [longitude: 25.914562] [rel_alt: 102.229 abs_alt: 426.185] [gb_yaw: -65.8 gb_pitch: -89.9 gb_roll: 0.0]
+    Args:
+        file (TextIO): Opened SRT file
+    Returns:
+        Iterator[Dict]: The frame data of every block
+    """
+    for block in iter_srt_blocks(file):
+        match = SRT_FRAME_RE.search(block)
+        if match is None:
+            yield parse_block(block)
+            continue
+
+        (
+            frame_cnt,
+            diff_time,
+            _,
+            hour,
+            minute,
+            second,
+            millisecond,
+            focal_len,
+            latitude,
+            longitude,
+            rel_alt,
+            abs_alt,
+            gb_yaw,
+            gb_pitch,
+            gb_roll,
+        ) = match.groups()
+        yield {
+            "frame_cnt": int(frame_cnt),
+            "diff_time": f"{diff_time}ms",
+            "timestamp": f"{hour}:{minute}:{second}:{millisecond}",
+            "latitude": float(latitude),
+            "longitude": float(longitude),
+            "rel_alt": float(rel_alt),
+            "abs_alt": float(abs_alt),
+            "gb_yaw": float(gb_yaw),
+            "gb_pitch": float(gb_pitch),
+            "gb_roll": float(gb_roll),
+            "focal_len": float(focal_len),
+        }
+
+
+def iter_srt_records(file: TextIO) -> Iterator[tuple]:
+    """
+    Lazily parse the frames of an SRT file into tuples in the field order of `TELEMETRY_DTYPE`.
+    Missing numeric fields are NaN and missing counters are -1.
 
-    frame_re = re.compile(r"FrameCnt: (\d+), DiffTime: (\d+ms)")
-    timestamp_re = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{3})")
-    gps_re = re.compile(r"latitude: ([\d.-]+).*?longitude: ([\d.-]+)")
-    alt_re = re.compile(r"rel_alt: ([\d.-]+).*?abs_alt: ([\d.-]+)")
-    gb_re = re.compile(r"gb_yaw: ([\d.-]+).*?gb_pitch: ([\d.-]+).*?gb_roll: ([\d.-]+)")
-    focal_len = re.compile(r"focal_len: ([\d.-]+)")
+    Args:
+        file (TextIO): Opened SRT file
+    Returns:
+        Iterator[tuple]: The frame data of every block
+    """
+    for block in iter_srt_blocks(file):
+        match = SRT_FRAME_RE.search(block)
+        if match is not None:
+            groups = match.groups()
+            yield (
+                int(groups[0]),
+                int(groups[1]),
+                _timestamp_ms(*groups[2:7]),
+                float(groups[8]),
+                float(groups[9]),
+                float(groups[10]),
+                float(groups[11]),
+                float(groups[12]),
+                float(groups[13]),
+                float(groups[14]),
+                float(groups[7]),
+            )
+            continue
+
+        frame_data = parse_block(block)
+        diff_time = frame_data.get("diff_time")
+        timestamp_match = timestamp_re.search(block)
+        yield (
+            frame_data.get("frame_cnt", -1),
+            int(diff_time[:-2]) if diff_time else -1,
+            _timestamp_ms(*timestamp_match.groups()) if timestamp_match else -1,
+            *(
+                frame_data.get(name, np.nan)
+                for name in TELEMETRY_DTYPE.names[3:]
+            ),
+        )
 
-    for block in blocks:
-        frame_data = {}
 
-        # Extract frame count and diff time
-        frame_match = frame_re.search(block)
-        if frame_match:
-            frame_data["frame_cnt"] = int(frame_match.group(1))
-            frame_data["diff_time"] = frame_match.group(2)
+def parse_srt(filename: str) -> List[Dict]:
+    """
+    Parse an SRT file and extract frame data into a list of dictionaries.
 
-        # Extract timestamp
-        timestamp_match = timestamp_re.search(block)
-        if timestamp_match:
-            frame_data["timestamp"] = datetime.strptime(
-                timestamp_match.group(1), "%Y-%m-%d %H:%M:%S.%f"
-            ).strftime("%H:%M:%S:%f")[:-3]
+    Args:
+        filename (str): Path to the SRT file
 
-        # Extract GPS data
-        gps_match = gps_re.search(block)
-        if gps_match:
-            frame_data["latitude"] = float(gps_match.group(1))
-            frame_data["longitude"] = float(gps_match.group(2))
+    Returns:
+        List[Dict]: List of dictionaries containing frame data
 
-        # Extract altitude data
-        alt_match = alt_re.search(block)
-        if alt_match:
-            frame_data["rel_alt"] = float(alt_match.group(1))
-            frame_data["abs_alt"] = float(alt_match.group(2))
+    """
+    with open(filename, "r", encoding="utf-8") as file:
+        return list(iter_srt_frames(file))
 
-        # Extract gimbal data
-        gb_match = gb_re.search(block)
-        if gb_match:
-            frame_data["gb_yaw"] = float(gb_match.group(1))
-            frame_data["gb_pitch"] = float(gb_match.group(2))
-            frame_data["gb_roll"] = float(gb_match.group(3))
 
-        # Extract focal length
-        focal_len_match = focal_len.search(block)
-        if focal_len_match:
-            frame_data["focal_len"] = float(focal_len_match.group(1))
+def parse_srt_columns(filename: str) -> np.ndarray:
+    """
+    Parse an SRT file into a structured array with one row per frame.
 
-        data_list.append(frame_data)
+    Args:
+        filename (str): Path to the SRT file
 
-    return data_list
+    Returns:
+        np.ndarray: Structured array of `TELEMETRY_DTYPE`
+    """
+    with open(filename, "r", encoding="utf-8") as file:
+        return np.fromiter(iter_srt_records(file), dtype=TELEMETRY_DTYPE)
 
 
 if __name__ == "__main__":
@@ -82,3 +243,4 @@ if __name__ == "__main__":
     parsed_data = parse_srt(filename)
     with open("parsedSRT.json", "w") as f:
         f.write(json.dumps(parsed_data))
+    save_telemetry("parsedSRT.npy", parse_srt_columns(filename))
@@ -0,0 +1,131 @@
+import queue
+import threading
+from typing import Callable, Iterable, Iterator
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def _put(items: queue.Queue, item, stop: threading.Event) -> bool:
+    """
+    Put an item into a bounded queue, giving up once the stop event is set.
+
+    Args:
+        items: The queue to put the item into
+        item: The item to put
+        stop: Event signalling that the consumer went away
+    Returns:
+        bool: True if the item was queued
+    """
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def threaded_iter(iterable: Iterable, maxsize: int, depth: Callable = None) -> Iterator:
+    """
+    Iterate over an iterable in a background thread.
+    Up to `maxsize` items are buffered ahead of the consumer, so a slow consumer
+    blocks the producer (backpressure) and items keep their original order.
+    Exceptions raised by the producer are re-raised in the consumer.
+
+    Args:
+        iterable: The iterable to consume in the background
+        maxsize: Maximum number of buffered items
+        depth: Called with the number of buffered items every time the consumer takes one
+    Returns:
+        Iterator: The items of the iterable, in order
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                if not _put(items, item, stop):
+                    return
+            _put(items, _DONE, stop)
+        except BaseException as exc:
+            _put(items, _Failure(exc), stop)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if depth is not None:
+                depth(items.qsize())
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+class ThreadedConsumer:
+    """
+    Run a function over submitted items in a single background thread.
+    Items are processed in submission order; `submit` blocks while `maxsize`
+    items are waiting. The first exception raised by the function is re-raised
+    on the next `submit` or on `close`.
+    """
+
+    def __init__(self, func: Callable, maxsize: int):
+        self.func = func
+        self.items = queue.Queue(maxsize=maxsize)
+        self.error = None
+        self.thread = threading.Thread(target=self._consume, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.items.put(_DONE)
+            self.thread.join()
+
+    def _consume(self) -> None:
+        while True:
+            args = self.items.get()
+            if args is _DONE:
+                return
+            if self.error is not None:
+                continue  # keep draining so the producer never blocks
+            try:
+                self.func(*args)
+            except BaseException as exc:
+                self.error = exc
+
+    def submit(self, *args) -> None:
+        """
+        Queue a call of the function with the given arguments.
+
+        Args:
+            args: The arguments to call the function with
+        """
+        if self.error is not None:
+            raise self.error
+        self.items.put(args)
+
+    def close(self) -> None:
+        """
+        Wait until all submitted items are processed.
+        """
+        self.items.put(_DONE)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
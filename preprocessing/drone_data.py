@@ -1,6 +1,283 @@
 import json
+import os
 
+import numpy as np
+
+# Columnar layout of the drone telemetry, one row per video frame
+TELEMETRY_DTYPE = np.dtype(
+    [
+        ("frame_cnt", np.int64),
+        ("diff_time_ms", np.int32),
+        ("timestamp_ms", np.int64),  # milliseconds since the Unix epoch
+        ("latitude", np.float64),
+        ("longitude", np.float64),
+        ("rel_alt", np.float64),
+        ("abs_alt", np.float64),
+        ("gb_yaw", np.float64),
+        ("gb_pitch", np.float64),
+        ("gb_roll", np.float64),
+        ("focal_len", np.float64),
+    ]
+)
+
+
+class TelemetryFrame:
+    """
+    Read-only view of one frame of a `TelemetryStore`.
+    Fields are available as attributes or, like the parsed SRT dictionaries, by key.
+    """
+
+    __slots__ = ("_columns", "_index")
+
+    def __init__(self, columns: dict, index: int):
+        self._columns = columns
+        self._index = index
+
+    def __getattr__(self, name: str):
+        try:
+            return self._columns[name][self._index]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, name: str):
+        if name == "timestamp":
+            return self.timestamp
+        if name == "diff_time":
+            return f"{self.diff_time_ms}ms"
+        return self._columns[name][self._index]
+
+    @property
+    def timestamp(self) -> str:
+        return format_frame_time(self._columns["timestamp_ms"][self._index])
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={self[name]!r}" for name in self._columns)
+        return f"TelemetryFrame({fields})"
+
+
+class TelemetryStore:
+    """
+    Drone telemetry backed by a structured array of `TELEMETRY_DTYPE`.
+
+    Frames are looked up by index, by timestamp or sliced without copying the
+    data, and rows are returned as lightweight `TelemetryFrame` views. A store
+    opened from a `.npy` file is memory-mapped, pickling it only sends the path
+    and the frame range, so worker processes share the page cache instead of
+    copies of the telemetry.
+    """
+
+    def __init__(self, data: np.ndarray, path: str = None, start: int = 0):
+        if data.dtype != TELEMETRY_DTYPE:
+            raise ValueError("Telemetry must be a structured array of TELEMETRY_DTYPE")
+        self.data = data
+        self.path = path
+        self.start = start
+        self._columns = {name: data[name] for name in TELEMETRY_DTYPE.names}
+
+    @classmethod
+    def open(
+        cls, file_path: str, start: int = 0, stop: int = None, mmap_mode: str = "r"
+    ) -> "TelemetryStore":
+        """
+        Memory-map a telemetry file written with `save_telemetry`.
+
+        Args:
+            file_path (str): Path to the `.npy` file
+            start (int): First frame of the store
+            stop (int): End of the frame range (exclusive), defaults to the last frame
+            mmap_mode (str): "c" to allow changing rows in memory without writing the file
+        Returns:
+            TelemetryStore: The telemetry of the frame range
+        """
+        data = load_telemetry(file_path, mmap_mode=mmap_mode)
+        return cls(data[start:stop], path=file_path, start=start)
+
+    @classmethod
+    def from_records(cls, records: list) -> "TelemetryStore":
+        """
+        Create an in-memory store from parsed SRT dictionaries.
+        The dictionaries only contain the time of day, so the timestamps are
+        milliseconds since midnight.
+
+        Args:
+            records (list): List of frame dictionaries from `parse_srt`
+        Returns:
+            TelemetryStore: The telemetry of the frames
+        """
+        data = np.empty(len(records), dtype=TELEMETRY_DTYPE)
+        for name in TELEMETRY_DTYPE.names[3:]:
+            data[name] = [record.get(name, np.nan) for record in records]
+        data["frame_cnt"] = [record.get("frame_cnt", -1) for record in records]
+        data["diff_time_ms"] = [
+            int(record["diff_time"][:-2]) if "diff_time" in record else -1
+            for record in records
+        ]
+        data["timestamp_ms"] = [
+            parse_frame_time(record["timestamp"]) if "timestamp" in record else -1
+            for record in records
+        ]
+        return cls(data)
+
+    def __reduce__(self):
+        if self.path is not None:
+            return TelemetryStore.open, (self.path, self.start, self.start + len(self))
+        return TelemetryStore, (np.ascontiguousarray(self.data),)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return TelemetryStore(self.data[index])
+            return TelemetryStore(
+                self.data[start:stop], path=self.path, start=self.start + start
+            )
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Frame index out of range")
+        return TelemetryFrame(self._columns, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield TelemetryFrame(self._columns, index)
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Get all values of a field.
+
+        Args:
+            name (str): Name of a `TELEMETRY_DTYPE` field
+        Returns:
+            np.ndarray: The values of every frame, without copying
+        """
+        return self._columns[name]
+
+    def frame_at_time(self, timestamp_ms) -> np.ndarray:
+        """
+        Find the frames closest in time to the given timestamps.
+        The telemetry timestamps must be sorted, which they are for SRT files.
+
+        Args:
+            timestamp_ms: Timestamp or array of timestamps in milliseconds
+        Returns:
+            np.ndarray: Index of the nearest frame for every timestamp
+        """
+        timestamps = self._columns["timestamp_ms"]
+        if len(timestamps) == 1:
+            return np.zeros(np.shape(timestamp_ms), dtype=np.intp)
+        after = np.clip(np.searchsorted(timestamps, timestamp_ms), 1, len(timestamps) - 1)
+        before = after - 1
+        nearest = np.where(
+            np.abs(timestamps[after] - timestamp_ms)
+            < np.abs(timestamp_ms - timestamps[before]),
+            after,
+            before,
+        )
+        return nearest
+
+
+def load_drone_data(file_path: str) -> TelemetryStore:
+    """
+    Load the drone telemetry, memory-mapping it if it was saved as a `.npy` file.
+    A `.npy` path that doesn't exist falls back to the parsed SRT JSON of the same name,
+    for setups parsed before the `.npy` files were written.
+
+    Args:
+        file_path (str): Path to the `.npy` telemetry or the parsed SRT JSON
+    Returns:
+        TelemetryStore: The telemetry of every frame
+    """
+    if file_path.endswith(".npy"):
+        json_path = file_path[: -len(".npy")] + ".json"
+        if os.path.exists(file_path) or not os.path.exists(json_path):
+            return TelemetryStore.open(file_path)
+        print(f"{file_path} not found, loading {json_path} (see the README to convert it)")
+        file_path = json_path
 
-def load_drone_data(file_path):
     with open(file_path, "r") as file:
-        return json.load(file)
+        return TelemetryStore.from_records(json.load(file))
+
+
+def save_telemetry(file_path: str, telemetry: np.ndarray) -> None:
+    """
+    Save the telemetry columns as a `.npy` file, which can be loaded
+    (or memory-mapped) without parsing.
+
+    Args:
+        file_path (str): Path to the output file
+        telemetry (np.ndarray): Structured array of `TELEMETRY_DTYPE`
+    """
+    np.save(file_path, np.asarray(telemetry, dtype=TELEMETRY_DTYPE))
+
+
+def load_telemetry(file_path: str, mmap_mode: str = None) -> np.ndarray:
+    """
+    Load the telemetry columns saved with `save_telemetry`.
+
+    Args:
+        file_path (str): Path to the `.npy` file
+        mmap_mode (str): Memory-map the file instead of reading it, see `np.load`
+    Returns:
+        np.ndarray: Structured array of `TELEMETRY_DTYPE`
+    """
+    telemetry = np.load(file_path, mmap_mode=mmap_mode)
+    if telemetry.dtype != TELEMETRY_DTYPE:
+        raise ValueError(f"{file_path} does not contain drone telemetry columns")
+    return telemetry
+
+
+def format_frame_time(timestamp_ms: int) -> str:
+    """
+    Format a timestamp the way it appears in the parsed SRT data (HH:MM:SS:mmm).
+
+    Args:
+        timestamp_ms (int): Milliseconds since the Unix epoch
+    Returns:
+        str: The time of day of the timestamp
+    """
+    seconds, milliseconds = divmod(int(timestamp_ms) % 86_400_000, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}:{milliseconds:03d}"
+
+
+def parse_frame_time(frame_time: str) -> int:
+    """
+    Parse a time of day in the HH:MM:SS:mmm format into milliseconds since midnight.
+    """
+    hours, minutes, seconds, milliseconds = frame_time.split(":")
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(
+        milliseconds
+    )
+
+
+def compute_yaw_instability(yaws: np.ndarray, window: int, threshold: float) -> np.ndarray:
+    """
+    Flag the frames where the gimbal yaw changed more than `threshold` degrees between
+    two consecutive frames of the previous `window` frames.
+    A frame `f` looks at the changes `|yaw[i] - yaw[i - 1]|` for `i` in `[f - window, f)`,
+    the first `window` frames are never flagged.
+
+    Args:
+        yaws (np.ndarray): Gimbal yaw of every frame in degrees
+        window (int): Number of previous frames to check
+        threshold (float): Maximum allowed yaw change between two frames in degrees
+    Returns:
+        np.ndarray: Boolean array, True for the frames where the drone is rotating too fast
+    """
+    yaws = np.asarray(yaws, dtype=np.float64)
+    unstable = np.zeros(len(yaws), dtype=bool)
+    if len(yaws) <= window + 1:
+        return unstable
+
+    # exceeds[i - 1] is the change between frame i - 1 and i
+    exceeds = np.abs(np.diff(yaws)) > threshold
+    counts = np.concatenate(([0], np.cumsum(exceeds)))
+
+    frames = np.arange(window + 1, len(yaws))
+    unstable[frames] = counts[frames - 1] - counts[frames - window - 1] > 0
+    return unstable
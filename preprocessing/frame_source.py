@@ -0,0 +1,185 @@
+import threading
+
+from collections import deque
+from typing import Iterator
+
+import cv2
+import numpy as np
+
+
+class BufferPool:
+    """
+    Reuses image buffers of a single shape.
+    `acquire` hands out a released buffer when there is one and allocates a new one
+    otherwise, so a consumer that never releases its frames only loses the reuse.
+    """
+
+    def __init__(self, shape: tuple, capacity: int, dtype=np.uint8):
+        """
+        Args:
+            shape: The shape of the buffers
+            capacity: Maximum number of released buffers kept for reuse
+            dtype: The data type of the buffers
+        """
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self.free = deque()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> np.ndarray:
+        with self.lock:
+            if self.free:
+                return self.free.pop()
+        return np.empty(self.shape, dtype=self.dtype)
+
+    def release(self, buffer: np.ndarray) -> None:
+        if buffer.shape != self.shape or buffer.dtype != self.dtype:
+            return
+        with self.lock:
+            if len(self.free) < self.capacity:
+                self.free.append(buffer)
+
+
+def fit_size(width: int, height: int, max_side: int) -> tuple:
+    """
+    Get the size of an image downscaled so its longer side is at most `max_side` pixels.
+
+    Args:
+        width: The width of the image
+        height: The height of the image
+        max_side: The maximum length of the longer side, None to keep the size
+    Returns:
+        tuple: The width and height of the downscaled image
+    """
+    if not max_side or max(width, height) <= max_side:
+        return width, height
+    scale = max_side / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def probe_video(path: str) -> tuple:
+    """
+    Get the nominal frame rate and the number of frames of a video.
+
+    Args:
+        path: Path to the video
+    Returns:
+        tuple: Frames per second and the number of frames, 0 when unknown
+    """
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return fps, max(frame_count, 0)
+
+
+class FrameSource:
+    """
+    Reads a range of video frames into reused buffers.
+
+    Every frame comes with a copy downscaled for the detector (or the frame itself when no
+    downscaling is needed), resized on the reading thread with `cv2.INTER_AREA`. Frames are
+    numbered with an internal counter instead of querying the capture position each time;
+    `frame_time_ms` holds the presentation time of the last frame read.
+    Pass the frames back to `release` and `release_detector_frame` once they are no longer
+    used to recycle their buffers.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        start: int = 0,
+        stop: int = None,
+        detector_size: int = None,
+        buffer_count: int = 16,
+    ):
+        """
+        Args:
+            path: Path to the video
+            start: The first frame to read
+            stop: The frame to stop at (exclusive), defaults to the end of the video
+            detector_size: Longer side in pixels of the frames passed to the detector, None for full resolution
+            buffer_count: Maximum number of frames kept for reuse
+        """
+        self.cap = cv2.VideoCapture(path)
+        if start > 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        self.next_index = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) if start > 0 else 0
+        self.stop = stop
+        self.frame_time_ms = 0.0
+
+        width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frames = BufferPool((height, width, 3), buffer_count)
+        self.detector_width, self.detector_height = fit_size(width, height, detector_size)
+        self.downscaled = (self.detector_width, self.detector_height) != (width, height)
+        self.detector_frames = BufferPool(
+            (self.detector_height, self.detector_width, 3), buffer_count
+        )
+        self.scale = np.array(
+            [
+                width / self.detector_width,
+                height / self.detector_height,
+                width / self.detector_width,
+                height / self.detector_height,
+            ]
+        )
+
+    def read(self) -> Iterator[tuple]:
+        """
+        Read the frames of the range.
+
+        Returns:
+            Iterator[tuple]: The frame index, the full-resolution frame and the detector frame
+        """
+        while self.cap.isOpened() and (self.stop is None or self.next_index < self.stop):
+            buffer = self.frames.acquire()
+            ret, frame = self.cap.read(buffer)
+            if not ret:  # If the frame is not read correctly, stop
+                self.frames.release(buffer)
+                break
+
+            frame_idx = self.next_index
+            self.next_index += 1
+            self.frame_time_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+            if self.downscaled:
+                detector_frame = cv2.resize(
+                    frame,
+                    (self.detector_width, self.detector_height),
+                    dst=self.detector_frames.acquire(),
+                    interpolation=cv2.INTER_AREA,
+                )
+            else:
+                detector_frame = frame
+            yield frame_idx, frame, detector_frame
+
+    def to_frame_coordinates(self, xyxy: np.ndarray) -> np.ndarray:
+        """
+        Scale boxes found on the detector frames to full-resolution pixels.
+
+        Args:
+            xyxy: (n, 4) box corners on the detector frame
+        Returns:
+            np.ndarray: (n, 4) box corners on the full-resolution frame
+        """
+        if not self.downscaled:
+            return xyxy
+        return xyxy * self.scale
+
+    def release(self, frame: np.ndarray) -> None:
+        """
+        Recycle the buffer of a full-resolution frame that is no longer used.
+        """
+        self.frames.release(frame)
+
+    def release_detector_frame(self, detector_frame: np.ndarray) -> None:
+        """
+        Recycle the buffer of a detector frame once the detector is done with it.
+        Does nothing when the detector frame is the full-resolution frame itself.
+        """
+        if self.downscaled:
+            self.detector_frames.release(detector_frame)
+
+    def close(self) -> None:
+        self.cap.release()
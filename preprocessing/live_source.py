@@ -0,0 +1,299 @@
+import json
+import socket
+import threading
+import time
+
+from collections import deque
+from typing import Iterator
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+
+from .drone_data import TELEMETRY_DTYPE, TelemetryStore, load_drone_data
+from .frame_source import FrameSource
+from .telemetry_sync import TelemetrySync
+
+
+def now_ms() -> float:
+    return time.time() * 1000
+
+
+class LiveFrameSource(FrameSource):
+    """
+    Reads frames of a network stream (RTSP, UDP, HTTP, ...) or replays a video file in
+    real time as a stand-in for one.
+
+    A background thread reads the stream as fast as it arrives and keeps only the newest
+    `buffer_frames` frames, so a slow consumer skips frames instead of falling behind.
+    Frames older than `max_latency_ms` when the consumer gets to them are dropped too.
+    Frames are numbered in the order they are handed out, and `frame_time_ms` is the
+    wall-clock time the frame was received (or was due, when replaying).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        replay: bool = False,
+        start_time_ms: float = None,
+        buffer_frames: int = 2,
+        max_latency_ms: float = 500,
+        detector_size: int = None,
+    ):
+        """
+        Args:
+            url: URL of the stream, or path of the video to replay
+            replay: Replay a video file at its frame rate instead of reading a stream
+            start_time_ms: Wall-clock time of the first replayed frame, defaults to now
+            buffer_frames: Number of newest frames kept for the consumer
+            max_latency_ms: Age in milliseconds after which a frame is dropped
+            detector_size: Longer side in pixels of the frames passed to the detector, None for full resolution
+        """
+        super().__init__(url, detector_size=detector_size, buffer_count=buffer_frames + 2)
+        self.replay = replay
+        self.start_time_ms = now_ms() if start_time_ms is None else start_time_ms
+        self.max_latency_ms = max_latency_ms
+        self.frames_buffer = deque(maxlen=buffer_frames)
+        self.available = threading.Condition()
+        self.finished = False
+        self.received = 0
+        self.dropped = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._receive, daemon=True)
+        self.thread.start()
+
+    def _receive(self) -> None:
+        try:
+            while self.cap.isOpened() and not self.stopped.is_set():
+                buffer = self.frames.acquire()
+                ret, frame = self.cap.read(buffer)
+                if not ret:  # the stream ended or the connection dropped
+                    self.frames.release(buffer)
+                    break
+
+                if self.replay:
+                    received_ms = self.start_time_ms + self.cap.get(cv2.CAP_PROP_POS_MSEC)
+                    delay = (received_ms - now_ms()) / 1000
+                    if delay > 0 and self.stopped.wait(delay):
+                        self.frames.release(frame)
+                        break
+                else:
+                    received_ms = now_ms()
+
+                with self.available:
+                    if len(self.frames_buffer) == self.frames_buffer.maxlen:
+                        self.frames.release(self.frames_buffer[0][1])
+                        self.dropped += 1
+                    self.frames_buffer.append((received_ms, frame))
+                    self.received += 1
+                    self.available.notify()
+        finally:
+            with self.available:
+                self.finished = True
+                self.available.notify()
+
+    def read(self) -> Iterator[tuple]:
+        """
+        Read the newest frames of the stream until it ends or the source is closed.
+
+        Returns:
+            Iterator[tuple]: The frame index, the full-resolution frame and the detector frame
+        """
+        while True:
+            with self.available:
+                while not self.frames_buffer and not self.finished:
+                    self.available.wait()
+                if not self.frames_buffer:
+                    return
+                received_ms, frame = self.frames_buffer.popleft()
+
+            if now_ms() - received_ms > self.max_latency_ms:
+                self.frames.release(frame)
+                self.dropped += 1
+                continue
+
+            frame_idx = self.next_index
+            self.next_index += 1
+            self.frame_time_ms = received_ms
+            if self.downscaled:
+                detector_frame = cv2.resize(
+                    frame,
+                    (self.detector_width, self.detector_height),
+                    dst=self.detector_frames.acquire(),
+                    interpolation=cv2.INTER_AREA,
+                )
+            else:
+                detector_frame = frame
+            yield frame_idx, frame, detector_frame
+
+    def close(self, timeout: float = 2.0) -> None:
+        """
+        Stop reading the stream.
+        The reader thread can be blocked in `cap.read` on a stalled stream, so it is waited
+        for at most `timeout` seconds. A reader still blocked then keeps its capture, since
+        releasing a capture while another thread reads it is not safe in OpenCV, and ends
+        with the process as a daemon thread.
+
+        Args:
+            timeout: Seconds to wait for the reader thread
+        """
+        self.stopped.set()
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            print(f"The stream reader did not stop within {timeout:g}s, leaving it behind")
+            return
+        super().close()
+
+
+class TelemetryBuffer(TelemetryStore):
+    """
+    A `TelemetryStore` that grows as rows are appended, for telemetry arriving during the run.
+    Rows already appended are never moved for readers holding their `TelemetryFrame`.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        super().__init__(np.empty(capacity, dtype=TELEMETRY_DTYPE))
+        self.buffer = self.data
+        self.size = 0
+        self._resize()
+
+    def _resize(self) -> None:
+        self.data = self.buffer[: self.size]
+        self._columns = {name: self.data[name] for name in TELEMETRY_DTYPE.names}
+
+    def append(self, row) -> None:
+        """
+        Add the telemetry of the next frame.
+
+        Args:
+            row: A record of `TELEMETRY_DTYPE`
+        """
+        if self.size == len(self.buffer):
+            grown = np.empty(2 * len(self.buffer), dtype=TELEMETRY_DTYPE)
+            grown[: self.size] = self.buffer[: self.size]
+            self.buffer = grown
+        self.buffer[self.size] = row
+        self.size += 1
+        self._resize()
+
+
+class LiveTelemetry:
+    """
+    Receives drone telemetry during the flight and interpolates it at frame times.
+
+    Samples arrive as JSON objects with the `TELEMETRY_DTYPE` fields, one per UDP datagram
+    (`udp://host:port`), and their `timestamp_ms` is the wall-clock time of the sample
+    (the time of arrival when it is missing).
+    A telemetry file can be replayed instead, its samples are shifted to start at
+    `start_time_ms` and released when their time comes.
+    Only the last `window` samples are kept.
+    """
+
+    def __init__(self, source: str, start_time_ms: float = None, window: int = 300):
+        """
+        Args:
+            source: `udp://host:port` to listen on, or a telemetry file (`.npy` or JSON) to replay
+            start_time_ms: Wall-clock time of the first replayed sample, defaults to now
+            window: Number of recent samples kept for interpolation
+        """
+        self.samples = deque(maxlen=window)
+        self.received = 0  # samples added so far, to rebuild the interpolation only for new ones
+        self.sync = None
+        self.synced = 0  # `received` when `sync` was built
+        self.sync_origin_ms = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.start_time_ms = now_ms() if start_time_ms is None else start_time_ms
+
+        url = urlparse(source)
+        if url.scheme == "udp":
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.bind((url.hostname or "0.0.0.0", url.port))
+            self.socket.settimeout(0.5)
+            target = self._receive
+        else:
+            self.socket = None
+            self.replayed = load_drone_data(source)
+            target = self._replay
+        self.thread = threading.Thread(target=target, daemon=True)
+        self.thread.start()
+
+    def _add(self, row: np.ndarray) -> None:
+        with self.lock:
+            self.samples.append(row)
+            self.received += 1
+
+    def _receive(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                message, _ = self.socket.recvfrom(65536)
+            except socket.timeout:
+                continue
+            try:
+                sample = json.loads(message)
+                row = np.zeros((), dtype=TELEMETRY_DTYPE)
+                for name in TELEMETRY_DTYPE.names:
+                    row[name] = sample.get(name, 0)
+                if "timestamp_ms" not in sample:
+                    row["timestamp_ms"] = round(now_ms())
+            except (ValueError, TypeError, AttributeError) as exc:
+                print(f"Skipping invalid telemetry message: {exc}")
+                continue
+            self._add(row)
+
+    def _replay(self) -> None:
+        times_ms = TelemetrySync(self.replayed).times_ms
+        for index, time_ms in enumerate(times_ms.tolist()):
+            delay = (self.start_time_ms + time_ms - now_ms()) / 1000
+            if delay > 0 and self.stopped.wait(delay):
+                return
+            row = self.replayed.data[index].copy()
+            row["timestamp_ms"] = round(self.start_time_ms + time_ms)
+            self._add(row)
+
+    def at(self, time_ms: float) -> np.ndarray:
+        """
+        Get the telemetry at a wall-clock time, interpolated between the received samples.
+        Times after the newest sample take the newest sample. The interpolation is only
+        set up again when samples arrived since the last call, not for every frame.
+
+        Args:
+            time_ms: Wall-clock time in milliseconds
+        Returns:
+            np.ndarray: A record of `TELEMETRY_DTYPE`, None if no sample arrived yet
+        """
+        with self.lock:
+            if not self.samples:
+                return None
+            samples = None
+            if self.received != self.synced:
+                samples = np.array(self.samples, dtype=TELEMETRY_DTYPE)
+                self.synced = self.received
+        if samples is not None:
+            samples = samples[np.argsort(samples["timestamp_ms"], kind="stable")]
+            self.sync = TelemetrySync(TelemetryStore(samples))
+            self.sync_origin_ms = samples["timestamp_ms"][0]
+        return self.sync.resample(time_ms - self.sync_origin_ms).data[0]
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Wait for the first sample.
+
+        Args:
+            timeout: Seconds to wait, None to wait until it arrives
+        Returns:
+            bool: True if a sample arrived
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.samples:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            if not self.thread.is_alive() or self.stopped.wait(0.05):
+                return bool(self.samples)
+        return True
+
+    def close(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+        if self.socket is not None:
+            self.socket.close()
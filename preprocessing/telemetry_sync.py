@@ -0,0 +1,137 @@
+import numpy as np
+
+from .drone_data import TELEMETRY_DTYPE, TelemetryStore
+
+# Fields that change continuously between two telemetry samples
+INTERPOLATED_FIELDS = (
+    "latitude",
+    "longitude",
+    "rel_alt",
+    "abs_alt",
+    "gb_pitch",
+    "gb_roll",
+    "focal_len",
+)
+
+
+def wrap_degrees(angles: np.ndarray) -> np.ndarray:
+    """
+    Wrap angles to the range of -180 - 180 degrees, leaving the angles in range untouched.
+    """
+    return np.where(np.abs(angles) <= 180, angles, (angles + 180) % 360 - 180)
+
+
+class TelemetrySync:
+    """
+    Maps video presentation times to the drone telemetry.
+
+    The telemetry samples are placed on the timeline of the untrimmed video (the first
+    sample at 0 ms), and the telemetry of any video time is interpolated linearly between
+    the two surrounding samples, the gimbal yaw along the shorter way around the circle.
+    Times within `snap_ms` of a sample take that sample as it is, so a video whose frames
+    line up with the SRT blocks gets exactly the telemetry of its blocks.
+    """
+
+    def __init__(self, telemetry: TelemetryStore, snap_ms: float = 1.0):
+        """
+        Args:
+            telemetry: The telemetry samples, in time order
+            snap_ms: Distance in milliseconds within which a time takes the nearest sample
+        """
+        if not len(telemetry):
+            raise ValueError("Telemetry has no samples")
+        self.telemetry = telemetry
+        self.snap_ms = snap_ms
+
+        timestamps = telemetry.column("timestamp_ms").astype(np.float64)
+        if (timestamps >= 0).all() and (np.diff(timestamps) >= 0).all():
+            self.times_ms = timestamps - timestamps[0]
+        else:  # fall back to the frame durations of the SRT blocks
+            durations = telemetry.column("diff_time_ms").astype(np.float64)
+            self.times_ms = np.concatenate(([0.0], np.cumsum(np.maximum(durations[1:], 0))))
+        self.yaws = np.unwrap(telemetry.column("gb_yaw"), period=360)
+
+    @property
+    def duration_ms(self) -> float:
+        return float(self.times_ms[-1])
+
+    def covers(self, times_ms: np.ndarray) -> np.ndarray:
+        """
+        Check which times fall within the telemetry.
+
+        Args:
+            times_ms: Video times in milliseconds
+        Returns:
+            np.ndarray: Boolean mask, True for the times between the first and the last sample
+        """
+        times_ms = np.asarray(times_ms, dtype=np.float64)
+        return (times_ms >= -self.snap_ms) & (times_ms <= self.duration_ms + self.snap_ms)
+
+    def resample(self, times_ms: np.ndarray) -> TelemetryStore:
+        """
+        Interpolate the telemetry at the given video times.
+
+        Args:
+            times_ms: Video times in milliseconds on the timeline of the untrimmed video
+        Returns:
+            TelemetryStore: The telemetry of every time, times outside the telemetry
+                take the first or last sample
+        """
+        times_ms = np.asarray(times_ms, dtype=np.float64).ravel()
+        data = np.empty(len(times_ms), dtype=TELEMETRY_DTYPE)
+        samples = self.telemetry.data
+
+        if len(self.times_ms) == 1:
+            data[:] = samples[0]
+            return TelemetryStore(data)
+
+        after = np.clip(
+            np.searchsorted(self.times_ms, times_ms, side="right"), 1, len(self.times_ms) - 1
+        )
+        before = after - 1
+        span = self.times_ms[after] - self.times_ms[before]
+        offset = times_ms - self.times_ms[before]
+        fraction = np.clip(
+            np.divide(offset, span, out=np.zeros_like(offset), where=span > 0), 0.0, 1.0
+        )
+        fraction[offset <= self.snap_ms] = 0.0
+        fraction[self.times_ms[after] - times_ms <= self.snap_ms] = 1.0
+
+        def interpolate(values: np.ndarray) -> np.ndarray:
+            start, end = values[before], values[after]
+            return np.where(
+                fraction == 0.0,
+                start,
+                np.where(fraction == 1.0, end, start + (end - start) * fraction),
+            )
+
+        for name in INTERPOLATED_FIELDS:
+            data[name] = interpolate(samples[name])
+        yaws = samples["gb_yaw"]
+        data["gb_yaw"] = np.where(
+            fraction == 0.0,
+            yaws[before],
+            np.where(fraction == 1.0, yaws[after], wrap_degrees(interpolate(self.yaws))),
+        )
+        data["timestamp_ms"] = np.round(interpolate(samples["timestamp_ms"].astype(np.float64)))
+        nearest = np.where(fraction < 0.5, before, after)
+        data["frame_cnt"] = samples["frame_cnt"][nearest]
+        data["diff_time_ms"] = samples["diff_time_ms"][nearest]
+        return TelemetryStore(data)
+
+    def for_video(self, fps: float, frame_count: int, offset_ms: float = 0.0) -> TelemetryStore:
+        """
+        Get the telemetry of every frame of a constant frame rate video, up to the last
+        frame covered by the telemetry.
+
+        Args:
+            fps: Frame rate of the video
+            frame_count: Number of frames of the video
+            offset_ms: Time of the first frame in the untrimmed video, for clips cut out of it
+        Returns:
+            TelemetryStore: The telemetry of every frame, indexed by frame number
+        """
+        times_ms = offset_ms + np.arange(frame_count) * (1000.0 / fps)
+        covered = self.covers(times_ms)
+        frame_count = int(np.argmin(covered)) if not covered.all() else len(times_ms)
+        return self.resample(times_ms[:frame_count])
@@ -0,0 +1,274 @@
+import json
+import os
+import threading
+import time
+
+from array import array
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Iterable, Iterator
+
+import numpy as np
+
+# Upper bounds of the latency histogram buckets in milliseconds, the last bucket is open
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class StageProfiler:
+    """
+    Records how long every stage of the recognition takes, per call and per thread.
+
+    Stages are timed with `stage` (or `iterate` for the items of an iterator), counters
+    such as the detections of a frame with `count` and queue depths with `gauge`. The
+    summary has the latency percentiles and histogram of every stage, and `save` writes
+    a Chrome trace (chrome://tracing or https://ui.perfetto.dev) with one lane per thread.
+    A disabled profiler records nothing and costs a method call per stage.
+    """
+
+    def __init__(self, enabled: bool = True, max_trace_events: int = 1_000_000):
+        """
+        Args:
+            enabled: Record the stages, False makes all methods no-ops
+            max_trace_events: Number of trace events kept, later events only go to the summary
+        """
+        self.enabled = enabled
+        self.max_trace_events = max_trace_events
+        self.lock = threading.Lock()
+        self.durations = defaultdict(lambda: array("d"))  # stage -> milliseconds
+        self.counters = defaultdict(lambda: array("d"))  # counter -> values
+        self.gauges = defaultdict(lambda: array("d"))  # gauge -> sampled values
+        self.trace_events = []
+        self.thread_names = {}
+        self.frames = 0
+        self.origin = time.perf_counter()  # time zero of the trace
+        self.started = None  # start of the throughput, see `start_frames`
+        self.finished = None
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self.origin) * 1e6
+
+    def _thread_id(self) -> int:
+        thread = threading.current_thread()
+        self.thread_names.setdefault(thread.ident, thread.name)
+        return thread.ident
+
+    def stage(self, name: str):
+        """
+        Time a block of code as one call of a stage.
+
+        Args:
+            name: The name of the stage
+        Returns:
+            A context manager timing the block
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name: str):
+        start = self._now_us()
+        try:
+            yield
+        finally:
+            self.record(name, start, self._now_us() - start)
+
+    def record(self, name: str, start_us: float, duration_us: float) -> None:
+        """
+        Add a timed call of a stage.
+
+        Args:
+            name: The name of the stage
+            start_us: Start of the call in microseconds since the profiler was created
+            duration_us: Duration of the call in microseconds
+        """
+        thread_id = self._thread_id()
+        with self.lock:
+            self.durations[name].append(duration_us / 1000)
+            if len(self.trace_events) < self.max_trace_events:
+                self.trace_events.append(
+                    {
+                        "name": name,
+                        "ph": "X",
+                        "ts": round(start_us, 1),
+                        "dur": round(duration_us, 1),
+                        "pid": os.getpid(),
+                        "tid": thread_id,
+                    }
+                )
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterator:
+        """
+        Time how long every item of an iterator takes to produce, e.g. decoding a frame.
+
+        Args:
+            name: The name of the stage
+            iterable: The items to time
+        Returns:
+            Iterator: The items of the iterable
+        """
+        if not self.enabled:
+            yield from iterable
+            return
+
+        iterator = iter(iterable)
+        while True:
+            start = self._now_us()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.record(name, start, self._now_us() - start)
+            yield item
+
+    def count(self, name: str, value: float) -> None:
+        """
+        Add a value of a per-frame counter, e.g. the number of detections.
+        """
+        if self.enabled:
+            with self.lock:
+                self.counters[name].append(value)
+
+    def gauge(self, name: str, value: float) -> None:
+        """
+        Sample a level that changes over time, e.g. the number of frames in a queue.
+        """
+        if not self.enabled:
+            return
+        thread_id = self._thread_id()
+        with self.lock:
+            self.gauges[name].append(value)
+            if len(self.trace_events) < self.max_trace_events:
+                self.trace_events.append(
+                    {
+                        "name": name,
+                        "ph": "C",
+                        "ts": round(self._now_us(), 1),
+                        "pid": os.getpid(),
+                        "tid": thread_id,
+                        "args": {name: value},
+                    }
+                )
+
+    def start_frames(self) -> None:
+        """
+        Start the throughput clock before the first frame is read, so the tracker setup and
+        loading and warming up the detector don't count. Later calls are ignored.
+        """
+        if self.enabled and self.started is None:
+            self.started = time.perf_counter()
+
+    def frame_done(self) -> None:
+        """
+        Count a fully processed frame for the throughput.
+        """
+        if self.enabled:
+            with self.lock:
+                self.frames += 1
+                self.finished = time.perf_counter()
+
+    def summary(self) -> dict:
+        """
+        Summarize the recorded stages.
+
+        Returns:
+            dict: Throughput, the latency statistics and histogram of every stage,
+                and the mean and maximum of the counters and gauges
+        """
+        with self.lock:
+            started = self.started or self.origin
+            elapsed = ((self.finished or time.perf_counter()) - started) or 1e-9
+            stages = {}
+            for name, values in self.durations.items():
+                durations = np.frombuffer(values, dtype=np.float64)
+                p50, p90, p99 = np.percentile(durations, [50, 90, 99])
+                histogram = np.bincount(
+                    np.searchsorted(HISTOGRAM_BOUNDS_MS, durations),
+                    minlength=len(HISTOGRAM_BOUNDS_MS) + 1,
+                )
+                stages[name] = {
+                    "calls": len(durations),
+                    "total_ms": float(durations.sum()),
+                    "mean_ms": float(durations.mean()),
+                    "p50_ms": float(p50),
+                    "p90_ms": float(p90),
+                    "p99_ms": float(p99),
+                    "max_ms": float(durations.max()),
+                    "histogram": {
+                        "bounds_ms": list(HISTOGRAM_BOUNDS_MS),
+                        "counts": histogram.tolist(),
+                    },
+                }
+
+            def levels(series: dict) -> dict:
+                return {
+                    name: {
+                        "samples": len(values),
+                        "mean": float(np.mean(values)),
+                        "max": float(np.max(values)),
+                    }
+                    for name, values in series.items()
+                    if len(values)
+                }
+
+            return {
+                "frames": self.frames,
+                "elapsed_s": elapsed,
+                "frames_per_second": self.frames / elapsed,
+                "stages": stages,
+                "counters": levels(self.counters),
+                "gauges": levels(self.gauges),
+            }
+
+    def format_summary(self) -> str:
+        """
+        Format the summary as a table, the slowest stages first.
+        """
+        summary = self.summary()
+        lines = [
+            f"{summary['frames']} frames in {summary['elapsed_s']:.2f}s,"
+            f" {summary['frames_per_second']:.2f} frames/s",
+            f"{'stage':<16} {'calls':>8} {'total s':>9} {'mean ms':>9}"
+            f" {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}",
+        ]
+        for name, stage in sorted(
+            summary["stages"].items(), key=lambda item: -item[1]["total_ms"]
+        ):
+            lines.append(
+                f"{name:<16} {stage['calls']:>8} {stage['total_ms'] / 1000:>9.2f}"
+                f" {stage['mean_ms']:>9.2f} {stage['p50_ms']:>9.2f} {stage['p90_ms']:>9.2f}"
+                f" {stage['p99_ms']:>9.2f} {stage['max_ms']:>9.2f}"
+            )
+        for kind in ("counters", "gauges"):
+            for name, level in summary[kind].items():
+                lines.append(f"{name}: mean {level['mean']:.2f}, max {level['max']:.0f}")
+        return "\n".join(lines)
+
+    def save(self, path: str) -> None:
+        """
+        Write the trace in the Chrome trace event format, with the summary as metadata.
+
+        Args:
+            path: Path to the JSON file
+        """
+        with self.lock:
+            metadata = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": thread_id,
+                    "args": {"name": name},
+                }
+                for thread_id, name in self.thread_names.items()
+            ]
+            events = metadata + self.trace_events
+        with open(path, "w") as file:
+            json.dump(
+                {"traceEvents": events, "displayTimeUnit": "ms", "otherData": self.summary()},
+                file,
+            )
+
+
+# Shared by the trackers that are not profiled
+NO_PROFILER = StageProfiler(enabled=False)
@@ -0,0 +1,156 @@
+import time
+
+import numpy as np
+
+from detection.detection_cache import frame_detections, load_detection_cache
+from preprocessing.drone_data import TelemetryStore, load_drone_data
+from preprocessing.telemetry_sync import TelemetrySync
+from main import CarTracker
+from profiling import StageProfiler
+
+
+class CachedFrames:
+    """
+    Stands in for the `FrameSource` of a replay, which has detections but no frames.
+    """
+
+    def release(self, frame: np.ndarray) -> None:
+        pass
+
+    def release_detector_frame(self, detector_frame: np.ndarray) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class KeptCrops:
+    """
+    Stands in for the `VehicleCropWriter` of a replay, so the vehicle images of the
+    recorded run are kept instead of being replaced with crops of blank frames.
+    """
+
+    def __init__(self):
+        self.scores = {}
+
+    def offer(self, *args) -> None:
+        pass
+
+    def flush(self, wait: bool = False) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class ReplayCarTracker(CarTracker):
+    """
+    Georeferences and exports the detections recorded by an earlier run, without the video
+    or the detector, e.g. to try other projection, filtering or export settings.
+
+    The recorded vehicle ids already include re-identification, the telemetry is matched
+    to the recorded frame times like in the recorded run and the vehicles get their
+    recorded colors, so with the same settings the replay writes the same paths.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        features_path: str = None,
+        profiler: StageProfiler = None,
+    ):
+        """
+        Args:
+            cache_dir: The directory the detections were recorded to
+            features_path: Where the GeoJSON features are streamed, defaults to
+                `Config.GEOJSON_STREAM_PATH`
+            profiler: Records the time spent in every stage, None to not profile
+        """
+        self.meta, self.frames, self.detections = load_detection_cache(cache_dir)
+        self.recorded_colors = {
+            int(car_id): tuple(color) for car_id, color in self.meta.get("car_colors", {}).items()
+        }
+        super().__init__(
+            stop_frame=self.meta["stop_frame"],
+            features_path=features_path,
+            video_path=self.meta["video_path"],
+            video_offset_ms=self.meta["video_offset_ms"],
+            profiler=profiler,
+        )
+        self.reid_bank = None  # the recorded ids are already re-linked
+        self.crop_writer.close()
+        self.crop_writer = KeptCrops()
+        # Only the shape of the frames is used, for the distance of the boxes to the edges
+        self.blank_frame = np.broadcast_to(np.zeros((), np.uint8), tuple(self.meta["frame_shape"]))
+
+    def __enter__(self):
+        return self  # keep the vehicle images of the recorded run
+
+    def open_telemetry(self) -> TelemetryStore:
+        """
+        Load the drone data of the recorded run and match it to its frames.
+
+        Returns:
+            TelemetryStore: The telemetry of every frame covered by the drone data
+        """
+        self.telemetry_sync = TelemetrySync(load_drone_data(self.meta["drone_data_path"]))
+        self.fps = self.meta["fps"]
+        self.video_frame_count = self.meta["frame_count"]
+        self.frame_offset = round(self.video_offset_ms * self.fps / 1000) if self.fps > 0 else 0
+        return self.sync_drone_data(self.video_frame_count)
+
+    def open_frame_source(self) -> CachedFrames:
+        return CachedFrames()
+
+    def create_vehicle_entry(self, car_id: int) -> None:
+        """
+        Add a vehicle with the color it had in the recorded run.
+
+        Args:
+            car_id: The ID of the vehicle
+        """
+        if car_id not in self.recorded_colors:
+            super().create_vehicle_entry(car_id)  # recorded before the colors were saved
+            return
+        self.car_colors[car_id] = self.recorded_colors[car_id]
+        self.car_ids.append(car_id)
+
+    def run_recognition(self, detector=None) -> None:
+        """
+        Georeference the recorded detections frame by frame.
+
+        Args:
+            detector: Unused, the detections are read from the cache
+        """
+        self.profiler.start_frames()
+        started = time.perf_counter()
+        frame_indices = self.detections["frame_idx"]
+        starts = np.searchsorted(frame_indices, self.frames["frame_idx"], side="left")
+        stops = np.searchsorted(frame_indices, self.frames["frame_idx"], side="right")
+        frame_count = 0
+        for frame_idx, time_ms, start, stop in zip(
+            self.frames["frame_idx"].tolist(),
+            self.frames["time_ms"].tolist(),
+            starts.tolist(),
+            stops.tolist(),
+        ):
+            if frame_idx >= self.stop_frame or not self.sync_frame_time(frame_idx, time_ms):
+                break
+            detections = frame_detections(self.detections, start, stop)
+            self.postprocess_frame(frame_idx, self.blank_frame, detections)
+            frame_count += 1
+
+        elapsed = time.perf_counter() - started
+        print(f"Replayed the detections of {frame_count} frames in {elapsed:.1f}s")
+
+
+def run_replay(cache_dir: str, profiler: StageProfiler = None) -> None:
+    """
+    Rebuild the GeoJSON outputs from the detections recorded in a directory.
+
+    Args:
+        cache_dir: The directory the detections were recorded to, see `Config.DETECTION_CACHE_DIR`
+        profiler: Records the time spent in every stage, None to not profile
+    """
+    with ReplayCarTracker(cache_dir, profiler=profiler) as tracker:
+        tracker.run_recognition()
@@ -0,0 +1,322 @@
+import os
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from detection.backends import export_model
+from detection.boxes import box_iou
+from geoprocessing.geojson_sink import GeoJSONSink, iter_ndjson_features
+from geoprocessing.map_utils import export_ndjson_for_geo_json
+from geoprocessing.path_tiles import export_path_tiles
+from preprocessing.drone_data import load_drone_data, save_telemetry
+from preprocessing.frame_source import probe_video
+from preprocessing.telemetry_sync import TelemetrySync
+from main import CarTracker, create_detector
+from utils import clear_directory
+from config import Config
+
+
+def plan_shards(frame_count: int, shard_count: int) -> list:
+    """
+    Split the frames into contiguous ranges of about the same length.
+
+    Args:
+        frame_count: Number of frames to process
+        shard_count: Number of ranges
+    Returns:
+        list: (start, stop) frame ranges, stop is exclusive
+    """
+    bounds = np.linspace(0, frame_count, shard_count + 1).astype(int)
+    return [
+        (int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+    ]
+
+
+def process_shard(
+    shard_index: int,
+    start: int,
+    stop: int,
+    threads: int,
+    video_path: str = None,
+    video_offset_ms: float = None,
+    overlap_frames: int = None,
+    telemetry_path: str = None,
+) -> dict:
+    """
+    Run the recognition on a frame range in a worker process.
+    The tracker warms up on the `overlap_frames` frames before the range,
+    and the vehicle ids are offset by the shard index so they are unique across shards.
+
+    Args:
+        shard_index: The index of the shard
+        start: The first frame of the range
+        stop: The end of the range (exclusive), None for the end of the video
+        threads: Number of threads the detector may use
+        video_path: The video to process, defaults to `Config.VIDEO_PATH`
+        video_offset_ms: Time of the first video frame in the flight recording
+        overlap_frames: Number of frames shared with the neighbouring shards, defaults to
+            `Config.SHARD_OVERLAP_FRAMES`
+        telemetry_path: The drone data matched to the video frames by `sync_telemetry`,
+            None to match it in the worker
+    Returns:
+        dict: The path of the streamed GeoJSON features, vehicle colors, crop scores and overlap detections of the shard
+    """
+    detector = create_detector(threads)
+    tracker = CarTracker(
+        start_frame=start,
+        stop_frame=stop,
+        overlap_frames=(
+            Config.SHARD_OVERLAP_FRAMES if overlap_frames is None else overlap_frames
+        ),
+        id_offset=shard_index * Config.SHARD_ID_STRIDE,
+        features_path=f"{Config.GEOJSON_STREAM_PATH}.shard{shard_index}",
+        video_path=video_path,
+        video_offset_ms=video_offset_ms,
+        telemetry_path=telemetry_path,
+    )
+    try:
+        tracker.run_recognition(detector)
+        tracker.flush_trajectories()
+    finally:
+        tracker.feature_sink.close()
+        tracker.crop_writer.close()
+        tracker.frame_source.close()
+
+    return {
+        "features_path": tracker.feature_sink.path,
+        "car_colors": tracker.car_colors,
+        "crop_scores": tracker.crop_writer.scores,
+        "overlap_detections": tracker.overlap_detections,
+    }
+
+
+def match_tracks(previous: dict, current: dict, iou_threshold: float) -> dict:
+    """
+    Match the track ids of two shards on the frames they both processed.
+    Every pair of boxes overlapping more than `iou_threshold` on a shared frame is a
+    vote for matching their ids, and the ids are paired greedily by number of votes.
+
+    Args:
+        previous: Frame index to (ids, xyxy boxes) of the earlier shard
+        current: Frame index to (ids, xyxy boxes) of the later shard
+        iou_threshold: Minimum IoU for two boxes to be the same vehicle
+    Returns:
+        dict: Track id of the later shard to the matching id of the earlier shard
+    """
+    votes = {}
+    for frame_idx, (current_ids, current_boxes) in current.items():
+        if frame_idx not in previous:
+            continue
+        previous_ids, previous_boxes = previous[frame_idx]
+        if not len(current_ids) or not len(previous_ids):
+            continue
+
+        iou = box_iou(current_boxes, previous_boxes)
+        for i, j in zip(*np.nonzero(iou >= iou_threshold)):
+            pair = (int(current_ids[i]), int(previous_ids[j]))
+            votes[pair] = votes.get(pair, 0) + 1
+
+    mapping = {}
+    matched = set()
+    for (current_id, previous_id), _ in sorted(votes.items(), key=lambda vote: -vote[1]):
+        if current_id in mapping or previous_id in matched:
+            continue
+        mapping[current_id] = previous_id
+        matched.add(previous_id)
+    return mapping
+
+
+def stitch_shards(results: list, feature_sink: GeoJSONSink) -> None:
+    """
+    Merge the GeoJSON features of consecutive shards, giving vehicles that cross a
+    shard boundary the id (and color) they had in the earlier shard.
+    The better of the images of a continued vehicle is kept.
+
+    Args:
+        results: The results of `process_shard`, in frame order
+        feature_sink: The sink to write the features of all shards to
+    """
+    stitched_ids = {}
+    car_colors = {}
+    crop_scores = {}
+    for index, result in enumerate(results):
+        if index:
+            mapping = match_tracks(
+                results[index - 1]["overlap_detections"],
+                result["overlap_detections"],
+                Config.SHARD_STITCH_IOU_THRESHOLD,
+            )
+            for car_id, previous_id in mapping.items():
+                stitched_ids[car_id] = stitched_ids.get(previous_id, previous_id)
+        car_colors.update(result["car_colors"])
+        crop_scores.update(result["crop_scores"])
+
+        for car_id, stitched_id in stitched_ids.items():
+            if car_id in result["car_colors"]:
+                replace = crop_scores.get(car_id, 0) > crop_scores.get(stitched_id, 0)
+                move_vehicle_image(car_id, stitched_id, replace)
+                if replace:
+                    crop_scores[stitched_id] = crop_scores[car_id]
+
+        for _, _, feature in iter_ndjson_features(result["features_path"]):
+            properties = feature["properties"]
+            car_id = int(properties["vehicle_id"].removeprefix("vehicle_"))
+            if car_id in stitched_ids:
+                car_id = stitched_ids[car_id]
+                properties["vehicle_id"] = f"vehicle_{car_id}"
+                if car_id in car_colors:
+                    properties["color"] = "#{:02X}{:02X}{:02X}".format(*car_colors[car_id])
+            feature_sink.write(feature)
+        os.remove(result["features_path"])
+
+
+def move_vehicle_image(car_id: int, stitched_id: int, replace: bool = False) -> None:
+    """
+    Keep a single image of a vehicle that got a new id in a later shard.
+
+    Args:
+        car_id: The id of the vehicle in the later shard
+        stitched_id: The id of the vehicle in the earlier shard
+        replace: Keep the image of the later shard instead of the earlier one
+    """
+    source = f"{Config.CAR_IMAGE_PATH}/vehicle_{car_id}.jpg"
+    target = f"{Config.CAR_IMAGE_PATH}/vehicle_{stitched_id}.jpg"
+    if not os.path.exists(source):
+        return
+    if os.path.exists(target) and not replace:
+        os.remove(source)
+    else:
+        os.replace(source, target)
+
+
+def sync_telemetry(path: str) -> tuple:
+    """
+    Match the drone data to the video frames once for all shards, and save it for the
+    workers to memory-map instead of each resampling the whole flight.
+
+    Args:
+        path: Where to save the matched telemetry
+    Returns:
+        tuple: The number of frames that have both video and drone data, and the path
+            of the matched telemetry, None when the video has no frame rate and the
+            drone data is used as it is
+    """
+    drone_data = load_drone_data(Config.DRONE_DATA_PATH)
+    fps, video_frames = probe_video(Config.VIDEO_PATH)
+    if fps <= 0:
+        return min(video_frames, len(drone_data)), None
+    synced = TelemetrySync(drone_data).for_video(fps, video_frames, Config.VIDEO_OFFSET_MS)
+    save_telemetry(path, synced.data)
+    return len(synced), path
+
+
+def run_sharded_recognition(workers: int) -> None:
+    """
+    Run the recognition on overlapping frame ranges of the video in parallel worker
+    processes, then stitch the track ids across the ranges and export a single GeoJSON.
+
+    Args:
+        workers: Number of worker processes
+    """
+    clear_directory(Config.CAR_IMAGE_PATH)
+    telemetry_dir = tempfile.TemporaryDirectory()
+    frame_count, telemetry_path = sync_telemetry(
+        os.path.join(telemetry_dir.name, "telemetry.npy")
+    )
+    shards = plan_shards(frame_count, workers)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    # Export the model for the backend once instead of in every worker
+    export_model(
+        Config.YOLO_MODEL_PATH,
+        Config.DETECTION_BACKEND,
+        Config.EXPORT_IMAGE_SIZE,
+        Config.INT8_CALIBRATION_DATA,
+    )
+
+    with telemetry_dir, ProcessPoolExecutor(
+        max_workers=workers, mp_context=get_context("spawn")
+    ) as executor:
+        futures = [
+            executor.submit(
+                process_shard, index, start, stop, threads, telemetry_path=telemetry_path
+            )
+            for index, (start, stop) in enumerate(shards)
+        ]
+        results = [future.result() for future in futures]
+
+    export_shards(results)
+
+
+def run_chunked_recognition(chunks: list, workers: int) -> None:
+    """
+    Run the recognition on clips cut out of the flight video in parallel worker processes,
+    and export their vehicles as a single GeoJSON. The telemetry of every clip is matched
+    by its start time, so all clips share the one parsed SRT.
+
+    Args:
+        chunks: (video path, start time of the clip in milliseconds) pairs
+        workers: Number of worker processes
+    """
+    clear_directory(Config.CAR_IMAGE_PATH)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    # Export the model for the backend once instead of in every worker
+    export_model(
+        Config.YOLO_MODEL_PATH,
+        Config.DETECTION_BACKEND,
+        Config.EXPORT_IMAGE_SIZE,
+        Config.INT8_CALIBRATION_DATA,
+    )
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as executor:
+        futures = [
+            executor.submit(
+                process_shard,
+                index,
+                0,
+                None,
+                threads,
+                video_path=video_path,
+                video_offset_ms=offset_ms,
+                overlap_frames=0,
+            )
+            for index, (video_path, offset_ms) in enumerate(chunks)
+        ]
+        results = [future.result() for future in futures]
+
+    export_shards(results)
+
+
+def export_shards(results: list) -> None:
+    """
+    Stitch the features of the shards into the GeoJSON stream and export the GeoJSON.
+
+    Args:
+        results: The results of `process_shard`, in frame order
+    """
+    with GeoJSONSink(
+        Config.GEOJSON_STREAM_PATH, batch_size=Config.GEOJSON_BATCH_SIZE
+    ) as feature_sink:
+        stitch_shards(results, feature_sink)
+    if os.path.getsize(Config.GEOJSON_STREAM_PATH):
+        export_ndjson_for_geo_json(
+            Config.GEOJSON_STREAM_PATH,
+            Config.GEOJSON_OUTPUT_PATH,
+            eps_meters=Config.OUTLIER_EPS_METERS,
+            min_samples=Config.OUTLIER_MIN_SAMPLES,
+            workers=Config.EXPORT_WORKERS,
+            simplify_tolerance_meters=Config.SIMPLIFY_TOLERANCE_METERS,
+        )
+        if Config.PATH_TILES_DIR:
+            export_path_tiles(
+                Config.GEOJSON_STREAM_PATH,
+                Config.PATH_TILES_DIR,
+                zooms=Config.PATH_TILE_ZOOMS,
+                window_ms=Config.PATH_TILE_WINDOW_MS,
+                tolerance_pixels=Config.PATH_TILE_TOLERANCE_PIXELS,
+                eps_meters=Config.OUTLIER_EPS_METERS,
+                min_samples=Config.OUTLIER_MIN_SAMPLES,
+                workers=Config.EXPORT_WORKERS,
+            )
@@ -0,0 +1,129 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from config import Config
+
+FLIGHT_WIDTH = 480
+FLIGHT_HEIGHT = 270
+FLIGHT_FRAMES = 120
+
+
+class FakeTensor:
+    """
+    The part of a torch tensor that `Detections.from_boxes` uses.
+    """
+
+    def __init__(self, values):
+        self.values = np.asarray(values)
+
+    def cpu(self) -> "FakeTensor":
+        return self
+
+    def numpy(self) -> np.ndarray:
+        return self.values
+
+
+class FakeBoxes:
+    """
+    The part of the Ultralytics `Boxes` that `Detections.from_boxes` uses.
+    """
+
+    def __init__(self, xyxy, conf, cls, ids):
+        self.xyxy = FakeTensor(np.asarray(xyxy, dtype=np.float32).reshape(-1, 4))
+        self.conf = FakeTensor(np.asarray(conf, dtype=np.float32))
+        self.cls = FakeTensor(np.asarray(cls, dtype=np.float32))
+        self.id = None if ids is None else FakeTensor(np.asarray(ids, dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self.conf.values)
+
+
+class FakeDetector:
+    """
+    Tracks the white box drawn by `flight` and a parked car, like YOLO with a tracker.
+    """
+
+    def __init__(self, fail_at: int = None):
+        """
+        Args:
+            fail_at: Raise on this call to simulate a crash, None to never fail
+        """
+        self.calls = 0
+        self.fail_at = fail_at
+
+    def detect_objects(self, frame: np.ndarray) -> FakeBoxes:
+        if self.calls == self.fail_at:
+            raise RuntimeError("detector crashed")
+        self.calls += 1
+        ys, xs = np.nonzero(frame[:, :, 0] > 128)
+        if not len(xs):
+            return FakeBoxes([], [], [], None)
+        return FakeBoxes(
+            [[xs.min(), ys.min(), xs.max(), ys.max()], [200, 150, 230, 180]],
+            [0.9, 0.85],
+            [2, 7],
+            [1, 2],
+        )
+
+    def detect_objects_batch(self, frames: list) -> list:
+        return [self.detect_objects(frame) for frame in frames]
+
+
+@pytest.fixture
+def flight(tmp_path, monkeypatch):
+    """
+    Write a short synthetic video and its telemetry, and point the configuration at them
+    and at outputs in a temporary directory.
+    """
+    pytest.importorskip("ultralytics")
+    video_path = str(tmp_path / "flight.avi")
+    writer = cv2.VideoWriter(
+        video_path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (FLIGHT_WIDTH, FLIGHT_HEIGHT)
+    )
+    for frame_idx in range(FLIGHT_FRAMES):
+        frame = np.zeros((FLIGHT_HEIGHT, FLIGHT_WIDTH, 3), np.uint8)
+        cv2.rectangle(frame, (50 + frame_idx, 60), (80 + frame_idx, 90), (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+
+    telemetry = [
+        {
+            "frame_cnt": frame_idx + 1,
+            "diff_time": "33ms",
+            "timestamp": f"17:38:{6 + frame_idx // 30:02d}:{frame_idx % 30 * 33:03d}",
+            "latitude": 48.267 + frame_idx * 1e-6,
+            "longitude": 25.914,
+            "rel_alt": 100.0,
+            "abs_alt": 420.0,
+            "gb_yaw": -65.8 + (5 if frame_idx == 50 else 0),
+            "gb_pitch": -89.9,
+            "gb_roll": 0.0,
+            "focal_len": 24.0,
+        }
+        for frame_idx in range(FLIGHT_FRAMES)
+    ]
+    telemetry_path = str(tmp_path / "parsedSRT.json")
+    with open(telemetry_path, "w") as file:
+        json.dump(telemetry, file)
+
+    (tmp_path / "vehicles").mkdir()
+    for name, value in {
+        "VIDEO_PATH": video_path,
+        "DRONE_DATA_PATH": telemetry_path,
+        "GEOJSON_OUTPUT_PATH": str(tmp_path / "pathGEO.json"),
+        "GEOJSON_STREAM_PATH": str(tmp_path / "pathGEO.ndjson"),
+        "CAR_IMAGE_PATH": str(tmp_path / "vehicles"),
+        "CHECKPOINT_PATH": str(tmp_path / "checkpoint.pkl"),
+        "CAMERA_RESOLUTION_WIDTH": FLIGHT_WIDTH,
+        "CAMERA_RESOLUTION_HEIGHT": FLIGHT_HEIGHT,
+    }.items():
+        monkeypatch.setattr(Config, name, value)
+    return tmp_path
+
+
+@pytest.fixture
+def fake_detector():
+    return FakeDetector
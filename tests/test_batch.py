@@ -0,0 +1,16 @@
+import pytest
+
+from config import Config
+
+
+@pytest.mark.parametrize("name", ["PATH_TILES_DIR", "DETECTION_CACHE_DIR"])
+def test_config_digest_tracks_optional_outputs(monkeypatch, name):
+    batch = pytest.importorskip("batch")
+    monkeypatch.setattr(Config, name, None)
+    disabled = batch.config_digest()
+    monkeypatch.setattr(Config, name, "./outputs")
+    enabled = batch.config_digest()
+    monkeypatch.setattr(Config, name, "./elsewhere")
+
+    assert enabled != disabled
+    assert batch.config_digest() == enabled
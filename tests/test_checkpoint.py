@@ -0,0 +1,61 @@
+import json
+import os
+
+import pytest
+
+from checkpoint import load_checkpoint, remove_checkpoint, save_checkpoint
+from config import Config
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "checkpoint.pkl")
+    assert load_checkpoint(path) is None
+
+    save_checkpoint(path, {"frame_idx": 10, "car_ids": [1, 2]})
+    save_checkpoint(path, {"frame_idx": 20, "car_ids": [1, 2, 3]})
+    assert load_checkpoint(path) == {"frame_idx": 20, "car_ids": [1, 2, 3]}
+    assert os.listdir(tmp_path) == ["checkpoint.pkl"]
+
+    remove_checkpoint(path)
+    assert load_checkpoint(path) is None
+
+
+def feature_points(path: str) -> list:
+    """
+    The exported points without their vehicle ids, which a resumed run gives out anew.
+    """
+    with open(path) as file:
+        features = json.load(file)["features"]
+    return sorted(
+        (
+            feature["properties"]["frame_idx"],
+            feature["properties"]["confidence"],
+            tuple(feature["geometry"]["coordinates"]),
+        )
+        for feature in features
+    )
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_resumed_run_matches_uninterrupted_run(flight, fake_detector, monkeypatch, pipelined):
+    import main
+
+    monkeypatch.setattr(Config, "PIPELINE_ENABLED", pipelined)
+    monkeypatch.setattr(Config, "CHECKPOINT_INTERVAL", 20)
+
+    with main.CarTracker() as tracker:
+        tracker.run_recognition(fake_detector())
+    expected = feature_points(Config.GEOJSON_OUTPUT_PATH)
+
+    with pytest.raises(RuntimeError):
+        with main.CarTracker(checkpoint_path=Config.CHECKPOINT_PATH) as tracker:
+            tracker.run_recognition(fake_detector(fail_at=50))
+    assert feature_points(Config.GEOJSON_OUTPUT_PATH) != expected
+    assert load_checkpoint(Config.CHECKPOINT_PATH)["frame_idx"] < 50
+
+    with main.CarTracker(checkpoint_path=Config.CHECKPOINT_PATH, resume=True) as tracker:
+        assert tracker.start_frame > 0
+        tracker.run_recognition(fake_detector())
+
+    assert feature_points(Config.GEOJSON_OUTPUT_PATH) == expected
+    assert not os.path.exists(Config.CHECKPOINT_PATH)
@@ -0,0 +1,88 @@
+import json
+import pickle
+
+import numpy as np
+import pytest
+
+from preprocessing.drone_data import (
+    TelemetryStore,
+    compute_yaw_instability,
+    load_drone_data,
+    save_telemetry,
+)
+
+
+def srt_records(count: int) -> list:
+    return [
+        {
+            "frame_cnt": frame_idx + 1,
+            "diff_time": "33ms",
+            "timestamp": f"17:38:{6 + frame_idx // 30:02d}:{frame_idx % 30 * 33:03d}",
+            "latitude": 48.267 + frame_idx * 1e-6,
+            "longitude": 25.914,
+            "rel_alt": 100.0,
+            "abs_alt": 420.0,
+            "gb_yaw": -65.8 + frame_idx * 0.1,
+            "gb_pitch": -89.9,
+            "gb_roll": 0.0,
+            "focal_len": 24.0,
+        }
+        for frame_idx in range(count)
+    ]
+
+
+def test_memory_mapped_store_pickles_as_its_path(tmp_path):
+    records = srt_records(1000)
+    path = str(tmp_path / "parsedSRT.npy")
+    save_telemetry(path, TelemetryStore.from_records(records).data)
+
+    store = load_drone_data(path)
+    assert isinstance(store.data, np.memmap)
+    assert [frame["latitude"] for frame in store] == [record["latitude"] for record in records]
+
+    shard = store[200:300]
+    payload = pickle.dumps(shard)
+    assert len(payload) < shard.data.nbytes
+    copy = pickle.loads(payload)
+    assert (copy.path, copy.start, len(copy)) == (path, 200, 100)
+    np.testing.assert_array_equal(copy.data, store.data[200:300])
+    assert copy[0]["frame_cnt"] == 201
+
+
+def test_in_memory_store_pickles_its_rows():
+    store = TelemetryStore.from_records(srt_records(10))
+    copy = pickle.loads(pickle.dumps(store))
+    assert copy.path is None
+    np.testing.assert_array_equal(copy.data, store.data)
+
+
+def test_missing_npy_falls_back_to_json(tmp_path):
+    records = srt_records(5)
+    with open(tmp_path / "parsedSRT.json", "w") as file:
+        json.dump(records, file)
+
+    store = load_drone_data(str(tmp_path / "parsedSRT.npy"))
+    assert [frame["gb_yaw"] for frame in store] == [record["gb_yaw"] for record in records]
+
+
+def yaw_instability_reference(yaws: list, window: int, threshold: float) -> list:
+    """
+    The per-frame loop the tracker ran before the flags were precomputed.
+    """
+    flags = []
+    for frame_idx in range(len(yaws)):
+        unstable = False
+        if frame_idx > window:
+            changes = [abs(yaws[i] - yaws[i - 1]) for i in range(frame_idx - window, frame_idx)]
+            unstable = max(changes) > threshold
+        flags.append(unstable)
+    return flags
+
+
+@pytest.mark.parametrize("window", [1, 3, 10])
+@pytest.mark.parametrize("count", [0, 5, 11, 12, 200])
+def test_yaw_instability_matches_loop(window, count):
+    rng = np.random.default_rng(count + window)
+    yaws = np.cumsum(rng.choice([0.0, 0.5, 6.0], count, p=[0.5, 0.45, 0.05]))
+    expected = yaw_instability_reference(yaws.tolist(), window, 4.0)
+    assert compute_yaw_instability(yaws, window, 4.0).tolist() == expected
@@ -0,0 +1,22 @@
+from config import Config
+
+
+def test_frame_without_telemetry_releases_its_buffers(flight, monkeypatch):
+    import main
+
+    monkeypatch.setattr(Config, "DETECTION_IMAGE_SIZE", 240)
+    with main.CarTracker() as tracker:
+        # The telemetry ends at frame 60, e.g. after a recording gap at the end of the video
+        monkeypatch.setattr(tracker, "sync_frame_time", lambda frame_idx, time_ms: frame_idx < 60)
+        frame_source = tracker.frame_source
+        assert frame_source.downscaled
+        frame_count = 0
+        for _, frame, detector_frame in tracker.read_frames():
+            frame_source.release_detector_frame(detector_frame)
+            frame_source.release(frame)
+            frame_count += 1
+        assert frame_count == 60
+
+        # Every buffer came back, including those of the frame without telemetry
+        assert len(frame_source.frames.free) == 1
+        assert len(frame_source.detector_frames.free) == 1
@@ -0,0 +1,34 @@
+import numpy as np
+
+from preprocessing.drone_data import TelemetryStore, save_telemetry
+from preprocessing.live_source import LiveTelemetry, now_ms
+from preprocessing.telemetry_sync import TelemetrySync
+
+from test_drone_data import srt_records
+
+
+def test_live_telemetry_interpolates_without_rebuilding(tmp_path):
+    path = str(tmp_path / "telemetry.npy")
+    save_telemetry(path, TelemetryStore.from_records(srt_records(50)).data)
+    start_ms = now_ms() - 60_000  # every sample is due already
+    telemetry = LiveTelemetry(path, start_time_ms=start_ms, window=20)
+    telemetry.thread.join()
+
+    samples = np.array(telemetry.samples)
+    reference = TelemetrySync(TelemetryStore(samples))
+    first_ms = samples["timestamp_ms"][0]
+    times_ms = np.linspace(first_ms - 10, samples["timestamp_ms"][-1] + 10, 40)
+    rows = [telemetry.at(time_ms) for time_ms in times_ms]
+    np.testing.assert_array_equal(np.array(rows), reference.resample(times_ms - first_ms).data)
+
+    sync = telemetry.sync
+    telemetry.at(times_ms[0])
+    assert telemetry.sync is sync
+
+    row = samples[-1].copy()
+    row["timestamp_ms"] += 1000
+    row["latitude"] += 1e-3
+    telemetry._add(row)
+    assert telemetry.at(row["timestamp_ms"])["latitude"] == row["latitude"]
+    assert telemetry.sync is not sync
+    telemetry.close()
@@ -0,0 +1,30 @@
+import time
+
+from profiling import StageProfiler
+
+
+def test_throughput_starts_with_the_frames():
+    profiler = StageProfiler()
+    with profiler.stage("load_model"):
+        time.sleep(0.2)
+    profiler.start_frames()
+    for _ in range(10):
+        with profiler.stage("detect"):
+            pass
+        profiler.frame_done()
+    profiler.start_frames()  # a second call doesn't restart the clock
+
+    summary = profiler.summary()
+    assert summary["frames"] == 10
+    assert summary["elapsed_s"] < 0.1
+    assert summary["stages"]["load_model"]["total_ms"] >= 200
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = StageProfiler(enabled=False)
+    profiler.start_frames()
+    with profiler.stage("detect"):
+        pass
+    profiler.frame_done()
+    assert profiler.summary()["frames"] == 0
+    assert profiler.started is None
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from benchmarks.reference import map_to_coordinates
+from config import Config
+from geoprocessing.projection import GroundProjector
+
+
+def drone_frames(count: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "latitude": 58.383 + rng.uniform(-1e-3, 1e-3),
+            "longitude": 26.722 + rng.uniform(-1e-3, 1e-3),
+            "abs_alt": rng.uniform(40, 120),
+            "focal_len": rng.choice([24.0, 35.0, 50.0]),
+            "gb_yaw": rng.uniform(-180, 180),
+        }
+        for _ in range(count)
+    ]
+
+
+def make_projector(cache_size: int = 1024) -> GroundProjector:
+    return GroundProjector(
+        Config.SENSOR_WIDTH,
+        Config.CAMERA_RESOLUTION_WIDTH,
+        Config.CAMERA_RESOLUTION_HEIGHT,
+        cache_size=cache_size,
+    )
+
+
+def test_project_one_frame_matches_scalar():
+    rng = np.random.default_rng(1)
+    xs = rng.uniform(0, Config.CAMERA_RESOLUTION_WIDTH, 50)
+    ys = rng.uniform(0, Config.CAMERA_RESOLUTION_HEIGHT, 50)
+    projector = make_projector()
+    for frame in drone_frames(5):
+        lats, lons = projector.project(
+            xs,
+            ys,
+            frame["latitude"],
+            frame["longitude"],
+            frame["abs_alt"],
+            frame["focal_len"],
+            frame["gb_yaw"],
+        )
+        expected = np.array([map_to_coordinates(x, y, frame) for x, y in zip(xs, ys)])
+        np.testing.assert_allclose(lats, expected[:, 0], rtol=0, atol=1e-9)
+        np.testing.assert_allclose(lons, expected[:, 1], rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("cache_size", [1, 1024])
+def test_project_frame_batch_matches_scalar(cache_size):
+    frames = drone_frames(40, seed=2)
+    rng = np.random.default_rng(3)
+    frame_of_point = rng.integers(0, len(frames), 400)
+    xs = rng.uniform(0, Config.CAMERA_RESOLUTION_WIDTH, len(frame_of_point))
+    ys = rng.uniform(0, Config.CAMERA_RESOLUTION_HEIGHT, len(frame_of_point))
+    unstable = rng.random(len(frame_of_point)) < 0.2
+
+    def column(name: str) -> np.ndarray:
+        return np.array([frames[i][name] for i in frame_of_point])
+
+    projector = make_projector(cache_size)
+    lats, lons = projector.project(
+        xs,
+        ys,
+        column("latitude"),
+        column("longitude"),
+        column("abs_alt"),
+        column("focal_len"),
+        column("gb_yaw"),
+        unstable,
+    )
+    expected = np.array(
+        [
+            map_to_coordinates(x, y, frames[i], yaw_unstable=u)
+            for x, y, i, u in zip(xs, ys, frame_of_point, unstable)
+        ]
+    )
+    np.testing.assert_allclose(lats, expected[:, 0], rtol=0, atol=1e-9)
+    np.testing.assert_allclose(lons, expected[:, 1], rtol=0, atol=1e-9)
+    assert len(projector._factors) <= cache_size
+
+
+def test_project_rejects_out_of_range_yaw():
+    with pytest.raises(ValueError):
+        make_projector().project([0.0], [0.0], 58.0, 26.0, 50.0, 24.0, 200.0)
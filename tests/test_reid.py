@@ -0,0 +1,60 @@
+import numpy as np
+
+from conftest import FakeBoxes
+from detection.reid import ReIDBank
+from config import Config
+
+
+def signature(seed: int) -> np.ndarray:
+    values = np.random.default_rng(seed).random(16)
+    return values / np.linalg.norm(values)
+
+
+def test_match_skips_excluded_vehicles():
+    bank = ReIDBank(dimension=16, max_age=30, gate_meters=10.0)
+    look = signature(0)
+    bank.update(5, 10, 58.4, 26.7, look)
+    bank.update(6, 10, 58.4, 26.7, look * 0.99 + signature(1) * 0.01)
+    bank.update(7, 10, 58.5, 26.7, look)  # lost too far away
+
+    assert bank.match(look, 12, 58.4, 26.7) == 5
+    # Vehicle 5 is still visible, e.g. at the frame edge, so it isn't the new track
+    assert bank.match(look, 12, 58.4, 26.7, exclude={5, 99}) == 6
+    assert bank.match(look, 12, 58.4, 26.7, exclude={5, 6}) is None
+
+
+def test_match_skips_vehicles_seen_on_the_frame():
+    bank = ReIDBank(dimension=16, max_age=30)
+    look = signature(2)
+    bank.update(5, 10, 58.4, 26.7, look)
+    bank.update(5, 12, 58.4, 26.7)
+    assert bank.match(look, 12, 58.4, 26.7) is None
+    assert bank.match(look, 13, 58.4, 26.7) == 5
+    assert bank.match(look, 43, 58.4, 26.7) is None  # lost for longer than max_age
+
+
+def test_vehicle_at_the_frame_edge_is_not_relinked(flight, fake_detector, monkeypatch):
+    import main
+
+    class EdgeDetector(fake_detector):
+        """
+        From frame 40 vehicle 1 is also boxed at the left edge of the frame, and a second
+        track appears on its body.
+        """
+
+        def detect_objects(self, frame):
+            boxes = super().detect_objects(frame)
+            if self.calls <= 40:
+                return boxes
+            xyxy = boxes.xyxy.values
+            edge = [[5, xyxy[0, 1], xyxy[0, 2], xyxy[0, 3]]]
+            return FakeBoxes(
+                np.concatenate([edge, xyxy]), [0.9, 0.9, 0.85], [2, 2, 7], [1, 9, 2]
+            )
+
+    monkeypatch.setattr(Config, "PIPELINE_ENABLED", False)
+    monkeypatch.setattr(Config, "REID_ENABLED", True)
+    with main.CarTracker() as tracker:
+        tracker.run_recognition(EdgeDetector())
+        assert tracker.track_aliases == {}
+        assert sorted(tracker.car_ids) == [1, 2, 9]
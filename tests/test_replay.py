@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from config import Config
+
+
+def read_outputs() -> dict:
+    outputs = {}
+    for path in (Config.GEOJSON_OUTPUT_PATH, Config.GEOJSON_STREAM_PATH):
+        with open(path, "rb") as file:
+            outputs[path] = file.read()
+    for name in os.listdir(Config.CAR_IMAGE_PATH):
+        with open(os.path.join(Config.CAR_IMAGE_PATH, name), "rb") as file:
+            outputs[name] = file.read()
+    return outputs
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_replay_writes_the_recorded_outputs(flight, fake_detector, monkeypatch, pipelined):
+    import main
+    import replay
+
+    monkeypatch.setattr(Config, "PIPELINE_ENABLED", pipelined)
+    cache_dir = str(flight / "detections")
+    with main.CarTracker(detections_path=cache_dir) as tracker:
+        tracker.run_recognition(fake_detector())
+    recorded = read_outputs()
+    assert any(name.endswith(".jpg") for name in recorded)
+
+    replay.run_replay(cache_dir)
+
+    assert read_outputs() == recorded
@@ -0,0 +1,53 @@
+import json
+
+import numpy as np
+import pytest
+
+from config import Config
+
+
+def exported_points(path: str) -> list:
+    with open(path) as file:
+        features = json.load(file)["features"]
+    return sorted(
+        (
+            feature["properties"]["frame_idx"],
+            feature["properties"]["vehicle_id"],
+            tuple(feature["geometry"]["coordinates"]),
+        )
+        for feature in features
+    )
+
+
+def test_match_tracks_pairs_ids_by_votes():
+    sharding = pytest.importorskip("sharding")
+    box = np.array([[0, 0, 10, 10]], dtype=float)
+    other = np.array([[100, 100, 110, 110]], dtype=float)
+    both = np.concatenate([box, other])
+    previous = {frame_idx: (np.array([1, 2]), both) for frame_idx in (5, 6, 7)}
+    current = {frame_idx: (np.array([11, 12]), both[::-1]) for frame_idx in (5, 6)}
+    # A second track on the box of vehicle 1 gets fewer votes than track 12
+    current[7] = (np.array([11, 12, 13]), np.concatenate([other, box + 1, box]))
+    current[8] = (np.array([14]), box)  # not processed by the earlier shard
+    assert sharding.match_tracks(previous, current, iou_threshold=0.5) == {11: 2, 12: 1}
+
+
+def test_stitched_shards_match_a_single_run(flight, fake_detector, monkeypatch):
+    import main
+    import sharding
+
+    monkeypatch.setattr(Config, "PIPELINE_ENABLED", False)
+    monkeypatch.setattr(Config, "SHARD_OVERLAP_FRAMES", 10)
+    with main.CarTracker() as tracker:
+        tracker.run_recognition(fake_detector())
+    expected = exported_points(Config.GEOJSON_OUTPUT_PATH)
+
+    monkeypatch.setattr(sharding, "create_detector", lambda threads: fake_detector())
+    frame_count, telemetry_path = sharding.sync_telemetry(str(flight / "telemetry.npy"))
+    results = [
+        sharding.process_shard(index, start, stop, 1, telemetry_path=telemetry_path)
+        for index, (start, stop) in enumerate(sharding.plan_shards(frame_count, 3))
+    ]
+    sharding.export_shards(results)
+
+    assert exported_points(Config.GEOJSON_OUTPUT_PATH) == expected
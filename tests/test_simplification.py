@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from sklearn.cluster import DBSCAN
+
+from benchmarks.simplification import douglas_peucker_reference
+from geoprocessing.simplification import (
+    douglas_peucker,
+    per_track_inlier_mask,
+    simplify_paths_mask,
+    to_local_meters,
+)
+
+
+def random_walk(length: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.normal(0, 1, (length, 2)), axis=0)
+
+
+@pytest.mark.parametrize("tolerance", [0.0, 0.5, 2.0, 10.0])
+@pytest.mark.parametrize("seed", range(5))
+def test_douglas_peucker_matches_recursive(seed, tolerance):
+    points = random_walk(300, seed)
+    expected = np.zeros(len(points), dtype=bool)
+    expected[douglas_peucker_reference(points, tolerance)] = True
+    np.testing.assert_array_equal(douglas_peucker(points, tolerance), expected)
+
+
+def test_douglas_peucker_short_and_degenerate_paths():
+    assert douglas_peucker(np.zeros((0, 2)), 1.0).tolist() == []
+    assert douglas_peucker(np.ones((2, 2)), 1.0).tolist() == [True, True]
+    # A vehicle standing still returns to its start, the segment has no length
+    parked = np.array([[0.0, 0.0], [0.1, 0.0], [3.0, 0.0], [0.0, 0.0]])
+    expected = np.zeros(len(parked), dtype=bool)
+    expected[douglas_peucker_reference(parked, 1.0)] = True
+    np.testing.assert_array_equal(douglas_peucker(parked, 1.0), expected)
+
+
+def test_simplify_paths_mask_simplifies_every_path_in_order():
+    rng = np.random.default_rng(7)
+    paths = {vehicle_id: random_walk(100, vehicle_id) * 1e-5 for vehicle_id in (3, 1, 8)}
+    vehicle_ids = np.concatenate([np.full(100, vehicle_id) for vehicle_id in paths])
+    frames = np.concatenate([np.arange(100)] * len(paths))
+    coordinates = np.concatenate(list(paths.values())) + [26.7, 58.4]
+    shuffled = rng.permutation(len(coordinates))
+
+    keep = simplify_paths_mask(coordinates[shuffled], vehicle_ids[shuffled], frames[shuffled], 0.5)
+
+    expected = np.zeros(len(coordinates), dtype=bool)
+    for vehicle_id in paths:
+        path = np.flatnonzero(vehicle_ids == vehicle_id)
+        kept = douglas_peucker_reference(to_local_meters(coordinates[path]), 0.5)
+        expected[path[kept]] = True
+    np.testing.assert_array_equal(keep, expected[shuffled])
+
+
+def per_track_dbscan_reference(coordinates, vehicle_ids, eps_meters, min_samples):
+    inliers = np.zeros(len(coordinates), dtype=bool)
+    for vehicle_id in np.unique(vehicle_ids):
+        path = np.flatnonzero(vehicle_ids == vehicle_id)
+        labels = DBSCAN(eps=eps_meters, min_samples=min_samples).fit(
+            to_local_meters(coordinates[path])
+        ).labels_
+        inliers[path] = labels != -1
+    return inliers
+
+
+@pytest.mark.parametrize("min_samples", [2, 3, 5])
+@pytest.mark.parametrize("seed", range(5))
+def test_per_track_inliers_match_dbscan(seed, min_samples):
+    rng = np.random.default_rng(seed)
+    count = 2000
+    vehicle_ids = rng.integers(0, 20, count)
+    # Paths sharing one spot, so a point would be supported by other vehicles if mixed
+    coordinates = np.column_stack(
+        [26.7 + rng.normal(0, 2e-5, count), 58.4 + rng.normal(0, 2e-5, count)]
+    )
+    coordinates[:100] = coordinates[100]  # a parked vehicle, duplicated points
+    vehicle_ids[:100] = vehicle_ids[100]
+
+    inliers = per_track_inlier_mask(coordinates, vehicle_ids, 1.1, min_samples, workers=2)
+
+    expected = per_track_dbscan_reference(coordinates, vehicle_ids, 1.1, min_samples)
+    assert 0 < expected.sum() < count
+    np.testing.assert_array_equal(inliers, expected)
+
+
+def test_per_track_inliers_of_few_points():
+    assert per_track_inlier_mask(np.zeros((0, 2)), np.zeros(0), 1.1, 3).tolist() == []
+    coordinates = np.array([[26.7, 58.4], [26.7, 58.4]])
+    assert per_track_inlier_mask(coordinates, np.array([1, 1]), 1.1, 3).tolist() == [False] * 2
@@ -1,7 +1,23 @@
 import os
 import glob
 
+from typing import Iterable, Iterator
+
 def clear_directory(directory):
     files = glob.glob(f'{directory}/*')
     for f in files:
         os.remove(f)
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    """
+    Split an iterable into lists of `size` items, the last one may be shorter.
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch